@@ -0,0 +1,32 @@
+"""index user.stripe_customer_id and user.subscription_id
+
+Revision ID: 1c7e5b9a3d42
+Revises: 0a6d2e8c4f19
+Create Date: 2026-10-19 13:37:02.518264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c7e5b9a3d42'
+down_revision = '0a6d2e8c4f19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY doesn't lock out writes to "user" on Postgres,
+    # but it can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_user_stripe_customer_id'), 'user', ['stripe_customer_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_user_subscription_id'), 'user', ['subscription_id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_user_subscription_id'), table_name='user', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_user_stripe_customer_id'), table_name='user', postgresql_concurrently=True)
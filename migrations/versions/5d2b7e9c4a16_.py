@@ -0,0 +1,60 @@
+"""key recording_ready notification_log rows on the recording
+
+Revision ID: 5d2b7e9c4a16
+Revises: 3c8e1a5f7d42
+Create Date: 2026-10-19 21:12:08.417305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2b7e9c4a16'
+down_revision = '3c8e1a5f7d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Claims for sessions without a completed recording can't refer to anything
+    op.execute("""
+        DELETE FROM notification_log
+        WHERE kind = 'recording_ready' AND NOT EXISTS (
+            SELECT 1 FROM recording
+            WHERE recording.session_id = notification_log.ref_id AND recording.status = 'completed'
+        )
+    """)
+    # The rest referenced the session; point each at the session's newest
+    # completed recording, which is the one it announced
+    op.execute("""
+        UPDATE notification_log SET ref_id = (
+            SELECT MAX(recording.id) FROM recording
+            WHERE recording.session_id = notification_log.ref_id AND recording.status = 'completed'
+        )
+        WHERE kind = 'recording_ready'
+    """)
+
+
+def downgrade():
+    # One claim per session again: keep the one for its newest recording
+    op.execute("""
+        DELETE FROM notification_log
+        WHERE kind = 'recording_ready' AND EXISTS (
+            SELECT 1 FROM notification_log newer
+            JOIN recording newer_recording ON newer_recording.id = newer.ref_id
+            JOIN recording recording ON recording.id = notification_log.ref_id
+            WHERE newer.kind = 'recording_ready'
+              AND newer.user_id = notification_log.user_id
+              AND newer_recording.session_id = recording.session_id
+              AND newer.ref_id > notification_log.ref_id
+        )
+    """)
+    op.execute("""
+        UPDATE notification_log SET ref_id = (
+            SELECT recording.session_id FROM recording WHERE recording.id = notification_log.ref_id
+        )
+        WHERE kind = 'recording_ready' AND EXISTS (
+            SELECT 1 FROM recording WHERE recording.id = notification_log.ref_id
+        )
+    """)
@@ -0,0 +1,107 @@
+"""add recording table with batched backfill from video_session
+
+Revision ID: 6f1c3e8a9d25
+Revises: 2d7a9c4e1b58
+Create Date: 2026-10-19 16:41:55.318620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1c3e8a9d25'
+down_revision = '2d7a9c4e1b58'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+video_session_table = sa.table(
+    'video_session',
+    sa.column('id', sa.Integer),
+    sa.column('creator_id', sa.Integer),
+    sa.column('meeting_id', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('started_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+    sa.column('recording_url', sa.String),
+    sa.column('recording_id', sa.String),
+    sa.column('recording_status', sa.String)
+)
+
+recording_table = sa.table(
+    'recording',
+    sa.column('session_id', sa.Integer),
+    sa.column('owner_id', sa.Integer),
+    sa.column('meeting_id', sa.String),
+    sa.column('external_id', sa.String),
+    sa.column('status', sa.String),
+    sa.column('url', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('finished_at', sa.DateTime)
+)
+
+
+def upgrade():
+    op.create_table('recording',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('meeting_id', sa.String(length=255), nullable=False),
+    sa.Column('external_id', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['session_id'], ['video_session.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # One recording per session that ever had one, copied in primary-key
+    # ranges with INSERT ... SELECT so no batch holds video_session for long.
+    # A URL without a status is treated as a finished recording.
+    session = video_session_table.c
+    status = sa.case(
+        [(session.recording_status.in_(('starting', 'active', 'stopping', 'completed', 'failed')),
+          session.recording_status)],
+        else_=sa.literal('completed')
+    )
+    connection = op.get_bind()
+    last_id = 0
+    max_id = connection.execute(sa.select([sa.func.max(session.id)])).scalar() or 0
+    while last_id < max_id:
+        connection.execute(recording_table.insert().from_select(
+            ['session_id', 'owner_id', 'meeting_id', 'external_id', 'status', 'url', 'created_at', 'finished_at'],
+            sa.select([
+                session.id,
+                session.creator_id,
+                session.meeting_id,
+                session.recording_id,
+                status,
+                session.recording_url,
+                sa.func.coalesce(session.started_at, session.created_at),
+                sa.case([(status.in_(('completed', 'failed')), session.updated_at)], else_=sa.null())
+            ]).where(sa.and_(
+                session.id > last_id,
+                session.id <= last_id + BATCH_SIZE,
+                session.created_at.isnot(None),
+                sa.or_(
+                    sa.func.coalesce(session.recording_status, 'none') != 'none',
+                    session.recording_url.isnot(None)
+                )
+            ))
+        ))
+        last_id += BATCH_SIZE
+
+    op.create_index('ix_recording_owner_id_created_at', 'recording', ['owner_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_recording_session_id_created_at', 'recording', ['session_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recording_session_id_created_at', table_name='recording')
+    op.drop_index('ix_recording_owner_id_created_at', table_name='recording')
+    op.drop_table('recording')
@@ -0,0 +1,72 @@
+"""add user.email_normalized with batched backfill
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f9a1c7d2b64
+Create Date: 2026-10-19 10:03:17.208816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a93'
+down_revision = '3f9a1c7d2b64'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+user_table = sa.table(
+    'user',
+    sa.column('id', sa.Integer),
+    sa.column('email', sa.String),
+    sa.column('email_normalized', sa.String)
+)
+
+
+def upgrade():
+    op.add_column('user', sa.Column('email_normalized', sa.String(length=120), nullable=True))
+
+    # Backfill in primary-key order, one batch per statement, so the table is
+    # never locked for the whole scan. If two accounts differ only by case,
+    # the oldest keeps the normalized email and the newer ones stay NULL.
+    connection = op.get_bind()
+    seen = set()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([user_table.c.id, user_table.c.email])
+            .where(user_table.c.id > last_id)
+            .order_by(user_table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row_id, email in rows:
+            normalized = (email or '').strip().lower()
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                updates.append({'row_id': row_id, 'normalized': normalized})
+        if updates:
+            connection.execute(
+                user_table.update()
+                .where(user_table.c.id == sa.bindparam('row_id'))
+                .values(email_normalized=sa.bindparam('normalized')),
+                updates
+            )
+        last_id = rows[-1][0]
+
+    if connection.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(op.f('ix_user_email_normalized'), 'user', ['email_normalized'],
+                            unique=True, postgresql_concurrently=True)
+    else:
+        op.create_index(op.f('ix_user_email_normalized'), 'user', ['email_normalized'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_email_normalized'), table_name='user')
+    op.drop_column('user', 'email_normalized')
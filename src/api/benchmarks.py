@@ -0,0 +1,423 @@
+# src/api/benchmarks.py
+"""
+Benchmarks for hot paths, run through the ``flask bench`` command group.
+
+Each benchmark returns a dict of results so the CLI can print it and other
+tooling can consume it.
+"""
+
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import text
+
+from api.models import db, User, EmailOutbox, PendingNotification
+from api.user_provisioning import bulk_upsert_users
+from api.email_templates import get_template
+from api.send_email import (
+    build_booking_confirmation_email, build_mentor_booking_notification_email, send_verification_email_code,
+    send_booking_confirmation_email, send_mentor_booking_notification_email
+)
+from api import timezone_format
+from api.calendar_utils import (
+    CalendarEvent, vevent_cache, render_calendar_urls, get_calendar_urls, generate_google_calendar_url,
+    generate_outlook_calendar_url, generate_icalendar_content
+)
+from api.email_outbox import process_outbox_batch
+from api.mail_transport import SMTPConnectionPool
+from api.smtp_sink import SMTPSink
+from api.workers import BackgroundWorkerPool
+from api import stripe_events
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_latencies(samples_seconds):
+    """p50/p95/p99/mean of a list of durations, in microseconds"""
+    micros = [s * 1e6 for s in samples_seconds]
+    return {
+        "count": len(micros),
+        "mean_us": round(statistics.mean(micros), 1) if micros else 0.0,
+        "p50_us": round(_percentile(micros, 50), 1),
+        "p95_us": round(_percentile(micros, 95), 1),
+        "p99_us": round(_percentile(micros, 99), 1)
+    }
+
+
+def _bench_email(i):
+    return f"bench-user-{i}@bench.local"
+
+
+def seed_bench_users(count, batch_size=5000):
+    """Make sure ``count`` synthetic benchmark users exist"""
+    existing = User.query.filter(User.email_normalized.like('bench-user-%@bench.local')).count()
+    if existing >= count:
+        return {"seeded": 0, "existing": existing}
+    records = (
+        {"email": _bench_email(i), "first_name": "Bench", "last_name": str(i), "is_verified": True}
+        for i in range(existing, count)
+    )
+    stats = bulk_upsert_users(records, batch_size=batch_size, update_existing=False)
+    return {"seeded": stats["received"], "existing": existing, "users_per_second": stats["users_per_second"]}
+
+
+def explain(query):
+    """Return the database's plan for a SQLAlchemy query as a list of lines"""
+    statement = query.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        rows = db.session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {statement}")).fetchall()
+        return [row[0] for row in rows]
+    if dialect == 'sqlite':
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).fetchall()
+        return [row[-1] for row in rows]
+    return []
+
+
+def bench_email_lookup(users=1000000, lookups=10000):
+    """Time case-insensitive ``User.find_by_email`` lookups against a large user table"""
+    seed = seed_bench_users(users)
+    db.session.expire_all()
+
+    samples = []
+    misses = 0
+    for _ in range(lookups):
+        email = _bench_email(random.randrange(users))
+        # Mixed case input must still hit the normalized index
+        email = email.upper() if random.random() < 0.5 else email
+        started = time.perf_counter()
+        user = User.find_by_email(email)
+        samples.append(time.perf_counter() - started)
+        if user is None:
+            misses += 1
+        db.session.expunge_all()
+
+    plan_query = User.query.filter_by(email_normalized=_bench_email(users // 2))
+    return {
+        "users": users,
+        "seed": seed,
+        "misses": misses,
+        "latency": summarize_latencies(samples),
+        "plan": explain(plan_query)
+    }
+
+
+def sample_booking_details(i=0, customer_timezone='Europe/Madrid'):
+    """Synthetic booking used by the email benchmarks"""
+    return {
+        'id': 1000 + i,
+        'session_start_time': '2026-03-02T15:00:00Z',
+        'session_end_time': '2026-03-02T16:00:00Z',
+        'amount_paid': 45.0,
+        'meeting_url': f"https://example.com/video-meeting/room-{i}",
+        'mentor_email': 'mentor@example.com',
+        'customer_email': f"customer{i}@example.com",
+        'session_duration': 60,
+        'customer_timezone': customer_timezone
+    }
+
+
+def _time_calls(fn, count):
+    samples = []
+    for i in range(count):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_email_render(count=1000):
+    """Per-email render cost for single and bulk sends of the booking emails"""
+    def build_confirmation(i):
+        details = sample_booking_details(i)
+        return build_booking_confirmation_email(details['customer_email'], f"Customer {i}", "Mentor", details)
+
+    def build_notification(i):
+        details = sample_booking_details(i)
+        return build_mentor_booking_notification_email(details['mentor_email'], "Mentor", f"Customer {i}", details)
+
+    template = get_template('booking_confirmation')
+    template_fields = {field: f"value-{field}" for field in template.fields}
+
+    results = {}
+    for name, fn in (("booking_confirmation", build_confirmation), ("mentor_notification", build_notification)):
+        single = _time_calls(fn, 1)
+        started = time.perf_counter()
+        bulk = _time_calls(fn, count)
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "single_us": round(single[0] * 1e6, 1),
+            "bulk": summarize_latencies(bulk),
+            "bulk_emails_per_second": round(count / elapsed, 1) if elapsed else 0.0
+        }
+    results["template_only"] = summarize_latencies(_time_calls(lambda i: template.render(**template_fields), count))
+    return results
+
+
+BENCH_TIMEZONES = [None, 'America/New_York', 'America/Los_Angeles', 'America/Chicago', 'Europe/Madrid',
+                   'Europe/London', 'Asia/Kolkata', 'Australia/Sydney']
+
+
+def bench_timezone_format(sessions=10000, slots=50):
+    """Cold vs warm ``format_many`` over a reminder-sized batch of session times"""
+    base = datetime(2026, 3, 2, 15, 0)
+    slot_times = [
+        ((base + timedelta(hours=h)).isoformat() + 'Z', (base + timedelta(hours=h, minutes=60)).isoformat() + 'Z')
+        for h in range(slots)
+    ]
+    batch = [slot_times[i % slots] + (BENCH_TIMEZONES[i % len(BENCH_TIMEZONES)],) for i in range(sessions)]
+
+    results = {"sessions": sessions, "distinct_slots": slots, "zones": len(BENCH_TIMEZONES)}
+    for run in ("cold", "warm"):
+        if run == "cold":
+            for fn in (timezone_format._parse_iso, timezone_format._local_parts, timezone_format._dynamic_display):
+                fn.cache_clear()
+        started = time.perf_counter()
+        timezone_format.format_many(batch)
+        elapsed = time.perf_counter() - started
+        results[run] = {
+            "seconds": round(elapsed, 4),
+            "us_per_session": round(elapsed / sessions * 1e6, 2) if sessions else 0.0
+        }
+    results["caches"] = timezone_format.cache_stats()
+    return results
+
+
+BENCH_EMAIL_DOMAIN = '@bench.local'
+
+
+def _enqueue_bench_email(i):
+    kind = i % 3
+    details = sample_booking_details(i)
+    if kind == 0:
+        return send_verification_email_code(f"verify{i}{BENCH_EMAIL_DOMAIN}", f"{i % 1000000:06d}")
+    if kind == 1:
+        return send_booking_confirmation_email(f"customer{i}{BENCH_EMAIL_DOMAIN}", f"Customer {i}", "Mentor", details)
+    return send_mentor_booking_notification_email(f"mentor{i}{BENCH_EMAIL_DOMAIN}", "Mentor", f"Customer {i}", details)
+
+
+def bench_email_throughput(count=1000, workers=2, batch_size=50, pool_size=2, latency_ms=0.0,
+                           connect_latency_ms=0.0, disconnect_rate=0.0, temp_fail_rate=0.0,
+                           perm_fail_rate=0.0, timeout=300):
+    """
+    Push verification, booking-confirmation and mentor-notification emails
+    through ``send_email`` and the outbox workers into a local SMTP sink
+    """
+    bench_rows = EmailOutbox.query.filter(EmailOutbox.to_email.like(f"%{BENCH_EMAIL_DOMAIN}"))
+    other_due = EmailOutbox.query.filter(
+        EmailOutbox.status.in_(('pending', 'sending')),
+        ~EmailOutbox.to_email.like(f"%{BENCH_EMAIL_DOMAIN}")
+    ).count()
+    if other_due:
+        # The bench workers claim any due row, so real mail would end up in the sink
+        return {"error": f"{other_due} real emails are queued in the outbox; drain it before benchmarking"}
+    bench_rows.delete(synchronize_session=False)
+    db.session.commit()
+
+    sink = SMTPSink(latency=latency_ms / 1000.0, connect_latency=connect_latency_ms / 1000.0,
+                    disconnect_rate=disconnect_rate, temp_fail_rate=temp_fail_rate,
+                    perm_fail_rate=perm_fail_rate, seed=42).start()
+    pool = SMTPConnectionPool(host=sink.host, port=sink.port, use_ssl=False, size=pool_size,
+                              credentials=lambda: (None, None))
+    drain = BackgroundWorkerPool(
+        current_app._get_current_object(), 'bench-email-outbox',
+        partial(process_outbox_batch, batch_size=batch_size, pool=pool),
+        num_workers=workers, poll_interval=0.05
+    )
+    try:
+        started = time.perf_counter()
+        for i in range(count):
+            _enqueue_bench_email(i)
+        enqueue_seconds = time.perf_counter() - started
+
+        drain.start()
+        deadline = time.monotonic() + timeout
+        timed_out = True
+        while time.monotonic() < deadline:
+            outstanding = bench_rows.filter(db.or_(
+                EmailOutbox.status == 'sending',
+                db.and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= datetime.utcnow())
+            )).count()
+            db.session.commit()
+            if not outstanding:
+                timed_out = False
+                break
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+    finally:
+        drain.stop()
+        pool.close_all()
+        sink.stop()
+
+    statuses = dict(
+        db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id))
+        .filter(EmailOutbox.to_email.like(f"%{BENCH_EMAIL_DOMAIN}"))
+        .group_by(EmailOutbox.status).all()
+    )
+    delays = [
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in db.session.query(EmailOutbox.created_at, EmailOutbox.sent_at)
+        .filter(EmailOutbox.to_email.like(f"%{BENCH_EMAIL_DOMAIN}"), EmailOutbox.status == 'sent')
+    ]
+    # Leftover retries must not be picked up later by the real outbox workers
+    bench_rows.delete(synchronize_session=False)
+    db.session.commit()
+
+    delivered = statuses.get('sent', 0)
+    pool_stats = pool.stats()
+    return {
+        "emails": count,
+        "workers": workers,
+        "delivered": delivered,
+        "retry_scheduled": statuses.get('pending', 0),
+        "failed": statuses.get('failed', 0),
+        "timed_out": timed_out,
+        "enqueue_per_second": round(count / enqueue_seconds, 1) if enqueue_seconds else 0.0,
+        "messages_per_second": round(delivered / elapsed, 1) if elapsed else 0.0,
+        "enqueue_to_delivery_ms": {
+            "p50": round(_percentile(delays, 50) * 1000, 1),
+            "p95": round(_percentile(delays, 95) * 1000, 1),
+            "max": round(max(delays) * 1000, 1) if delays else 0.0
+        },
+        "reconnects": pool_stats["reconnects"],
+        "connections_opened": pool_stats["connections_opened"],
+        "smtp_pool": pool_stats,
+        "sink": sink.stats()
+    }
+
+
+def _sample_calendar_event(i):
+    details = sample_booking_details(i)
+    return (
+        f"Mentorship Session with Mentor {i}",
+        details['session_start_time'],
+        details['session_end_time'],
+        f"Your mentorship session.\n\nMeeting link: {details['meeting_url']}",
+        details['meeting_url']
+    )
+
+
+def bench_calendar_events(count=10000):
+    """Per-event cost of the calendar links for the per-provider, single-parse and memoized paths"""
+    events = [_sample_calendar_event(i) for i in range(count)]
+
+    def per_provider(i):
+        # What get_calendar_urls used to do: parse and convert once per provider
+        args = events[i]
+        return (generate_google_calendar_url(*args), generate_outlook_calendar_url(*args),
+                generate_icalendar_content(*args))
+
+    prebuilt = [CalendarEvent(*args) for args in events]
+    for event in prebuilt:
+        event.calendar_urls()
+
+    results = {"events": count}
+    for name, fn in (
+        ("per_provider_parse", per_provider),
+        ("single_parse", lambda i: get_calendar_urls(*events[i])),
+        ("memoized", lambda i: prebuilt[i].calendar_urls())
+    ):
+        started = time.perf_counter()
+        samples = _time_calls(fn, count)
+        elapsed = time.perf_counter() - started
+        results[name] = dict(summarize_latencies(samples), events_per_second=round(count / elapsed, 1))
+
+    started = time.perf_counter()
+    render_calendar_urls(events)
+    elapsed = time.perf_counter() - started
+    results["batch_render"] = {"seconds": round(elapsed, 4), "events_per_second": round(count / elapsed, 1)}
+
+    # Feed-style rendering: fresh CalendarEvent objects for unchanged content
+    vevent_cache.clear()
+    results["vevent_uncached"] = summarize_latencies(_time_calls(lambda i: CalendarEvent(*events[i]).vevent(), count))
+    results["vevent_cached"] = summarize_latencies(_time_calls(lambda i: CalendarEvent(*events[i]).vevent(), count))
+    results["vevent_cache"] = vevent_cache.stats()
+    return results
+
+
+def _seed_bench_customers():
+    """Give every benchmark user a synthetic Stripe customer ID (``cus_bench_<user id>``)"""
+    return User.query.filter(
+        User.email_normalized.like('bench-user-%@bench.local'),
+        User.stripe_customer_id.is_(None)
+    ).update(
+        {User.stripe_customer_id: db.literal('cus_bench_') + db.cast(User.id, db.String)},
+        synchronize_session=False
+    )
+
+
+def bench_stripe_webhooks(users=100000, events=5000, customers=1000):
+    """
+    Time the Stripe subscription handlers against a large user table, with the
+    customer cache cold and warm
+
+    ``events`` subscription updates are spread over ``customers`` distinct
+    customers, like a burst of renewals. The benchmark users' subscription
+    fields and the notifications it queued are reset afterwards.
+    """
+    seed = seed_bench_users(users)
+    assigned = _seed_bench_customers()
+    db.session.commit()
+
+    user_ids = [
+        user_id for (user_id,) in db.session.query(User.id)
+        .filter(User.stripe_customer_id.like('cus_bench_%'))
+        .order_by(db.func.random())
+        .limit(customers)
+    ]
+    customer_ids = [f"cus_bench_{user_id}" for user_id in user_ids]
+    period_end = int(time.time()) + 30 * 24 * 3600
+    burst = [
+        {
+            "id": f"sub_bench_{i}",
+            "object": 'subscription',
+            "customer": random.choice(customer_ids),
+            "status": 'active' if i % 10 else 'past_due',
+            "current_period_end": period_end
+        }
+        for i in range(events)
+    ]
+    run_id = random.getrandbits(32)
+
+    def lookup(i):
+        db.session.query(User.id).filter_by(stripe_customer_id=burst[i]['customer']).limit(1).scalar()
+
+    def handle(i):
+        stripe_events.handle_subscription_updated(burst[i], f"evt_bench_{run_id}_{i}")
+        db.session.commit()
+
+    results = {"users": users, "seed": seed, "customers_assigned": assigned, "events": events,
+               "customers": len(customer_ids)}
+    try:
+        results["indexed_lookup"] = summarize_latencies(_time_calls(lookup, events))
+        for name in ("handler_cold_cache", "handler_warm_cache"):
+            if name == "handler_cold_cache":
+                stripe_events.customer_cache.clear()
+            started = time.perf_counter()
+            samples = _time_calls(handle, events)
+            elapsed = time.perf_counter() - started
+            results[name] = dict(summarize_latencies(samples), events_per_second=round(events / elapsed, 1))
+            run_id += 1
+        results["customer_cache"] = stripe_events.customer_cache.stats()
+        results["plan"] = explain(User.query.filter_by(stripe_customer_id=customer_ids[0]))
+    finally:
+        db.session.rollback()
+        PendingNotification.query.filter(
+            PendingNotification.dedupe_key.like('stripe:evt_bench_%')
+        ).delete(synchronize_session=False)
+        User.query.filter(User.id.in_(user_ids)).update(
+            {"subscription_status": 'free', "subscription_id": None, "current_period_end": None},
+            synchronize_session=False
+        )
+        db.session.commit()
+    return results
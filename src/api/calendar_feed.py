@@ -0,0 +1,147 @@
+# src/api/calendar_feed.py
+"""
+Per-user ICS subscription feed of video sessions.
+
+Calendar apps poll the feed every few minutes, so a request first asks the
+database for a cheap validator (row count, newest ``updated_at`` and highest
+id of the user's feed window, served by the ``(creator_id, expires_at)``
+index). If the client's ``If-None-Match``/``If-Modified-Since`` still matches,
+it gets a 304 without any rows being loaded or rendered. Otherwise the
+VCALENDAR is streamed from a generator that fetches sessions in chunks.
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+from datetime import datetime, timedelta
+
+from api.models import db, User, VideoSession
+from api.calendar_utils import CalendarEvent, ICALENDAR_HEADER, ICALENDAR_FOOTER, event_uid, vevent_cache
+from api import timezone_format
+
+
+FEED_LOOKBACK_DAYS = int(os.getenv('CALENDAR_FEED_LOOKBACK_DAYS', 7))
+FEED_FETCH_SIZE = 200
+# Bump when the VEVENT format changes so clients drop their cached copies
+FEED_FORMAT_VERSION = 2
+FEED_NAME = "devMentor Sessions"
+
+_metrics_lock = threading.Lock()
+metrics = {
+    "requests": 0,
+    "not_modified": 0,
+    "full_renders": 0,
+    "events_rendered": 0,
+    "unknown_token": 0
+}
+
+
+def _count(**increments):
+    with _metrics_lock:
+        for key, value in increments.items():
+            metrics[key] += value
+
+
+def get_feed_token(user, rotate=False):
+    """The user's feed token, created on first use (or replaced when rotating)"""
+    if rotate or not user.calendar_feed_token:
+        user.calendar_feed_token = secrets.token_urlsafe(32)
+        db.session.commit()
+    return user.calendar_feed_token
+
+
+def find_feed_user(token):
+    user = User.query.filter_by(calendar_feed_token=token).first() if token else None
+    if user is None:
+        _count(requests=1, unknown_token=1)
+    return user
+
+
+def _feed_filter(user_id, now):
+    return (
+        VideoSession.creator_id == user_id,
+        VideoSession.expires_at > now - timedelta(days=FEED_LOOKBACK_DAYS)
+    )
+
+
+def feed_validators(user_id, now=None):
+    """
+    ETag and Last-Modified for a user's feed without loading any sessions
+
+    Returns:
+        tuple: (etag, last_modified) where last_modified is an aware UTC datetime or None
+    """
+    now = now or datetime.utcnow()
+    count, last_updated, last_id = db.session.query(
+        db.func.count(VideoSession.id),
+        db.func.max(VideoSession.updated_at),
+        db.func.max(VideoSession.id)
+    ).filter(*_feed_filter(user_id, now)).one()
+    last_modified = timezone_format.to_utc(last_updated) if last_updated else None
+    fingerprint = f"{FEED_FORMAT_VERSION}:{user_id}:{count}:{last_modified}:{last_id}"
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:32], last_modified
+
+
+def is_not_modified(request, etag, last_modified):
+    """Whether the client's cached copy is current (If-None-Match wins over If-Modified-Since)"""
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified:
+        not_modified = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        not_modified = False
+    _count(requests=1, not_modified=1 if not_modified else 0)
+    return not_modified
+
+
+def session_event(row):
+    """CalendarEvent for a feed row (any object with VideoSession's columns)"""
+    start = row.started_at or row.created_at
+    return CalendarEvent(
+        "devMentor Video Session",
+        start,
+        timezone_format.to_utc(start) + timedelta(minutes=row.max_duration_minutes or 50),
+        f"Join your video session: {row.session_url}",
+        row.session_url,
+        uid=event_uid(row.meeting_id),
+        stamp=row.updated_at or row.created_at
+    )
+
+
+def stream_feed(user_id, now=None):
+    """Yield the user's VCALENDAR in chunks, one VEVENT at a time"""
+    now = now or datetime.utcnow()
+    _count(full_renders=1)
+    yield "\r\n".join(ICALENDAR_HEADER + (f"X-WR-CALNAME:{FEED_NAME}",)) + "\r\n"
+
+    rows = (
+        db.session.query(
+            VideoSession.meeting_id,
+            VideoSession.session_url,
+            VideoSession.created_at,
+            VideoSession.started_at,
+            VideoSession.updated_at,
+            VideoSession.max_duration_minutes
+        )
+        .filter(*_feed_filter(user_id, now))
+        .order_by(VideoSession.id)
+        .yield_per(FEED_FETCH_SIZE)
+    )
+    rendered = 0
+    for row in rows:
+        # Unchanged sessions come straight from the content-addressed VEVENT cache
+        yield session_event(row).vevent() + "\r\n"
+        rendered += 1
+    _count(events_rendered=rendered)
+
+    yield "\r\n".join(ICALENDAR_FOOTER) + "\r\n"
+
+
+def feed_stats():
+    with _metrics_lock:
+        stats = dict(metrics)
+    served = stats["requests"] - stats["unknown_token"]
+    stats["not_modified_ratio"] = round(stats["not_modified"] / served, 3) if served else 0.0
+    stats["vevent_cache"] = vevent_cache.stats()
+    return stats
@@ -3,9 +3,229 @@
 Google Calendar integration utilities for DevMentor platform
 """
 
+import hashlib
+import os
+import threading
 import urllib.parse
-from datetime import datetime
-import pytz
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+from api import timezone_format
+
+
+GOOGLE_CALENDAR_BASE_URL = "https://calendar.google.com/calendar/render"
+OUTLOOK_CALENDAR_BASE_URL = "https://outlook.live.com/calendar/0/deeplink/compose"
+ICALENDAR_HEADER = ("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//DevMentor//DevMentor Platform//EN")
+ICALENDAR_FOOTER = ("END:VCALENDAR",)
+ICALENDAR_LINE_LIMIT = 75  # octets, RFC 5545 section 3.1
+
+# Fixed namespace so the same meeting always gets the same UID
+UID_NAMESPACE = uuid.UUID('6dcec551-d4f8-4ddd-9ef7-844cf2a6ae5d')
+UID_DOMAIN = "devmentor"
+
+VEVENT_CACHE_SIZE = int(os.getenv('VEVENT_CACHE_SIZE', 10000))
+
+
+@lru_cache(maxsize=VEVENT_CACHE_SIZE)
+def event_uid(meeting_id):
+    """Deterministic iCalendar UID for a meeting, so re-sent invites update instead of duplicating"""
+    return f"{uuid.uuid5(UID_NAMESPACE, str(meeting_id))}@{UID_DOMAIN}"
+
+
+_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n'})
+
+
+def escape_text(value):
+    """Escape a TEXT property value (RFC 5545 section 3.3.11)"""
+    return value.replace('\r\n', '\n').replace('\r', '\n').translate(_TEXT_ESCAPES)
+
+
+def fold_line(line, limit=ICALENDAR_LINE_LIMIT):
+    """Fold a content line to ``limit`` octets without splitting a UTF-8 character"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= limit:
+        return line
+    parts = []
+    start, width = 0, limit
+    while start < len(encoded):
+        end = min(start + width, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        # Continuation lines start with a space, which counts toward the limit
+        start, width = end, limit - 1
+    return "\r\n ".join(parts)
+
+
+class VEventCache:
+    """Bounded LRU of rendered VEVENT blocks keyed by a digest of their content"""
+
+    def __init__(self, max_entries=VEVENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(fields):
+        return hashlib.sha256("\x1f".join(fields).encode('utf-8')).digest()
+
+    def get_or_render(self, fields, render):
+        key = self.key(fields)
+        with self._lock:
+            block = self._entries.get(key)
+            if block is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return block
+        block = render()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = block
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return block
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+vevent_cache = VEventCache()
+
+
+class CalendarEvent:
+    """
+    A calendar event normalized once to UTC
+
+    Start and end are parsed and converted a single time; each provider's
+    rendering is built on first use and memoized on the instance, so an email
+    that needs the Google, Outlook and iCalendar forms (or a loop rendering
+    many events) never re-parses or re-formats the same timestamps. VEVENT
+    blocks are also shared across instances through ``vevent_cache``.
+    """
+
+    __slots__ = ('title', 'description', 'location', 'start_utc', 'end_utc', 'uid', 'stamp', '_rendered')
+
+    def __init__(self, title, start_time, end_time, description="", location="", uid=None, stamp=None):
+        self.title = title
+        self.description = description or ""
+        self.location = location or ""
+        # Naive datetimes are assumed to be UTC
+        self.start_utc = timezone_format.to_utc(start_time)
+        self.end_utc = timezone_format.to_utc(end_time)
+        # Without an explicit UID/DTSTAMP both are derived from the event itself,
+        # so rendering the same event twice produces the same bytes
+        self.uid = uid or event_uid(f"{title}|{self.start_utc.isoformat()}|{self.end_utc.isoformat()}|{self.location}")
+        self.stamp = timezone_format.to_utc(stamp) if stamp is not None else self.start_utc
+        self._rendered = {}
+
+    def _memo(self, key, build):
+        value = self._rendered.get(key)
+        if value is None:
+            value = self._rendered[key] = build()
+        return value
+
+    @property
+    def compact_times(self):
+        """Start and end as YYYYMMDDTHHMMSSZ (Google and iCalendar format)"""
+        return self._memo('compact', lambda: (
+            self.start_utc.strftime('%Y%m%dT%H%M%SZ'),
+            self.end_utc.strftime('%Y%m%dT%H%M%SZ')
+        ))
+
+    def google_url(self):
+        def build():
+            start_formatted, end_formatted = self.compact_times
+            params = {
+                'action': 'TEMPLATE',
+                'text': self.title,
+                'dates': f"{start_formatted}/{end_formatted}",
+                'details': self.description,
+                'location': self.location
+            }
+            return f"{GOOGLE_CALENDAR_BASE_URL}?{urllib.parse.urlencode(params)}"
+        return self._memo('google', build)
+
+    def outlook_url(self):
+        def build():
+            params = {
+                'subject': self.title,
+                'startdt': self.start_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'enddt': self.end_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'body': self.description,
+                'location': self.location
+            }
+            return f"{OUTLOOK_CALENDAR_BASE_URL}?{urllib.parse.urlencode(params)}"
+        return self._memo('outlook', build)
+
+    def vevent(self):
+        """The folded VEVENT block (CRLF line endings, no trailing CRLF)"""
+        def build():
+            start_formatted, end_formatted = self.compact_times
+            fields = (
+                self.uid,
+                self.stamp.strftime('%Y%m%dT%H%M%SZ'),
+                start_formatted,
+                end_formatted,
+                self.title,
+                self.description,
+                self.location
+            )
+
+            def render():
+                lines = (
+                    "BEGIN:VEVENT",
+                    f"UID:{fields[0]}",
+                    f"DTSTAMP:{fields[1]}",
+                    f"DTSTART:{start_formatted}",
+                    f"DTEND:{end_formatted}",
+                    f"SUMMARY:{escape_text(self.title)}",
+                    f"DESCRIPTION:{escape_text(self.description)}",
+                    f"LOCATION:{escape_text(self.location)}",
+                    "END:VEVENT"
+                )
+                return "\r\n".join(fold_line(line) for line in lines)
+            return vevent_cache.get_or_render(fields, render)
+        return self._memo('vevent', build)
+
+    def icalendar_content(self):
+        return self._memo('ical', lambda: "\r\n".join(ICALENDAR_HEADER + (self.vevent(),) + ICALENDAR_FOOTER))
+
+    def calendar_urls(self):
+        return {
+            'google': self.google_url(),
+            'outlook': self.outlook_url(),
+            'ical_content': self.icalendar_content()
+        }
+
+
+def render_calendar_urls(events):
+    """
+    Calendar URLs for many events in one pass
+
+    Args:
+        events (iterable): CalendarEvent instances, or
+            ``(event_title, start_time, end_time, description, location)`` tuples
+
+    Returns:
+        list[dict]: One ``get_calendar_urls`` result per event, in order
+    """
+    return [
+        (event if isinstance(event, CalendarEvent) else CalendarEvent(*event)).calendar_urls()
+        for event in events
+    ]
 
 
 def generate_google_calendar_url(event_title, start_time, end_time, description="", location=""):
@@ -22,44 +242,7 @@ def generate_google_calendar_url(event_title, start_time, end_time, description=
     Returns:
         str: Google Calendar URL for adding the event
     """
-    # Handle both string and datetime inputs
-    if isinstance(start_time, str):
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-    else:
-        start_dt = start_time
-    
-    if isinstance(end_time, str):
-        end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-    else:
-        end_dt = end_time
-    
-    # Ensure timezone awareness - assume UTC if no timezone info
-    if start_dt.tzinfo is None:
-        start_dt = pytz.utc.localize(start_dt)
-    if end_dt.tzinfo is None:
-        end_dt = pytz.utc.localize(end_dt)
-    
-    # Convert to UTC for Google Calendar consistency
-    start_dt_utc = start_dt.astimezone(pytz.utc)
-    end_dt_utc = end_dt.astimezone(pytz.utc)
-    
-    # Format for Google Calendar (YYYYMMDDTHHMMSSZ format)
-    start_formatted = start_dt_utc.strftime('%Y%m%dT%H%M%SZ')
-    end_formatted = end_dt_utc.strftime('%Y%m%dT%H%M%SZ')
-    
-    # Build the URL parameters
-    params = {
-        'action': 'TEMPLATE',
-        'text': event_title,
-        'dates': f"{start_formatted}/{end_formatted}",
-        'details': description,
-        'location': location
-    }
-    
-    # Generate the final URL
-    base_url = "https://calendar.google.com/calendar/render"
-    query_string = urllib.parse.urlencode(params)
-    return f"{base_url}?{query_string}"
+    return CalendarEvent(event_title, start_time, end_time, description, location).google_url()
 
 
 def generate_outlook_calendar_url(event_title, start_time, end_time, description="", location=""):
@@ -76,44 +259,7 @@ def generate_outlook_calendar_url(event_title, start_time, end_time, description
     Returns:
         str: Outlook Calendar URL for adding the event
     """
-    # Handle both string and datetime inputs
-    if isinstance(start_time, str):
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-    else:
-        start_dt = start_time
-    
-    if isinstance(end_time, str):
-        end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-    else:
-        end_dt = end_time
-    
-    # Ensure timezone awareness
-    if start_dt.tzinfo is None:
-        start_dt = pytz.utc.localize(start_dt)
-    if end_dt.tzinfo is None:
-        end_dt = pytz.utc.localize(end_dt)
-    
-    # Convert to UTC
-    start_dt_utc = start_dt.astimezone(pytz.utc)
-    end_dt_utc = end_dt.astimezone(pytz.utc)
-    
-    # Format for Outlook (ISO format)
-    start_formatted = start_dt_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-    end_formatted = end_dt_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-    
-    # Build the URL parameters
-    params = {
-        'subject': event_title,
-        'startdt': start_formatted,
-        'enddt': end_formatted,
-        'body': description,
-        'location': location
-    }
-    
-    # Generate the final URL
-    base_url = "https://outlook.live.com/calendar/0/deeplink/compose"
-    query_string = urllib.parse.urlencode(params)
-    return f"{base_url}?{query_string}"
+    return CalendarEvent(event_title, start_time, end_time, description, location).outlook_url()
 
 
 def generate_icalendar_content(event_title, start_time, end_time, description="", location=""):
@@ -130,54 +276,7 @@ def generate_icalendar_content(event_title, start_time, end_time, description=""
     Returns:
         str: iCalendar file content
     """
-    # Handle both string and datetime inputs
-    if isinstance(start_time, str):
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-    else:
-        start_dt = start_time
-    
-    if isinstance(end_time, str):
-        end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-    else:
-        end_dt = end_time
-    
-    # Ensure timezone awareness
-    if start_dt.tzinfo is None:
-        start_dt = pytz.utc.localize(start_dt)
-    if end_dt.tzinfo is None:
-        end_dt = pytz.utc.localize(end_dt)
-    
-    # Convert to UTC
-    start_dt_utc = start_dt.astimezone(pytz.utc)
-    end_dt_utc = end_dt.astimezone(pytz.utc)
-    
-    # Format for iCalendar
-    start_formatted = start_dt_utc.strftime('%Y%m%dT%H%M%SZ')
-    end_formatted = end_dt_utc.strftime('%Y%m%dT%H%M%SZ')
-    created_formatted = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-    
-    # Generate unique UID
-    import uuid
-    uid = str(uuid.uuid4())
-    
-    # Clean description for iCalendar format
-    description_clean = description.replace('\n', '\\n').replace(',', '\\,').replace(';', '\\;')
-    
-    ical_content = f"""BEGIN:VCALENDAR
-VERSION:2.0
-PRODID:-//DevMentor//DevMentor Platform//EN
-BEGIN:VEVENT
-UID:{uid}
-DTSTAMP:{created_formatted}
-DTSTART:{start_formatted}
-DTEND:{end_formatted}
-SUMMARY:{event_title}
-DESCRIPTION:{description_clean}
-LOCATION:{location}
-END:VEVENT
-END:VCALENDAR"""
-    
-    return ical_content
+    return CalendarEvent(event_title, start_time, end_time, description, location).icalendar_content()
 
 
 def get_calendar_urls(event_title, start_time, end_time, description="", location=""):
@@ -194,8 +293,5 @@ def get_calendar_urls(event_title, start_time, end_time, description="", locatio
     Returns:
         dict: Dictionary containing URLs for different calendar providers
     """
-    return {
-        'google': generate_google_calendar_url(event_title, start_time, end_time, description, location),
-        'outlook': generate_outlook_calendar_url(event_title, start_time, end_time, description, location),
-        'ical_content': generate_icalendar_content(event_title, start_time, end_time, description, location)
-    }
\ No newline at end of file
+    # One parse shared by all three providers
+    return CalendarEvent(event_title, start_time, end_time, description, location).calendar_urls()
@@ -32,7 +32,19 @@
 #     def insert_test_data():
 #         pass
 
-from api.models import db, Mentor, Customer, PortfolioPhoto
+import json
+import random
+import time
+import click
+from flask.cli import AppGroup
+from api.models import db, User
+from api.user_provisioning import bulk_upsert_users, read_user_file, DEFAULT_BATCH_SIZE, DEFAULT_HASH_WORKERS
+from api import benchmarks
+from api.email_outbox import create_outbox_pool
+from api.smtp_sink import SMTPSink
+from api.stripe_stub import StripeStub
+from api.stripe_reconcile import reconcile_subscriptions, RECONCILE_BATCH_SIZE
+from api.notifications import fan_out, SessionExpiringCampaign, RecordingReadyCampaign, FANOUT_BATCH_SIZE
 
 #from api.utils import APIException
 
@@ -42,4 +54,174 @@ def setup_commands(app):
     def insert_test_data():
         # Clear existing data
         db.session.commit()
-        print("Test data inserted successfully.")
\ No newline at end of file
+        print("Test data inserted successfully.")
+
+    """
+    Bulk-provision users from a CSV (header: email,first_name,last_name,phone,password)
+    or a JSON list: $ flask import-users users.csv --batch-size 2000
+    """
+    @app.cli.command("import-users")
+    @click.argument("path")
+    @click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, help="Rows per INSERT statement")
+    @click.option("--workers", default=DEFAULT_HASH_WORKERS, show_default=True, help="Password hashing threads")
+    @click.option("--skip-existing", is_flag=True, help="Leave users that already exist untouched")
+    def import_users(path, batch_size, workers, skip_existing):
+        stats = bulk_upsert_users(
+            read_user_file(path),
+            batch_size=batch_size,
+            hash_workers=workers,
+            update_existing=not skip_existing
+        )
+        print(f"Imported {stats['received']} users in {stats['batches']} batches "
+              f"({stats['elapsed_seconds']}s, {stats['users_per_second']} users/s; "
+              f"hashing {stats['hash_seconds']}s, database {stats['db_seconds']}s)")
+
+    """
+    Dedicated email delivery process, e.g. a separate worker service:
+    $ flask outbox-worker
+    """
+    @app.cli.command("outbox-worker")
+    def outbox_worker():
+        print("Draining email outbox (Ctrl+C to stop)")
+        create_outbox_pool(app).run_forever()
+
+    """
+    Bulk notifications, safe to re-run (recipients are never notified twice):
+    $ flask notify session-expiring --lead-minutes 10
+    $ flask notify recording-ready --since-hours 24
+    """
+    notify = AppGroup("notify", help="Send bulk notifications")
+
+    @notify.command("session-expiring")
+    @click.option("--lead-minutes", default=10, show_default=True, help="Notify sessions ending within this many minutes")
+    @click.option("--batch-size", default=FANOUT_BATCH_SIZE, show_default=True)
+    @click.option("--dry-run", is_flag=True, help="Only count recipients")
+    def notify_session_expiring(lead_minutes, batch_size, dry_run):
+        stats = fan_out(SessionExpiringCampaign(lead_minutes=lead_minutes), batch_size=batch_size, dry_run=dry_run)
+        print(json.dumps(stats, indent=2))
+
+    @notify.command("recording-ready")
+    @click.option("--since-hours", default=24, show_default=True, help="Only sessions created in this window")
+    @click.option("--batch-size", default=FANOUT_BATCH_SIZE, show_default=True)
+    @click.option("--dry-run", is_flag=True, help="Only count recipients")
+    def notify_recording_ready(since_hours, batch_size, dry_run):
+        stats = fan_out(RecordingReadyCampaign(lookback_hours=since_hours), batch_size=batch_size, dry_run=dry_run)
+        print(json.dumps(stats, indent=2))
+
+    app.cli.add_command(notify)
+
+    """
+    Stripe maintenance, resumable and safe to re-run:
+    $ flask stripe reconcile --dry-run
+    """
+    stripe_group = AppGroup("stripe", help="Stripe maintenance jobs")
+
+    @stripe_group.command("reconcile")
+    @click.option("--batch-size", default=RECONCILE_BATCH_SIZE, show_default=True, help="Subscriptions per transaction")
+    @click.option("--restart", is_flag=True, help="Start over instead of resuming an unfinished run")
+    @click.option("--dry-run", is_flag=True, help="Only count drift")
+    def stripe_reconcile(batch_size, restart, dry_run):
+        stats = reconcile_subscriptions(batch_size=batch_size, resume=not restart, dry_run=dry_run)
+        print(json.dumps(stats, indent=2))
+
+    app.cli.add_command(stripe_group)
+
+    """
+    Benchmarks for hot paths: $ flask bench <name> [options]
+    """
+    bench = AppGroup("bench", help="Run performance benchmarks")
+
+    @bench.command("email-lookup")
+    @click.option("--users", default=1000000, show_default=True, help="Size of the seeded user table")
+    @click.option("--lookups", default=10000, show_default=True)
+    def bench_email_lookup(users, lookups):
+        print(json.dumps(benchmarks.bench_email_lookup(users=users, lookups=lookups), indent=2))
+
+    @bench.command("email-render")
+    @click.option("--count", default=1000, show_default=True, help="Emails rendered in the bulk run")
+    def bench_email_render(count):
+        print(json.dumps(benchmarks.bench_email_render(count=count), indent=2))
+
+    @bench.command("timezone-format")
+    @click.option("--sessions", default=10000, show_default=True, help="(start, end, zone) tuples to format")
+    @click.option("--slots", default=50, show_default=True, help="Distinct session start times")
+    def bench_timezone_format(sessions, slots):
+        print(json.dumps(benchmarks.bench_timezone_format(sessions=sessions, slots=slots), indent=2))
+
+    @bench.command("calendar-events")
+    @click.option("--count", default=10000, show_default=True, help="Events rendered per path")
+    def bench_calendar_events(count):
+        print(json.dumps(benchmarks.bench_calendar_events(count=count), indent=2))
+
+    @bench.command("stripe-webhooks")
+    @click.option("--users", default=100000, show_default=True, help="Size of the seeded user table")
+    @click.option("--events", default=5000, show_default=True, help="Subscription events handled per pass")
+    @click.option("--customers", default=1000, show_default=True, help="Distinct customers in the burst")
+    def bench_stripe_webhooks(users, events, customers):
+        print(json.dumps(benchmarks.bench_stripe_webhooks(users=users, events=events, customers=customers), indent=2))
+
+    @bench.command("email-throughput")
+    @click.option("--count", default=1000, show_default=True, help="Emails to enqueue")
+    @click.option("--workers", default=2, show_default=True, help="Outbox worker threads")
+    @click.option("--batch-size", default=50, show_default=True)
+    @click.option("--pool-size", default=2, show_default=True, help="Pooled SMTP connections")
+    @click.option("--latency-ms", default=0.0, show_default=True, help="Sink delay before acknowledging a message")
+    @click.option("--connect-latency-ms", default=0.0, show_default=True, help="Sink delay before its greeting")
+    @click.option("--disconnect-rate", default=0.0, show_default=True)
+    @click.option("--temp-fail-rate", default=0.0, show_default=True, help="Share of messages answered with 451")
+    @click.option("--perm-fail-rate", default=0.0, show_default=True, help="Share of messages answered with 550")
+    def bench_email_throughput(**options):
+        print(json.dumps(benchmarks.bench_email_throughput(**options), indent=2))
+
+    """
+    Local SMTP server that records mail instead of sending it:
+    $ flask smtp-sink --port 1025  (then MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_USE_SSL=false)
+    """
+    @app.cli.command("smtp-sink")
+    @click.option("--port", default=1025, show_default=True)
+    @click.option("--latency-ms", default=0.0, show_default=True)
+    @click.option("--disconnect-rate", default=0.0, show_default=True)
+    @click.option("--temp-fail-rate", default=0.0, show_default=True)
+    @click.option("--perm-fail-rate", default=0.0, show_default=True)
+    def smtp_sink(port, latency_ms, disconnect_rate, temp_fail_rate, perm_fail_rate):
+        sink = SMTPSink(port=port, latency=latency_ms / 1000.0, disconnect_rate=disconnect_rate,
+                        temp_fail_rate=temp_fail_rate, perm_fail_rate=perm_fail_rate).start()
+        print(f"✅ SMTP sink listening on {sink.host}:{sink.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(10)
+                print(f"SMTP sink: {sink.stats()}")
+        except KeyboardInterrupt:
+            sink.stop()
+
+    """
+    Local Stripe subscriptions API, seeded from the users' customer IDs:
+    $ flask stripe-stub --port 12111 --drift-rate 0.1  (then STRIPE_API_BASE=http://127.0.0.1:12111)
+    """
+    @app.cli.command("stripe-stub")
+    @click.option("--port", default=12111, show_default=True)
+    @click.option("--drift-rate", default=0.0, show_default=True, help="Share of subscriptions that disagree with the user")
+    @click.option("--latency-ms", default=0.0, show_default=True)
+    @click.option("--error-rate", default=0.0, show_default=True, help="Share of requests answered with a 500")
+    def stripe_stub(port, drift_rate, latency_ms, error_rate):
+        stub = StripeStub(port=port, latency=latency_ms / 1000.0, error_rate=error_rate)
+        rng = random.Random(0)
+        customers = db.session.query(User.stripe_customer_id, User.subscription_status, User.subscription_id) \
+            .filter(User.stripe_customer_id.isnot(None)).order_by(User.id)
+        for customer_id, status, subscription_id in customers:
+            active = status == 'premium'
+            if rng.random() < drift_rate:
+                active = not active
+            stub.add_subscription(customer_id, status='active' if active else 'canceled',
+                                  subscription_id=subscription_id)
+        stub.start()
+        print(f"✅ Stripe stub listening on {stub.api_base} with {stub.stats()['subscriptions']} subscriptions "
+              f"(Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(10)
+                print(f"Stripe stub: {stub.stats()}")
+        except KeyboardInterrupt:
+            stub.stop()
+
+    app.cli.add_command(bench)
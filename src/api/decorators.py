@@ -2,7 +2,7 @@
 from functools import wraps
 from flask import jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
-from .models import User
+from .entitlements import entitlement_for
 
 def mentor_required(fn):
     @wraps(fn)
@@ -32,13 +32,13 @@ def premium_required(fn):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        # Get user from database
-        user = User.query.get(user_id)
-        if not user:
+        # Memoized, evaluated locally from the subscription fields
+        entitlement = entitlement_for(user_id)
+        if entitlement is None:
             return jsonify(msg="User not found"), 404
         
-        # Check if user has premium subscription
-        if user.subscription_status != 'premium':
+        # Check if user has premium subscription (paid period or grace window)
+        if not entitlement.allows('premium'):
             return jsonify(msg="Premium subscription required for recording features"), 403
         
         return fn(*args, **kwargs)
@@ -50,13 +50,13 @@ def recording_required(fn):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        # Get user from database
-        user = User.query.get(user_id)
-        if not user:
+        # Memoized, evaluated locally from the subscription fields
+        entitlement = entitlement_for(user_id)
+        if entitlement is None:
             return jsonify(msg="User not found"), 404
         
         # Check if user has recording access (only 'recordings' tier)
-        if user.subscription_status != 'recordings':
+        if not entitlement.allows('recordings'):
             return jsonify(msg="Recording subscription required for this feature"), 403
         
         return fn(*args, **kwargs)
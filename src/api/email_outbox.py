@@ -0,0 +1,121 @@
+# src/api/email_outbox.py
+"""
+Durable outbox for outgoing email.
+
+``enqueue_email`` only writes a row, so request handlers never wait on SMTP.
+Background workers claim due rows in batches, deliver each batch over one SMTP
+connection, and reschedule failures with exponential backoff until
+``OUTBOX_MAX_ATTEMPTS`` is reached.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from api.models import db, EmailOutbox
+from api.mail_transport import deliver_batch, smtp_pool
+from api.workers import BackgroundWorkerPool
+
+
+OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', 2))
+OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+OUTBOX_BASE_BACKOFF_SECONDS = 30
+OUTBOX_MAX_BACKOFF_SECONDS = 3600
+# A row stuck in 'sending' this long belongs to a worker that died mid-batch
+OUTBOX_STALE_LOCK_SECONDS = 600
+
+outbox_pool = None
+
+
+def enqueue_email(to_email, subject, html_content, commit=True):
+    """Persist an email for background delivery and return the outbox row"""
+    entry = EmailOutbox(to_email=to_email, subject=subject, html_content=html_content)
+    db.session.add(entry)
+    if commit:
+        db.session.commit()
+        if outbox_pool is not None:
+            outbox_pool.wake()
+    return entry
+
+
+def claim_batch(worker_id, batch_size=OUTBOX_BATCH_SIZE, now=None):
+    """
+    Mark up to ``batch_size`` due rows as sending for ``worker_id``.
+
+    The claim is a conditional UPDATE on the still-pending rows, so two workers
+    racing for the same ids each only get the rows their UPDATE actually won.
+    """
+    now = now or datetime.utcnow()
+    stale_before = now - timedelta(seconds=OUTBOX_STALE_LOCK_SECONDS)
+    due = db.or_(
+        db.and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+        db.and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale_before)
+    )
+    candidate_ids = [
+        row_id for (row_id,) in db.session.query(EmailOutbox.id)
+        .filter(due)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+    ]
+    if not candidate_ids:
+        return []
+
+    EmailOutbox.query.filter(EmailOutbox.id.in_(candidate_ids), due).update(
+        {"status": 'sending', "locked_by": worker_id, "locked_at": now},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return EmailOutbox.query.filter(
+        EmailOutbox.id.in_(candidate_ids),
+        EmailOutbox.status == 'sending',
+        EmailOutbox.locked_by == worker_id
+    ).order_by(EmailOutbox.id).all()
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(OUTBOX_BASE_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def process_outbox_batch(worker_id, batch_size=OUTBOX_BATCH_SIZE, pool=None):
+    """Claim, deliver and record one batch. Returns the number of rows handled."""
+    batch = claim_batch(worker_id, batch_size)
+    if not batch:
+        return 0
+
+    results = deliver_batch([(e.to_email, e.subject, e.html_content) for e in batch], pool=pool)
+
+    now = datetime.utcnow()
+    for entry, error in zip(batch, results):
+        entry.attempts += 1
+        entry.locked_by = None
+        entry.locked_at = None
+        if error is None:
+            entry.status = 'sent'
+            entry.sent_at = now
+            entry.last_error = None
+        elif entry.attempts >= OUTBOX_MAX_ATTEMPTS:
+            entry.status = 'failed'
+            entry.last_error = error
+            print(f"❌ Giving up on outbox email {entry.id} to {entry.to_email}: {error}")
+        else:
+            entry.status = 'pending'
+            entry.next_attempt_at = now + retry_delay(entry.attempts)
+            entry.last_error = error
+    db.session.commit()
+    return len(batch)
+
+
+def outbox_stats():
+    counts = dict(
+        db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all()
+    )
+    stats = {"queue": counts, "smtp": smtp_pool.stats()}
+    if outbox_pool is not None:
+        stats["workers"] = outbox_pool.stats()
+    return stats
+
+
+def create_outbox_pool(app, num_workers=OUTBOX_WORKERS):
+    global outbox_pool
+    outbox_pool = BackgroundWorkerPool(app, 'email-outbox', process_outbox_batch, num_workers=num_workers)
+    return outbox_pool
@@ -0,0 +1,670 @@
+# src/api/email_templates.py
+"""
+Precompiled HTML email templates.
+
+Each template is split once, at import, into its static chunks (markup, CSS)
+and the names of the per-recipient fields between them. Rendering is then a
+single join over the cached chunks with the escaped field values, instead of
+rebuilding several hundred lines of f-string for every email.
+
+Placeholders are written as ``{{ name }}``. Values are HTML-escaped unless they
+are ``Markup`` (pre-rendered fragments such as the timezone block).
+"""
+
+import re
+
+from markupsafe import Markup, escape
+
+
+_PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class CompiledTemplate:
+    """A template pre-split into static chunks and field names"""
+
+    __slots__ = ('name', '_chunks', '_fields', 'fields')
+
+    def __init__(self, name, source):
+        self.name = name
+        parts = _PLACEHOLDER.split(source)
+        # parts alternates: static, field, static, field, ..., static
+        self._chunks = parts[0::2]
+        self._fields = parts[1::2]
+        self.fields = frozenset(self._fields)
+
+    def render(self, **values):
+        missing = self.fields.difference(values)
+        if missing:
+            raise KeyError(f"Template {self.name} is missing fields: {sorted(missing)}")
+        chunks = self._chunks
+        out = [chunks[0]]
+        for index, field in enumerate(self._fields):
+            out.append(escape(values[field]))
+            out.append(chunks[index + 1])
+        return Markup(''.join(out))
+
+
+_registry = {}
+
+
+def register_template(name, source):
+    template = CompiledTemplate(name, source)
+    _registry[name] = template
+    return template
+
+
+def get_template(name):
+    return _registry[name]
+
+
+def render(name, **values):
+    """Render a registered template to an HTML string"""
+    return str(_registry[name].render(**values))
+
+
+# ===========================================
+# TEMPLATE SOURCES (compiled at import)
+# ===========================================
+
+register_template('verification_code', """
+    <div style="font-family: Arial, sans-serif; color: #333;">
+        <h2>Welcome to devMentor!</h2>
+        <p>Your verification code is:</p>
+        <p style="font-size: 24px; font-weight: bold; letter-spacing: 2px;">{{ code }}</p>
+        <p>Please use this code to complete your registration.</p>
+        <p>If you did not request this, please ignore this email.</p>
+        <br>
+        <p>Best,</p>
+        <p>The devMentor Team</p>
+    </div>
+    """)
+
+register_template('timezone_single', """
+        <div class="detail-value">
+            {{ primary_display }}
+        </div>
+        """)
+
+register_template('timezone_dual', """
+        <div class="detail-value">
+            {{ primary_display }}<br>
+            {{ secondary_display }}
+        </div>
+        """)
+
+register_template('booking_meeting_section', """
+                <div class="meeting-section">
+                    <h3 style="margin-top: 0; color: #28a745;">🎥 Meeting Link</h3>
+                    <p>Join your session using the link below:</p>
+                    <a href="{{ meeting_url }}" class="btn btn-success" target="_blank" style="display: inline-block; background: #28a745; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px; margin: 10px 0;">Join Meeting</a>
+                </div>
+                """)
+
+register_template('booking_confirmation', """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Booking Confirmed</title>
+        <style>
+            body {
+                margin: 0;
+                padding: 0;
+                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                background-color: #f8f9fa;
+                line-height: 1.6;
+            }
+            .container {
+                max-width: 600px;
+                margin: 0 auto;
+                background-color: #ffffff;
+                border-radius: 12px;
+                overflow: hidden;
+                box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1);
+            }
+            .header {
+                background: linear-gradient(135deg, #28a745 0%, #20c997 100%);
+                color: white;
+                padding: 40px 30px;
+                text-align: center;
+            }
+            .header h1 {
+                margin: 0;
+                font-size: 28px;
+                font-weight: 600;
+            }
+            .checkmark {
+                width: 60px;
+                height: 60px;
+                border-radius: 50%;
+                background: rgba(255, 255, 255, 0.2);
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                margin: 0 auto 20px;
+                font-size: 30px;
+                font-weight: bold;
+            }
+            .content {
+                padding: 40px 30px;
+            }
+            .session-card {
+                background: #f8f9fa;
+                border-radius: 8px;
+                padding: 25px;
+                margin: 25px 0;
+                border-left: 4px solid #28a745;
+            }
+            .session-title {
+                font-size: 18px;
+                font-weight: 600;
+                color: #495057;
+                margin-bottom: 20px;
+                text-align: center;
+            }
+            .detail-row {
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                margin-bottom: 15px;
+                padding-bottom: 10px;
+                border-bottom: 1px solid #e9ecef;
+            }
+            .detail-row:last-child {
+                border-bottom: none;
+                margin-bottom: 0;
+            }
+            .detail-label {
+                font-weight: 600;
+                color: #495057;
+                min-width: 120px;
+            }
+            .detail-value {
+                color: #28a745;
+                font-weight: 500;
+                text-align: right;
+            }
+            .timezone-row {
+                margin-bottom: 15px;
+                padding-bottom: 15px;
+                border-bottom: 1px solid #e9ecef;
+            }
+            .booking-ref {
+                background: #e3f2fd;
+                padding: 12px;
+                border-radius: 6px;
+                text-align: center;
+                margin: 20px 0;
+                font-family: monospace;
+                font-weight: bold;
+                color: #1976d2;
+            }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <div class="checkmark">✓</div>
+                <h1>Booking Confirmed!</h1>
+                <p style="margin: 0; opacity: 0.9;">Your session is successfully scheduled</p>
+            </div>
+            
+            <div class="content">
+                <div class="greeting">
+                    Hi {{ customer_name }},
+                </div>
+                
+                <p>Great news! Your mentoring session with <strong>{{ mentor_name }}</strong> has been successfully confirmed and paid for.</p>
+                
+                <div class="session-card">
+                    <div class="session-title">📅 Session Details</div>
+                    <div class="detail-row">
+                        <span class="detail-label">Date:</span>
+                        <span class="detail-value">{{ formatted_date }}</span>
+                    </div>
+                    <div class="timezone-row">
+                        <div class="detail-label" style="margin-bottom: 10px;">Start Time:</div>
+                        {{ time_html }}
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Duration:</span>
+                        <span class="detail-value">{{ session_duration }} minutes</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Mentor:</span>
+                        <span class="detail-value">{{ mentor_name }}</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Amount Paid:</span>
+                        <span class="detail-value">${{ amount_paid }}</span>
+                    </div>
+                </div>
+                
+                <div class="booking-ref">
+                    Booking Reference: #{{ booking_id }}
+                </div>
+                
+                <div class="calendar-buttons">
+                    <p style="margin-bottom: 15px; color: #666; font-weight: 600;">Add to your calendar:</p>
+                    <a href="{{ google_calendar_url }}" class="calendar-button google-calendar" target="_blank">
+                        📅 Google Calendar
+                    </a>
+                    <a href="{{ outlook_calendar_url }}" class="calendar-button outlook-calendar" target="_blank">
+                        📅 Outlook Calendar
+                    </a>
+                </div>
+                
+                {{ meeting_section }}
+                
+                <div class="next-steps">
+                    <h3 style="margin-top: 0; color: #856404;">📋 Next Steps</h3>
+                    <ul>
+                        <li>Add this session to your calendar using the links above</li>
+                        <li>Join the meeting 5 minutes early</li>
+                        <li>Prepare any questions or topics you'd like to discuss</li>
+                    </ul>
+                </div>
+                
+                <p style="margin-top: 30px;">
+                    Looking forward to your session! If you need to reschedule or have any questions, 
+                    please contact us as soon as possible.
+                </p>
+                
+                <p style="color: #666;">
+                    Best regards,<br>
+                    <strong>The DevMentor Team</strong>
+                </p>
+            </div>
+            
+            <div class="footer">
+                <p style="margin: 0; font-size: 14px;">
+                    This email was sent to {{ customer_email }}<br>
+                    © 2025 DevMentor. All rights reserved.
+                </p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+
+register_template('mentor_meeting_section', """
+                <div class="student-info">
+                    <h3 style="margin-top: 0; color: #28a745;">🎥 Meeting Link</h3>
+                    <p>Your meeting room is ready:</p>
+                    <a href="{{ meeting_url }}" style="color: #0066cc; word-break: break-all;" target="_blank">{{ meeting_url }}</a>
+                </div>
+                """)
+
+register_template('mentor_meeting_setup', """
+                <div class="student-info">
+                    <h3 style="margin-top: 0; color: #28a745;">🎥 Meeting Setup</h3>
+                    <p>Please create a meeting room in your dashboard before the session starts.</p>
+                </div>
+                """)
+
+register_template('mentor_meeting_action_item', """<li>Set up the meeting room: {{ meeting_url }}</li>""")
+
+register_template('mentor_booking_notification', """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>New Student Booking</title>
+        <style>
+            body {
+                margin: 0;
+                padding: 0;
+                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                background-color: #f8f9fa;
+                line-height: 1.6;
+            }
+            .container {
+                max-width: 600px;
+                margin: 0 auto;
+                background-color: #ffffff;
+                border-radius: 12px;
+                overflow: hidden;
+                box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1);
+            }
+            .header {
+                background: linear-gradient(135deg, #007bff 0%, #0056b3 100%);
+                color: white;
+                padding: 40px 30px;
+                text-align: center;
+            }
+            .header h1 {
+                margin: 0;
+                font-size: 28px;
+                font-weight: 600;
+            }
+            .icon {
+                width: 60px;
+                height: 60px;
+                border-radius: 50%;
+                background: rgba(255, 255, 255, 0.2);
+                margin: 0 auto 20px;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                font-size: 30px;
+            }
+            .content {
+                padding: 40px 30px;
+            }
+            .greeting {
+                font-size: 18px;
+                color: #333;
+                margin-bottom: 20px;
+            }
+            .session-card {
+                background: #f8f9fa;
+                border-left: 4px solid #007bff;
+                padding: 25px;
+                margin: 25px 0;
+                border-radius: 8px;
+            }
+            .session-title {
+                font-size: 20px;
+                font-weight: 600;
+                color: #333;
+                margin-bottom: 15px;
+            }
+            .detail-row {
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                padding: 8px 0;
+                border-bottom: 1px solid #e9ecef;
+            }
+            .detail-row:last-child {
+                border-bottom: none;
+            }
+            .detail-label {
+                font-weight: 600;
+                color: #666;
+            }
+            .detail-value {
+                color: #333;
+                font-weight: 500;
+            }
+            .timezone-row {
+                background: #e8f5e8;
+                padding: 15px;
+                border-radius: 6px;
+                margin: 15px 0;
+            }
+            .timezone-row .detail-value {
+                font-size: 14px;
+                line-height: 1.5;
+            }
+            .calendar-buttons {
+                text-align: center;
+                margin: 25px 0;
+            }
+            .calendar-button {
+                display: inline-block;
+                padding: 12px 24px;
+                margin: 5px;
+                text-decoration: none;
+                border-radius: 8px;
+                font-weight: 600;
+                font-size: 14px;
+                transition: all 0.3s ease;
+                color: white;
+            }
+            .google-calendar {
+                background: linear-gradient(135deg, #4285f4 0%, #34a853 100%);
+                box-shadow: 0 4px 15px rgba(66, 133, 244, 0.3);
+            }
+            .outlook-calendar {
+                background: linear-gradient(135deg, #0078d4 0%, #106ebe 100%);
+                box-shadow: 0 4px 15px rgba(0, 120, 212, 0.3);
+            }
+            .calendar-button:hover {
+                transform: translateY(-2px);
+                text-decoration: none;
+                color: white;
+            }
+            .google-calendar:hover {
+                box-shadow: 0 6px 20px rgba(66, 133, 244, 0.4);
+            }
+            .outlook-calendar:hover {
+                box-shadow: 0 6px 20px rgba(0, 120, 212, 0.4);
+            }
+            .meeting-section {
+                background: #e8f5e8;
+                padding: 20px;
+                border-radius: 8px;
+                margin: 20px 0;
+                text-align: center;
+            }
+            .meeting-url {
+                background: white;
+                padding: 12px;
+                border-radius: 6px;
+                font-family: monospace;
+                word-break: break-all;
+                margin: 10px 0;
+                color: #0066cc;
+                text-decoration: none;
+                display: block;
+            }
+            .payout-section {
+                background: #d4edda;
+                padding: 20px;
+                border-radius: 8px;
+                margin: 20px 0;
+                text-align: center;
+                border: 1px solid #c3e6cb;
+            }
+            .payout-amount {
+                font-size: 24px;
+                font-weight: bold;
+                color: #155724;
+                margin: 10px 0;
+            }
+            .action-items {
+                background: #fff3cd;
+                border: 1px solid #ffeaa7;
+                border-radius: 8px;
+                padding: 20px;
+                margin: 25px 0;
+            }
+            .action-items h3 {
+                color: #856404;
+                margin-top: 0;
+            }
+            .action-items ul {
+                color: #856404;
+                margin: 0;
+                padding-left: 20px;
+            }
+            .footer {
+                background: #f8f9fa;
+                padding: 30px;
+                text-align: center;
+                color: #666;
+                border-top: 1px solid #e9ecef;
+            }
+            .booking-ref {
+                background: #e3f2fd;
+                padding: 12px;
+                border-radius: 6px;
+                text-align: center;
+                margin: 20px 0;
+                font-family: monospace;
+                font-weight: bold;
+                color: #1976d2;
+            }
+            .student-info {
+                background: #e8f5e8;
+                padding: 20px;
+                border-radius: 8px;
+                margin: 20px 0;
+            }
+            @media (max-width: 600px) {
+                .container {
+                    margin: 0;
+                    border-radius: 0;
+                }
+                .content, .header, .footer {
+                    padding: 20px;
+                }
+                .detail-row {
+                    flex-direction: column;
+                    align-items: flex-start;
+                }
+                .detail-value {
+                    margin-top: 5px;
+                }
+                .calendar-button {
+                    display: block;
+                    margin: 10px auto;
+                    width: 80%;
+                }
+            }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <div class="icon">🎓</div>
+                <h1>New Student Booking!</h1>
+                <p style="margin: 0; opacity: 0.9;">You have a new mentoring session</p>
+            </div>
+            
+            <div class="content">
+                <div class="greeting">
+                    Hi {{ mentor_name }},
+                </div>
+                
+                <p>Great news! <strong>{{ customer_name }}</strong> has booked a mentoring session with you. Here are the details:</p>
+                
+                <div class="session-card">
+                    <div class="session-title">📅 Session Details</div>
+                    <div class="detail-row">
+                        <span class="detail-label">Date:</span>
+                        <span class="detail-value">{{ formatted_date }}</span>
+                    </div>
+                    <div class="timezone-row">
+                        <div class="detail-label" style="margin-bottom: 10px;">Time:</div>
+                        <div class="detail-value">
+                            {{ time_html }}
+                        </div>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Duration:</span>
+                        <span class="detail-value">{{ session_duration }} minutes</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Student:</span>
+                        <span class="detail-value">{{ customer_name }}</span>
+                    </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Student Email:</span>
+                        <span class="detail-value">{{ customer_email }}</span>
+                    </div>
+                </div>
+                
+                <div class="booking-ref">
+                    Booking Reference: #{{ booking_id }}
+                </div>
+                
+                <div class="payout-section">
+                    <h3 style="margin-top: 0; color: #155724;">💰 Your Payout</h3>
+                    <div class="payout-amount">${{ mentor_payout }}</div>
+                    <p style="color: #155724; margin: 5px 0;">Session Fee: ${{ amount_paid }} | Platform Fee: ${{ platform_fee }}</p>
+                </div>
+                
+                <div class="calendar-buttons">
+                    <p style="margin-bottom: 15px; color: #666; font-weight: 600;">Add to your calendar:</p>
+                    <a href="{{ google_calendar_url }}" class="calendar-button google-calendar" target="_blank">
+                        📅 Google Calendar
+                    </a>
+                    <a href="{{ outlook_calendar_url }}" class="calendar-button outlook-calendar" target="_blank">
+                        📅 Outlook Calendar
+                    </a>
+                </div>
+                
+                {{ meeting_section }}
+                
+                <div class="action-items">
+                    <h3>📋 Action Items</h3>
+                    <ul>
+                        <li>Add this session to your calendar using the buttons above</li>
+                        <li>Review the student's information and prepare accordingly</li>
+                        {{ meeting_action_item }}
+                        <li>Contact the student at {{ customer_email }} if needed</li>
+                        <li>Prepare any materials or resources for the session</li>
+                    </ul>
+                </div>
+                
+                <p style="margin-top: 30px; color: #666;">
+                    We're excited for your upcoming session! If you need to reschedule or have any questions, 
+                    please contact us or reach out to your student directly.
+                </p>
+                
+                <p style="color: #666;">
+                    Best regards,<br>
+                    <strong>The DevMentor Team</strong>
+                </p>
+            </div>
+            
+            <div class="footer">
+                <p style="margin: 0; font-size: 14px;">
+                    This email was sent to {{ mentor_email }}<br>
+                    © 2025 DevMentor. All rights reserved.
+                </p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+
+register_template('session_expiring_reminder', """
+    <div style="font-family: Arial, sans-serif; color: #333;">
+        <h2>Your video session ends in {{ minutes_left }} minutes</h2>
+        <p>Hi {{ first_name }},</p>
+        <p>Your session link ({{ time_range }}, {{ formatted_date }}) expires in {{ minutes_left }} minutes.
+        Wrap up or start a new session to keep talking.</p>
+        <p><a href="{{ session_url }}" style="display: inline-block; background: #007bff; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">Open Session</a></p>
+        <br>
+        <p>Best,</p>
+        <p>The devMentor Team</p>
+    </div>
+    """)
+
+register_template('recording_ready', """
+    <div style="font-family: Arial, sans-serif; color: #333;">
+        <h2>Your recording is ready</h2>
+        <p>Hi {{ first_name }},</p>
+        <p>The recording of your session on {{ formatted_date }} ({{ time_range }}) is ready to watch.</p>
+        <p><a href="{{ recording_url }}" style="display: inline-block; background: #28a745; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px;">Watch Recording</a></p>
+        <br>
+        <p>Best,</p>
+        <p>The devMentor Team</p>
+    </div>
+    """)
+
+register_template('notification_digest', """
+    <div style="font-family: Arial, sans-serif; color: #333;">
+        <h2>{{ heading }}</h2>
+        <p>Hi {{ first_name }},</p>
+        <ul style="padding-left: 20px;">
+            {{ items }}
+        </ul>
+        <br>
+        <p>Best,</p>
+        <p>The devMentor Team</p>
+    </div>
+    """)
+
+register_template('digest_item_recording_ready', """<li style="margin-bottom: 10px;">Your recording from {{ formatted_date }} ({{ time_range }}) is ready. <a href="{{ recording_url }}">Watch recording</a></li>""")
+
+register_template('digest_item_recording_failed', """<li style="margin-bottom: 10px;">The recording from {{ formatted_date }} ({{ time_range }}) could not be completed.</li>""")
+
+register_template('digest_item_subscription_changed', """<li style="margin-bottom: 10px;">Your subscription is now <strong>{{ subscription_status }}</strong>.</li>""")
+
+register_template('digest_item_payment_failed', """<li style="margin-bottom: 10px;">We couldn't process your latest subscription payment. Stripe will retry automatically; please check your payment method.</li>""")
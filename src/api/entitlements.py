@@ -0,0 +1,170 @@
+# src/api/entitlements.py
+"""
+Effective subscription access, evaluated locally.
+
+``subscription_status`` alone says what a user paid for, not whether the paid
+period is still running. ``evaluate`` combines it with ``current_period_end``
+and a grace window (``ENTITLEMENT_GRACE_HOURS``, covering Stripe's renewal
+retries and late webhooks), using nothing but the clock. Gates call
+``entitlement_for``, which memoizes the result per user until the next point
+where it could change (the period ending, the grace window closing) or
+``ENTITLEMENT_CACHE_SECONDS``, whichever comes first. Code that changes a
+user's subscription fields calls ``invalidate`` so this process sees it at
+once; other processes pick it up when their memo expires.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from api.models import db, User
+
+
+ENTITLEMENT_GRACE_HOURS = float(os.getenv('ENTITLEMENT_GRACE_HOURS', 72))
+ENTITLEMENT_CACHE_SECONDS = float(os.getenv('ENTITLEMENT_CACHE_SECONDS', 60))
+ENTITLEMENT_CACHE_SIZE = 50000
+
+# Paid tiers and the features each one unlocks
+TIER_FEATURES = {
+    'premium': frozenset(('premium',)),
+    'recordings': frozenset(('recordings',))
+}
+
+
+def _epoch(value):
+    # Naive datetimes are local time, as written by datetime.fromtimestamp for Stripe periods
+    return value.timestamp() if value is not None else None
+
+
+class Entitlement:
+    __slots__ = ('status', 'tier', 'period_end', 'in_grace', 'lapsed', 'valid_until')
+
+    def __init__(self, status, tier, period_end, in_grace, lapsed, valid_until):
+        self.status = status
+        self.tier = tier
+        self.period_end = period_end
+        self.in_grace = in_grace
+        self.lapsed = lapsed
+        self.valid_until = valid_until
+
+    def allows(self, feature):
+        return feature in TIER_FEATURES.get(self.tier, ())
+
+    def serialize(self):
+        return {
+            "tier": self.tier,
+            "in_grace": self.in_grace,
+            "lapsed": self.lapsed,
+            "access_until": datetime.fromtimestamp(
+                self.period_end + ENTITLEMENT_GRACE_HOURS * 3600, timezone.utc
+            ).isoformat() if self.period_end else None
+        }
+
+
+def evaluate(subscription_status, current_period_end, now=None, grace_hours=ENTITLEMENT_GRACE_HOURS):
+    """
+    Effective access for a user's subscription fields at ``now`` (epoch seconds)
+
+    A paid status with no known period end counts as active (the billing date
+    is filled in later); once the period has ended the user keeps access for
+    ``grace_hours`` and then falls back to free.
+    """
+    now = time.time() if now is None else now
+    period_end = _epoch(current_period_end)
+    cache_until = now + ENTITLEMENT_CACHE_SECONDS
+    if subscription_status not in TIER_FEATURES:
+        return Entitlement(subscription_status, 'free', period_end, False, False, cache_until)
+    if period_end is None or now < period_end:
+        next_change = period_end if period_end is not None else cache_until
+        return Entitlement(subscription_status, subscription_status, period_end, False, False,
+                           min(cache_until, next_change))
+    grace_end = period_end + grace_hours * 3600
+    if now < grace_end:
+        return Entitlement(subscription_status, subscription_status, period_end, True, False,
+                           min(cache_until, grace_end))
+    return Entitlement(subscription_status, 'free', period_end, False, True, cache_until)
+
+
+class EntitlementCache:
+    """Per-user memo of ``evaluate``, each entry valid until its ``valid_until``"""
+
+    def __init__(self, max_entries=ENTITLEMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id, now):
+        with self._lock:
+            entitlement = self._entries.get(user_id)
+            if entitlement is not None and now < entitlement.valid_until:
+                self.hits += 1
+                return entitlement
+            self.misses += 1
+            return None
+
+    def set(self, user_id, entitlement):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[user_id] = entitlement
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "grace_hours": ENTITLEMENT_GRACE_HOURS,
+            "cache_seconds": ENTITLEMENT_CACHE_SECONDS
+        }
+
+
+entitlement_cache = EntitlementCache()
+
+
+def entitlement_for(user_id, user=None):
+    """
+    The user's memoized entitlement
+
+    Args:
+        user_id (int): The user
+        user (User, optional): Already loaded row, used instead of a query on a miss
+
+    Returns:
+        Entitlement: None when the user doesn't exist
+    """
+    user_id = int(user_id)
+    now = time.time()
+    entitlement = entitlement_cache.get(user_id, now)
+    if entitlement is not None:
+        return entitlement
+    if user is not None:
+        fields = (user.subscription_status, user.current_period_end)
+    else:
+        fields = db.session.query(User.subscription_status, User.current_period_end).filter_by(id=user_id).first()
+        if fields is None:
+            return None
+    entitlement = evaluate(*fields, now=now)
+    entitlement_cache.set(user_id, entitlement)
+    return entitlement
+
+
+def invalidate(*user_ids):
+    """Forget memoized entitlements after changing these users' subscription fields"""
+    entitlement_cache.invalidate(*(int(user_id) for user_id in user_ids))
@@ -0,0 +1,198 @@
+# src/api/login_throttle.py
+"""
+Sliding-window throttling for login and verification-code attempts.
+
+Failed attempts are counted per email and per client IP. Once a key reaches
+``max_failures`` inside ``window_seconds`` it is locked out, and each repeated
+lockout doubles in length up to ``max_lockout_seconds``. ``check`` is meant to
+run before any password hashing or database access, so a credential-stuffing
+burst is turned away with a dictionary lookup.
+
+State lives in process memory. Setting ``LOGIN_THROTTLE_REDIS_URL`` (and having
+the optional ``redis`` package installed) adds a shared tier so lockouts are
+enforced across all workers.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from api.models import normalize_email
+
+try:
+    import redis
+except ImportError:  # optional shared tier
+    redis = None
+
+
+REDIS_URL = os.getenv('LOGIN_THROTTLE_REDIS_URL')
+
+
+class _KeyState:
+    __slots__ = ('failures', 'locked_until', 'lockouts', 'last_failure')
+
+    def __init__(self):
+        self.failures = deque()
+        self.locked_until = 0.0
+        self.lockouts = 0
+        self.last_failure = 0.0
+
+
+class LoginThrottle:
+    """Per-key failure counter with exponential lockout"""
+
+    def __init__(self, name, max_failures=5, window_seconds=300, base_lockout_seconds=30,
+                 max_lockout_seconds=3600, max_keys=100000, redis_url=REDIS_URL):
+        self.name = name
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self.base_lockout_seconds = base_lockout_seconds
+        self.max_lockout_seconds = max_lockout_seconds
+        self.max_keys = max_keys
+        self._states = {}
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis is not None and redis_url else None
+        self.metrics = {
+            "checks": 0,
+            "rejected": 0,
+            "rejected_by_scope": {},
+            "failures": 0,
+            "lockouts": 0
+        }
+
+    def check(self, **keys):
+        """
+        Return the seconds remaining on the longest active lockout, or 0 if allowed.
+
+        Keys are passed by scope, e.g. ``check(email=email, ip=ip)``.
+        """
+        now = time.time()
+        self.metrics["checks"] += 1
+        retry_after = 0.0
+        blocking_scope = None
+        for scope, value in keys.items():
+            if not value:
+                continue
+            key = f"{scope}:{value}"
+            state = self._states.get(key)
+            remaining = state.locked_until - now if state else 0.0
+            if remaining <= 0 and self._redis is not None:
+                remaining = self._shared_remaining(key)
+            if remaining > retry_after:
+                retry_after = remaining
+                blocking_scope = scope
+        if blocking_scope:
+            self.metrics["rejected"] += 1
+            by_scope = self.metrics["rejected_by_scope"]
+            by_scope[blocking_scope] = by_scope.get(blocking_scope, 0) + 1
+        return retry_after
+
+    def record_failure(self, **keys):
+        now = time.time()
+        self.metrics["failures"] += 1
+        with self._lock:
+            if len(self._states) >= self.max_keys:
+                self._prune(now)
+            for scope, value in keys.items():
+                if value:
+                    self._record_key_failure(f"{scope}:{value}", now)
+
+    def reset(self, **keys):
+        """Forget failures after a successful attempt"""
+        with self._lock:
+            for scope, value in keys.items():
+                if value:
+                    self._states.pop(f"{scope}:{value}", None)
+        if self._redis is not None:
+            for scope, value in keys.items():
+                if value:
+                    self._share_reset(f"{scope}:{value}")
+
+    def _record_key_failure(self, key, now):
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState()
+        elif now - state.last_failure > self.max_lockout_seconds:
+            state.lockouts = 0
+
+        failures = state.failures
+        while failures and failures[0] <= now - self.window_seconds:
+            failures.popleft()
+        failures.append(now)
+        state.last_failure = now
+
+        if len(failures) >= self.max_failures:
+            state.lockouts += 1
+            lockout = min(self.base_lockout_seconds * 2 ** (state.lockouts - 1), self.max_lockout_seconds)
+            state.locked_until = now + lockout
+            failures.clear()
+            self.metrics["lockouts"] += 1
+            if self._redis is not None:
+                self._share_lockout(key, lockout)
+        elif self._redis is not None:
+            self._share_failure(key)
+
+    def _prune(self, now):
+        stale = [
+            key for key, state in self._states.items()
+            if state.locked_until <= now and now - state.last_failure > self.window_seconds
+        ]
+        for key in stale:
+            del self._states[key]
+
+    # Shared (Redis) tier
+
+    def _redis_keys(self, key):
+        prefix = f"throttle:{self.name}:{key}"
+        return f"{prefix}:fails", f"{prefix}:lock", f"{prefix}:lockouts"
+
+    def _shared_remaining(self, key):
+        try:
+            ttl = self._redis.pttl(self._redis_keys(key)[1])
+        except Exception as e:
+            print(f"Login throttle shared tier unavailable: {str(e)}")
+            return 0.0
+        return ttl / 1000.0 if ttl and ttl > 0 else 0.0
+
+    def _share_failure(self, key):
+        fails_key, lock_key, lockouts_key = self._redis_keys(key)
+        try:
+            count = self._redis.incr(fails_key)
+            if count == 1:
+                self._redis.expire(fails_key, self.window_seconds)
+            if count >= self.max_failures:
+                lockouts = self._redis.incr(lockouts_key)
+                self._redis.expire(lockouts_key, self.max_lockout_seconds)
+                lockout = min(self.base_lockout_seconds * 2 ** (lockouts - 1), self.max_lockout_seconds)
+                self._redis.set(lock_key, 1, ex=int(lockout))
+                self._redis.delete(fails_key)
+        except Exception as e:
+            print(f"Login throttle shared tier unavailable: {str(e)}")
+
+    def _share_lockout(self, key, lockout):
+        fails_key, lock_key, lockouts_key = self._redis_keys(key)
+        try:
+            self._redis.set(lock_key, 1, ex=int(lockout))
+            self._redis.delete(fails_key)
+        except Exception as e:
+            print(f"Login throttle shared tier unavailable: {str(e)}")
+
+    def _share_reset(self, key):
+        try:
+            self._redis.delete(*self._redis_keys(key))
+        except Exception as e:
+            print(f"Login throttle shared tier unavailable: {str(e)}")
+
+    def stats(self):
+        return dict(self.metrics, tracked_keys=len(self._states), shared_tier=self._redis is not None)
+
+
+login_throttle = LoginThrottle('login')
+
+# Verification codes are only 6 digits, so allow far fewer guesses
+verify_code_throttle = LoginThrottle('verify_code', max_failures=5, window_seconds=900, base_lockout_seconds=60)
+
+
+def throttle_key(email):
+    return normalize_email(email)
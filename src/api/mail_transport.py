@@ -0,0 +1,218 @@
+# src/api/mail_transport.py
+"""
+Pooled SMTP delivery used by the email outbox workers.
+
+Authenticated connections are kept open and reused across batches instead of
+paying a TLS handshake and AUTH for every message. A connection is replaced
+when it has been idle longer than the server is likely to keep it, after
+``max_messages_per_connection`` sends, or when the server drops it mid-batch.
+"""
+
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+
+MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+MAIL_PORT = int(os.getenv("MAIL_PORT", 465))  # SSL PORT
+MAIL_USE_SSL = os.getenv("MAIL_USE_SSL", "true").lower() == "true"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", 60))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+
+
+def mail_credentials():
+    return os.getenv("GMAIL"), os.getenv("GMAIL_PASSWORD")
+
+
+def build_message(sender, to_email, subject, html_content):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = to_email
+    msg.add_alternative(html_content, subtype='html')
+    return msg
+
+
+class _PooledConnection:
+    __slots__ = ('server', 'last_used', 'messages_sent')
+
+    def __init__(self, server):
+        self.server = server
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """Bounded pool of logged-in SMTP connections"""
+
+    def __init__(self, host=MAIL_SERVER, port=MAIL_PORT, use_ssl=MAIL_USE_SSL, size=SMTP_POOL_SIZE,
+                 idle_timeout=SMTP_IDLE_TIMEOUT_SECONDS, max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 timeout=SMTP_TIMEOUT_SECONDS, credentials=mail_credentials):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.credentials = credentials
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "connections_opened": 0,
+            "connections_recycled": 0,
+            "reconnects": 0,
+            "batches": 0,
+            "messages_sent": 0,
+            "messages_failed": 0,
+            "send_seconds": 0.0,
+            "batch_seconds": 0.0
+        }
+
+    def _count(self, **increments):
+        with self._metrics_lock:
+            for key, value in increments.items():
+                self.metrics[key] += value
+
+    def _connect(self):
+        username, password = self.credentials()
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if username and password:
+            server.login(username, password)
+        self._count(connections_opened=1)
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.server.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                conn.server.close()
+            except OSError:
+                pass
+
+    def _acquire(self):
+        # The caller holds a pool slot and must hand it back via _release
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - conn.last_used < self.idle_timeout:
+                return conn
+            # Likely dropped by the server while idle
+            self._close(conn)
+            self._count(connections_recycled=1)
+
+    def _release(self, conn):
+        if conn is not None:
+            if conn.messages_sent >= self.max_messages:
+                self._close(conn)
+                self._count(connections_recycled=1)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+        self._slots.release()
+
+    def send_batch(self, sender, messages):
+        """
+        Send ``(to_email, subject, html_content)`` tuples over pooled connections
+
+        Returns:
+            list[str|None]: One entry per message, None on success or an error string
+        """
+        batch_started = time.perf_counter()
+        results = []
+        conn = None
+        self._slots.acquire()
+        try:
+            conn = self._acquire()
+            for to_email, subject, html_content in messages:
+                msg = build_message(sender, to_email, subject, html_content)
+                for attempt in range(2):
+                    try:
+                        if conn is None or conn.messages_sent >= self.max_messages:
+                            if conn is not None:
+                                self._close(conn)
+                                self._count(connections_recycled=1)
+                                conn = None
+                            conn = self._connect()
+                        started = time.perf_counter()
+                        conn.server.send_message(msg)
+                        conn.messages_sent += 1
+                        self._count(messages_sent=1, send_seconds=time.perf_counter() - started)
+                        results.append(None)
+                        break
+                    except smtplib.SMTPServerDisconnected:
+                        # Connection went away between messages: reconnect once
+                        if conn is not None:
+                            self._close(conn)
+                        conn = None
+                        self._count(reconnects=1)
+                        if attempt:
+                            raise
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                        self._count(messages_failed=1)
+                        results.append(f"{type(e).__name__}: {e}")
+                        break
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"ERROR: Failed to send email batch using smtplib: {e}")
+            if conn is not None:
+                self._close(conn)
+                conn = None
+            failed = len(messages) - len(results)
+            self._count(messages_failed=failed)
+            results.extend([f"{type(e).__name__}: {e}"] * failed)
+        finally:
+            self._release(conn)
+            self._count(batches=1, batch_seconds=time.perf_counter() - batch_started)
+        return results
+
+    def close_all(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def stats(self):
+        with self._metrics_lock:
+            stats = dict(self.metrics)
+        sent = stats["messages_sent"]
+        stats["idle_connections"] = self._idle.qsize()
+        stats["avg_ms_per_message"] = round(stats["send_seconds"] / sent * 1000, 2) if sent else 0.0
+        stats["avg_ms_per_batch"] = round(stats["batch_seconds"] / stats["batches"] * 1000, 2) if stats["batches"] else 0.0
+        stats["messages_per_second"] = round(sent / stats["batch_seconds"], 1) if stats["batch_seconds"] else 0.0
+        return stats
+
+
+smtp_pool = SMTPConnectionPool()
+
+
+def deliver_batch(messages, pool=None):
+    """
+    Send several messages through the shared SMTP connection pool
+
+    Args:
+        messages (list[tuple]): ``(to_email, subject, html_content)`` tuples
+        pool (SMTPConnectionPool, optional): Defaults to the process-wide pool
+
+    Returns:
+        list[str|None]: One entry per message, None on success or an error string
+    """
+    pool = pool or smtp_pool
+    username, password = pool.credentials()
+    if pool.host == "smtp.gmail.com" and (not username or not password):
+        error = "Gmail credentials (GMAIL, GMAIL_PASSWORD) not found in .env file."
+        print(f"ERROR: {error}")
+        return [error] * len(messages)
+    return pool.send_batch(username or "no-reply@localhost", messages)
@@ -1,11 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 import datetime
 
 
 db = SQLAlchemy()
 
+
+def normalize_email(email):
+    """Canonical form used for case-insensitive email matching"""
+    return (email or '').strip().lower()
+
+
 # Renamed Customer to User, added subscription fields
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,6 +19,8 @@ class User(db.Model):
     last_name = db.Column(db.String(30), unique=False, nullable=False)
     phone = db.Column(db.String(30), nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
+    # Lower-cased copy of email for case-insensitive lookups (find_by_email)
+    email_normalized = db.Column(db.String(120), unique=True, nullable=True, index=True)
     password = db.Column(db.String(256), unique=False, nullable=False)
     is_active = db.Column(db.Boolean(), unique=False, default=True)
     last_active = db.Column(db.DateTime(timezone=True), unique=False)
@@ -23,12 +31,36 @@ class User(db.Model):
 
     # Add subscription fields
     subscription_status = db.Column(db.String(50), default='free')  # free, premium
-    stripe_customer_id = db.Column(db.String(255))
-    subscription_id = db.Column(db.String(255))
+    stripe_customer_id = db.Column(db.String(255), index=True)
+    subscription_id = db.Column(db.String(255), index=True)
     current_period_end = db.Column(DateTime(timezone=True))
 
+    # Secret for the user's ICS subscription feed (/api/calendar/<token>.ics)
+    calendar_feed_token = db.Column(db.String(64), unique=True, nullable=True, index=True)
+
     profile_photo = db.relationship("UserImage", back_populates="user", uselist=False)
 
+    @validates('email')
+    def _sync_email_normalized(self, key, email):
+        self.email_normalized = normalize_email(email)
+        return email
+
+    @classmethod
+    def find_by_email(cls, email):
+        """
+        Case-insensitive lookup by email using the normalized index
+
+        Accounts whose email differs from an older one only by case were left
+        without a normalized email by the backfill, so an exact match on
+        ``email`` wins over the normalized one: each of them is still found
+        by its own email.
+        """
+        normalized = normalize_email(email)
+        if not normalized:
+            return None
+        exact = cls.email == email.strip()
+        return cls.query.filter(db.or_(exact, cls.email_normalized == normalized)).order_by(exact.desc()).first()
+
     def __repr__(self):
         return f'<User {self.email}>'
 
@@ -70,11 +102,18 @@ class UserImage(db.Model):
     
 # New VideoSession Model
 class VideoSession(db.Model):
+    __table_args__ = (
+        db.Index('ix_video_session_creator_id_expires_at', 'creator_id', 'expires_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     creator_id = db.Column(db.Integer, ForeignKey('user.id'), nullable=False)
     meeting_id = db.Column(db.String(255), unique=True, nullable=False)
     session_url = db.Column(db.String(500), nullable=False)
     created_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow)
+    # Bumped on every change; drives the calendar feed's ETag/Last-Modified
+    updated_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow,
+                           onupdate=datetime.datetime.utcnow)
     expires_at = db.Column(DateTime(timezone=True), nullable=False)  # +6 hours
     max_duration_minutes = db.Column(db.Integer, default=50)  # 50 or 360
     started_at = db.Column(DateTime(timezone=True))
@@ -85,6 +124,8 @@ class VideoSession(db.Model):
     recording_url = db.Column(db.String(500), nullable=True)
     recording_id = db.Column(db.String(255), nullable=True)  # VideoSDK recording ID
     recording_status = db.Column(db.String(50), default='none')  # none, starting, active, stopping, completed, failed
+    # Time of the event behind the last recording_status change (see api.recording_state)
+    recording_event_at = db.Column(DateTime(timezone=True), nullable=True)
 
     creator = relationship("User", backref=db.backref("video_sessions", lazy=True))
 
@@ -108,5 +149,225 @@ class VideoSession(db.Model):
         }
 
 
+class Recording(db.Model):
+    """One start/stop cycle of a session's recording; a session can have many"""
+    __table_args__ = (
+        # Per-user catalog, newest first, as one range scan (see api.recordings)
+        db.Index('ix_recording_owner_id_created_at', 'owner_id', 'created_at', 'id'),
+        db.Index('ix_recording_session_id_created_at', 'session_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, ForeignKey('video_session.id'), nullable=False)
+    owner_id = db.Column(db.Integer, ForeignKey('user.id'), nullable=False)
+    meeting_id = db.Column(db.String(255), nullable=False)  # copied from the session for listings
+    external_id = db.Column(db.String(255), nullable=True)  # VideoSDK HLS session / recording ID
+    status = db.Column(db.String(50), default='starting', nullable=False)  # starting, active, stopping, completed, failed
+    url = db.Column(db.String(500), nullable=True)
+    duration_seconds = db.Column(db.Integer, nullable=True)
+    size_bytes = db.Column(db.BigInteger, nullable=True)
+    created_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    finished_at = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<Recording {self.id} - Session: {self.session_id} Status: {self.status}>'
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "meeting_id": self.meeting_id,
+            "recording_id": self.external_id,
+            "recording_status": self.status,
+            "recording_url": self.url,
+            "duration_seconds": self.duration_seconds,
+            "size_bytes": self.size_bytes,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class RecordingCommand(db.Model):
+    """Start/stop request for a session's recording, executed against VideoSDK by a background worker"""
+    __table_args__ = (
+        db.Index('ix_recording_command_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_recording_command_session_id_created_at', 'session_id', 'created_at'),
+        # At most one open start and one open stop per session
+        db.Index('uq_recording_command_open_session_id_action', 'session_id', 'action', unique=True,
+                 postgresql_where=db.text("status IN ('pending', 'sent')"),
+                 sqlite_where=db.text("status IN ('pending', 'sent')")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    command_id = db.Column(db.String(32), unique=True, nullable=False)  # returned to the client
+    session_id = db.Column(db.Integer, ForeignKey('video_session.id'), nullable=False)
+    user_id = db.Column(db.Integer, ForeignKey('user.id'), nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # start, stop
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sent, completed, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)  # VideoSDK calls made
+    polls = db.Column(db.Integer, default=0, nullable=False)  # reconciliation checks after sending
+    next_attempt_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(DateTime(timezone=True), nullable=True)
+    external_id = db.Column(db.String(255), nullable=True)  # VideoSDK HLS session ID
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    sent_at = db.Column(DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<RecordingCommand {self.command_id} {self.action} - Session: {self.session_id} Status: {self.status}>'
+
+    def serialize(self):
+        return {
+            "command_id": self.command_id,
+            "action": self.action,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.last_error if self.status == 'failed' else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class RevokedToken(db.Model):
+    """Authoritative record of access tokens revoked before their expiry"""
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False, index=True)
+    user_id = db.Column(db.Integer, ForeignKey('user.id'), nullable=True, index=True)
+    revoked_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    expires_at = db.Column(DateTime(timezone=True), nullable=True, index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti} - User: {self.user_id}>'
+
 
-        
\ No newline at end of file
+class EmailOutbox(db.Model):
+    """Outgoing email waiting for (or done with) background delivery"""
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html_content = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow)
+    sent_at = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} to {self.to_email} Status: {self.status}>'
+
+
+class NotificationLog(db.Model):
+    """One row per notification sent, so bulk runs never notify a recipient twice"""
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'user_id', 'ref_id', name='uq_notification_log_kind_user_ref'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # session_expiring, recording_ready
+    user_id = db.Column(db.Integer, ForeignKey('user.id'), nullable=False, index=True)
+    ref_id = db.Column(db.Integer, nullable=False)  # VideoSession (session_expiring) or Recording (recording_ready)
+    run_id = db.Column(db.String(32), nullable=False, index=True)
+    created_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<NotificationLog {self.kind} - User: {self.user_id} Ref: {self.ref_id}>'
+
+
+class PendingNotification(db.Model):
+    """Event waiting to be folded into a per-recipient digest email"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'dedupe_key', name='uq_pending_notification_user_dedupe_key'),
+        db.Index('ix_pending_notification_status_created_at', 'status', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(50), nullable=False)  # recording_ready, recording_failed, subscription_changed, payment_failed
+    dedupe_key = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sent, skipped
+    digest_id = db.Column(db.String(32), nullable=True, index=True)
+    created_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    sent_at = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<PendingNotification {self.kind} - User: {self.user_id} Status: {self.status}>'
+
+
+class StripeEvent(db.Model):
+    """Verified Stripe webhook event, applied asynchronously and at most once"""
+    __table_args__ = (
+        db.Index('ix_stripe_event_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_stripe_event_customer_id_created', 'customer_id', 'created'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(255), unique=True, nullable=False)
+    type = db.Column(db.String(100), nullable=False)
+    customer_id = db.Column(db.String(255), nullable=True)
+    created = db.Column(db.Integer, nullable=False)  # Stripe's event timestamp (epoch seconds)
+    payload = db.Column(db.Text, nullable=False)  # verified JSON body
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, processing, applied, superseded, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    processed_at = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<StripeEvent {self.event_id} {self.type} Status: {self.status}>'
+
+
+class StripeReconcileRun(db.Model):
+    """Progress of a subscription reconciliation pass, so an interrupted run can resume"""
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), default='running', nullable=False)  # running, completed, failed
+    cursor = db.Column(db.String(255), nullable=True)  # last Stripe subscription ID applied
+    scanned = db.Column(db.Integer, default=0, nullable=False)
+    corrected = db.Column(db.Integer, default=0, nullable=False)
+    drift = db.Column(db.Text, nullable=True)  # JSON counts per field
+    live = db.Column(db.Text, nullable=True)  # JSON customer -> state chosen from its newest subscription so far
+    last_error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    updated_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    finished_at = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<StripeReconcileRun {self.id} Status: {self.status} Scanned: {self.scanned}>'
+
+
+class VideoSDKEvent(db.Model):
+    """VideoSDK recording/HLS webhook, acknowledged at once and applied by a background worker"""
+    __table_args__ = (
+        db.Index('ix_video_sdk_event_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_video_sdk_event_meeting_id', 'meeting_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_key = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of the body; redeliveries collide
+    type = db.Column(db.String(50), nullable=False)  # hls-started, recording-stopped, ...
+    meeting_id = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # the event's data object as JSON
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, processing, applied, rejected, orphaned, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(DateTime(timezone=True), default=datetime.datetime.utcnow, nullable=False)
+    processed_at = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<VideoSDKEvent {self.type} {self.meeting_id} Status: {self.status}>'
@@ -0,0 +1,266 @@
+# src/api/notification_digest.py
+"""
+Per-recipient coalescing of event-driven notifications.
+
+Webhooks (recording finished or failed, subscription changes, failed payments)
+call ``notify`` instead of sending mail. Each event becomes a
+``PendingNotification`` row keyed by ``(user_id, dedupe_key)``, so
+redeliveries and late duplicates (a recording reported by both
+``hls-stopped`` and ``recording.stopped``) are dropped by the unique
+constraint. A recipient's first pending event opens a window of
+``NOTIFICATION_DIGEST_WINDOW_SECONDS``; when it closes, a background worker
+folds everything pending for that user into one digest email in the outbox.
+Delivered rows are kept for ``NOTIFICATION_DEDUPE_RETENTION_DAYS`` so
+events that arrive after their digest went out are still recognised.
+"""
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, User, PendingNotification
+from api.email_templates import Markup, get_template, render as render_template
+from api import email_outbox
+from api import timezone_format
+from api.notifications import claim_notifications
+from api.workers import BackgroundWorkerPool
+
+
+DIGEST_WINDOW_SECONDS = int(os.getenv('NOTIFICATION_DIGEST_WINDOW_SECONDS', 300))
+DIGEST_WORKERS = int(os.getenv('NOTIFICATION_DIGEST_WORKERS', 1))
+DIGEST_USERS_PER_BATCH = 200
+DEDUPE_RETENTION_DAYS = int(os.getenv('NOTIFICATION_DEDUPE_RETENTION_DAYS', 7))
+
+# Subject used when a digest holds a single notification
+SUBJECTS = {
+    'recording_ready': "devMentor - Your recording is ready",
+    'recording_failed': "devMentor - Your recording could not be completed",
+    'subscription_changed': "devMentor - Your subscription has changed",
+    'payment_failed': "devMentor - Payment failed"
+}
+
+digest_pool = None
+
+_metrics_lock = threading.Lock()
+metrics = {
+    "received": 0,
+    "duplicates_dropped": 0,
+    "already_notified": 0,
+    "superseded": 0,
+    "coalesced": 0,
+    "digests_sent": 0
+}
+
+
+def _count(**increments):
+    with _metrics_lock:
+        for key, value in increments.items():
+            metrics[key] += value
+
+
+def _insert_statement(row):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(PendingNotification.__table__).values(row)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(PendingNotification.__table__).values(row)
+    else:
+        raise NotImplementedError(f"Notification coalescing is not supported on {dialect}")
+    return stmt.on_conflict_do_nothing(index_elements=['user_id', 'dedupe_key'])
+
+
+def notify(user_id, kind, dedupe_key, payload, commit=True):
+    """
+    Queue a notification for ``user_id``'s next digest
+
+    Args:
+        user_id (int): Recipient
+        kind (str): One of ``SUBJECTS``
+        dedupe_key (str): Identifies the event; repeats for the same user are dropped
+        payload (dict): JSON-serializable fields for the digest item
+        commit (bool): Commit immediately
+
+    Returns:
+        bool: False when the event was a duplicate
+    """
+    result = db.session.execute(_insert_statement({
+        "user_id": user_id,
+        "kind": kind,
+        "dedupe_key": dedupe_key,
+        "payload": json.dumps(payload),
+        "status": 'pending',
+        "created_at": datetime.utcnow()
+    }))
+    if commit:
+        db.session.commit()
+    inserted = result.rowcount > 0
+    _count(received=1, duplicates_dropped=0 if inserted else 1)
+    return inserted
+
+
+def notify_recording(session, recording, outcome, commit=True):
+    """One of a VideoSession's recordings finished (``ready``) or ``failed``"""
+    notify(session.creator_id, f"recording_{outcome}", f"recording:{session.id}:{recording.id}:{outcome}", {
+        "session_id": session.id,
+        "recording_id": recording.id,
+        "recording_url": recording.url or session.recording_url,
+        "created_at": session.created_at.isoformat() if session.created_at else None,
+        "expires_at": session.expires_at.isoformat() if session.expires_at else None
+    }, commit=commit)
+
+
+def notify_subscription(user_id, event_id, kind='subscription_changed', subscription_status=None):
+    """Subscription state changed (or a payment failed) for a Stripe event; the caller commits"""
+    notify(user_id, kind, f"stripe:{event_id}", {"subscription_status": subscription_status}, commit=False)
+
+
+def _render_items(items):
+    # items: list of (kind, payload) for one recipient, oldest first
+    recordings = [payload for kind, payload in items if kind.startswith('recording_')]
+    times = iter(timezone_format.format_many(
+        (payload['created_at'], payload['expires_at'], None) for payload in recordings
+    ))
+    rendered = []
+    for kind, payload in items:
+        if kind.startswith('recording_'):
+            display = next(times)
+            fields = {"formatted_date": display['formatted_date'], "time_range": display['est_time_range']}
+            if kind == 'recording_ready':
+                fields["recording_url"] = payload.get('recording_url') or ''
+        elif kind == 'subscription_changed':
+            fields = {"subscription_status": payload.get('subscription_status') or 'free'}
+        else:
+            fields = {}
+        rendered.append(get_template(f"digest_item_{kind}").render(**fields))
+    return Markup('\n            '.join(rendered))
+
+
+def flush_digests(worker_id=None, now=None, window_seconds=DIGEST_WINDOW_SECONDS,
+                  max_users=DIGEST_USERS_PER_BATCH):
+    """
+    Send one digest per recipient whose window has closed
+
+    Claiming, rendering and enqueueing happen in a single transaction, so a
+    concurrent flush in another process skips rows this one has taken.
+
+    Returns:
+        int: Number of notifications folded into digests
+    """
+    now = now or datetime.utcnow()
+    user_ids = [
+        user_id for (user_id,) in db.session.query(PendingNotification.user_id)
+        .filter(PendingNotification.status == 'pending')
+        .group_by(PendingNotification.user_id)
+        .having(db.func.min(PendingNotification.created_at) <= now - timedelta(seconds=window_seconds))
+        .limit(max_users)
+    ]
+    if not user_ids:
+        _purge_delivered(now)
+        return 0
+
+    digest_id = uuid.uuid4().hex
+    PendingNotification.query.filter(
+        PendingNotification.user_id.in_(user_ids),
+        PendingNotification.status == 'pending'
+    ).update({"status": 'sent', "digest_id": digest_id, "sent_at": now}, synchronize_session=False)
+
+    rows = (
+        db.session.query(PendingNotification, User.email, User.first_name)
+        .join(User, User.id == PendingNotification.user_id)
+        .filter(PendingNotification.digest_id == digest_id)
+        .order_by(PendingNotification.user_id, PendingNotification.created_at, PendingNotification.id)
+        .all()
+    )
+
+    # Recordings the bulk fan-out already announced must not be mailed again
+    # (rows queued before recordings had their own ID aren't checked)
+    ready = {}
+    for row, _, _ in rows:
+        if row.kind == 'recording_ready':
+            recording_id = json.loads(row.payload).get('recording_id')
+            if recording_id is not None:
+                ready[(row.user_id, recording_id)] = row
+    won = claim_notifications(
+        'recording_ready', digest_id,
+        [SimpleNamespace(user_id=user_id, ref_id=ref_id) for user_id, ref_id in ready], now
+    ) if ready else set()
+    for key, row in ready.items():
+        if key not in won:
+            row.status = 'skipped'
+
+    recipients = {}
+    superseded = 0
+    for row, email, first_name in rows:
+        if row.status == 'skipped':
+            continue
+        recipient = recipients.setdefault(row.user_id, {"email": email, "first_name": first_name, "items": []})
+        items = recipient["items"]
+        if row.kind == 'subscription_changed':
+            # Only the latest subscription state is worth telling the user
+            before = len(items)
+            items[:] = [item for item in items if item[0] != 'subscription_changed']
+            superseded += before - len(items)
+        items.append((row.kind, json.loads(row.payload)))
+
+    for recipient in recipients.values():
+        items = recipient["items"]
+        if len(items) == 1:
+            subject = SUBJECTS[items[0][0]]
+            heading = subject.split(' - ', 1)[1]
+        else:
+            subject = f"devMentor - {len(items)} updates on your account"
+            heading = f"{len(items)} updates on your account"
+        html = render_template('notification_digest', heading=heading, first_name=recipient["first_name"],
+                               items=_render_items(items))
+        email_outbox.enqueue_email(recipient["email"], subject, html, commit=False)
+
+    db.session.commit()
+    db.session.expunge_all()
+    if recipients and email_outbox.outbox_pool is not None:
+        email_outbox.outbox_pool.wake()
+
+    skipped = len(ready) - len(won)
+    _count(
+        digests_sent=len(recipients),
+        already_notified=skipped,
+        superseded=superseded,
+        coalesced=len(rows) - skipped - len(recipients)
+    )
+    return len(rows)
+
+
+def _purge_delivered(now):
+    PendingNotification.query.filter(
+        PendingNotification.status.in_(('sent', 'skipped')),
+        PendingNotification.created_at < now - timedelta(days=DEDUPE_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def digest_stats():
+    counts = dict(
+        db.session.query(PendingNotification.status, db.func.count(PendingNotification.id))
+        .group_by(PendingNotification.status).all()
+    )
+    with _metrics_lock:
+        stats = dict(metrics)
+    # Emails that would have gone out without coalescing and dedupe
+    stats["sends_saved"] = (stats["coalesced"] + stats["duplicates_dropped"] + stats["already_notified"])
+    stats["window_seconds"] = DIGEST_WINDOW_SECONDS
+    stats["queue"] = counts
+    if digest_pool is not None:
+        stats["workers"] = digest_pool.stats()
+    return stats
+
+
+def create_digest_pool(app, num_workers=DIGEST_WORKERS):
+    global digest_pool
+    poll_interval = max(1.0, min(30.0, DIGEST_WINDOW_SECONDS / 4))
+    digest_pool = BackgroundWorkerPool(app, 'notification-digest', flush_digests,
+                                       num_workers=num_workers, poll_interval=poll_interval)
+    return digest_pool
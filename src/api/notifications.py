@@ -0,0 +1,259 @@
+# src/api/notifications.py
+"""
+Bulk notification fan-out ("your session ends in 10 minutes", "your recording
+is ready").
+
+A campaign selects its targets with one keyset-paginated query that joins
+``VideoSession`` (and, for recordings, ``Recording``) to ``User`` and
+anti-joins ``NotificationLog`` on the campaign's ``ref_column``, so each page
+only holds ``batch_size`` rows no matter how many recipients there are. For
+every page the recipients are claimed in ``NotificationLog`` (its unique
+constraint is the per-recipient dedupe, and makes overlapping runs safe),
+the messages are rendered together, and they are written to the email outbox
+in the same commit as the claims. Delivery concurrency is bounded by the
+outbox workers and the SMTP connection pool.
+
+Run from the CLI (``flask notify session-expiring``) or on a schedule by
+setting ``NOTIFICATION_FANOUT_INTERVAL_MINUTES``.
+"""
+
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, User, VideoSession, Recording, NotificationLog
+from api.email_templates import render as render_template
+from api import email_outbox
+from api import timezone_format
+
+
+FANOUT_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 500))
+FANOUT_INTERVAL_MINUTES = int(os.getenv('NOTIFICATION_FANOUT_INTERVAL_MINUTES', 0))
+SESSION_EXPIRING_LEAD_MINUTES = int(os.getenv('SESSION_EXPIRING_LEAD_MINUTES', 10))
+RECORDING_READY_LOOKBACK_HOURS = int(os.getenv('RECORDING_READY_LOOKBACK_HOURS', 24))
+
+
+def _target_columns(ref_column, recording_url):
+    return (
+        ref_column.label('ref_id'),
+        User.id.label('user_id'),
+        User.email,
+        User.first_name,
+        VideoSession.session_url,
+        recording_url.label('recording_url'),
+        VideoSession.created_at,
+        VideoSession.expires_at
+    )
+
+
+def _time_fields(rows):
+    # Session slots repeat across recipients, so format them in one pass
+    displays = timezone_format.format_many((row.created_at, row.expires_at, None) for row in rows)
+    return [
+        {"formatted_date": display['formatted_date'], "time_range": display['est_time_range']}
+        for display in displays
+    ]
+
+
+class SessionExpiringCampaign:
+    kind = 'session_expiring'
+
+    @property
+    def ref_column(self):
+        # What NotificationLog.ref_id refers to for this campaign
+        return VideoSession.id
+
+    def __init__(self, lead_minutes=SESSION_EXPIRING_LEAD_MINUTES):
+        self.lead_minutes = lead_minutes
+
+    def targets(self):
+        return (
+            db.session.query(*_target_columns(VideoSession.id, VideoSession.recording_url))
+            .join(User, User.id == VideoSession.creator_id)
+        )
+
+    def filters(self, now):
+        return (
+            VideoSession.status == 'active',
+            VideoSession.expires_at > now,
+            VideoSession.expires_at <= now + timedelta(minutes=self.lead_minutes)
+        )
+
+    def render(self, rows, now):
+        messages = []
+        for row, times in zip(rows, _time_fields(rows)):
+            # Postgres hands back expires_at as aware, now is naive UTC
+            remaining = timezone_format.to_utc(row.expires_at) - timezone_format.to_utc(now)
+            minutes_left = max(1, math.ceil(remaining.total_seconds() / 60))
+            html = render_template(
+                'session_expiring_reminder',
+                first_name=row.first_name,
+                minutes_left=minutes_left,
+                session_url=row.session_url,
+                **times
+            )
+            messages.append((row.email, f"devMentor - Your session ends in {minutes_left} minutes", html))
+        return messages
+
+
+class RecordingReadyCampaign:
+    """One notice per completed recording, however many a session has"""
+    kind = 'recording_ready'
+
+    @property
+    def ref_column(self):
+        # What NotificationLog.ref_id refers to for this campaign
+        return Recording.id
+
+    def __init__(self, lookback_hours=RECORDING_READY_LOOKBACK_HOURS):
+        self.lookback_hours = lookback_hours
+
+    def targets(self):
+        return (
+            db.session.query(*_target_columns(Recording.id, Recording.url))
+            .join(VideoSession, VideoSession.id == Recording.session_id)
+            .join(User, User.id == Recording.owner_id)
+        )
+
+    def filters(self, now):
+        # Only recent recordings, so enabling this doesn't mail every old one
+        return (
+            Recording.status == 'completed',
+            Recording.url.isnot(None),
+            Recording.created_at >= now - timedelta(hours=self.lookback_hours)
+        )
+
+    def render(self, rows, now):
+        messages = []
+        for row, times in zip(rows, _time_fields(rows)):
+            html = render_template(
+                'recording_ready',
+                first_name=row.first_name,
+                recording_url=row.recording_url,
+                **times
+            )
+            messages.append((row.email, "devMentor - Your recording is ready", html))
+        return messages
+
+
+CAMPAIGNS = {
+    'session-expiring': SessionExpiringCampaign,
+    'recording-ready': RecordingReadyCampaign
+}
+
+
+def _claim_statement(rows):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(NotificationLog.__table__).values(rows)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(NotificationLog.__table__).values(rows)
+    else:
+        raise NotImplementedError(f"Notification fan-out is not supported on {dialect}")
+    return stmt.on_conflict_do_nothing(index_elements=['kind', 'user_id', 'ref_id'])
+
+
+def claim_notifications(kind, run_id, rows, now):
+    """Record ``rows`` as notified by this run; returns the (user_id, ref_id) keys it won"""
+    keys = {(row.user_id, row.ref_id) for row in rows}
+    db.session.execute(_claim_statement([
+        {"kind": kind, "user_id": user_id, "ref_id": ref_id, "run_id": run_id, "created_at": now}
+        for user_id, ref_id in keys
+    ]))
+    won = db.session.query(NotificationLog.user_id, NotificationLog.ref_id).filter(
+        NotificationLog.run_id == run_id,
+        NotificationLog.ref_id.in_({ref_id for _, ref_id in keys})
+    )
+    return {(user_id, ref_id) for user_id, ref_id in won}
+
+
+def fan_out(campaign, batch_size=FANOUT_BATCH_SIZE, now=None, dry_run=False):
+    """
+    Notify every target of ``campaign`` that hasn't been notified yet
+
+    Args:
+        campaign: A campaign instance, e.g. ``SessionExpiringCampaign(lead_minutes=10)``
+        batch_size (int): Targets selected, rendered and enqueued per page
+        now (datetime, optional): Reference time (UTC), defaults to now
+        dry_run (bool): Count targets without claiming or sending anything
+
+    Returns:
+        dict: Counts of targets, duplicates skipped and emails queued, plus timings
+    """
+    now = now or datetime.utcnow()
+    run_id = uuid.uuid4().hex
+    stats = {"campaign": campaign.kind, "run_id": run_id, "targets": 0, "duplicates": 0,
+             "queued": 0, "batches": 0, "render_seconds": 0.0}
+    started = time.perf_counter()
+
+    already_sent = db.and_(
+        NotificationLog.kind == campaign.kind,
+        NotificationLog.user_id == User.id,
+        NotificationLog.ref_id == campaign.ref_column
+    )
+    targets = (
+        campaign.targets()
+        .outerjoin(NotificationLog, already_sent)
+        .filter(NotificationLog.id.is_(None), *campaign.filters(now))
+        .order_by(campaign.ref_column)
+    )
+
+    last_id = 0
+    while True:
+        rows = targets.filter(campaign.ref_column > last_id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].ref_id
+        stats["batches"] += 1
+        stats["targets"] += len(rows)
+        if dry_run:
+            continue
+
+        won = claim_notifications(campaign.kind, run_id, rows, now)
+        to_send = [row for row in rows if (row.user_id, row.ref_id) in won]
+        stats["duplicates"] += len(rows) - len(to_send)
+
+        render_started = time.perf_counter()
+        messages = campaign.render(to_send, now)
+        stats["render_seconds"] += time.perf_counter() - render_started
+        for to_email, subject, html_content in messages:
+            email_outbox.enqueue_email(to_email, subject, html_content, commit=False)
+        # Claims and outbox rows land together, or not at all
+        db.session.commit()
+        db.session.expunge_all()
+        stats["queued"] += len(messages)
+        if email_outbox.outbox_pool is not None:
+            email_outbox.outbox_pool.wake()
+
+    elapsed = time.perf_counter() - started
+    stats["render_seconds"] = round(stats["render_seconds"], 3)
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["queued_per_second"] = round(stats["queued"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def run_campaign(app, name, **options):
+    with app.app_context():
+        try:
+            stats = fan_out(CAMPAIGNS[name](**options))
+            if stats["queued"]:
+                print(f"✅ Notification fan-out {name}: {stats}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Notification fan-out {name} failed: {str(e)}")
+
+
+def create_notification_scheduler(app, interval_minutes=FANOUT_INTERVAL_MINUTES):
+    """Periodic fan-out of every campaign; None when disabled (interval 0)"""
+    if interval_minutes <= 0:
+        return None
+    scheduler = BackgroundScheduler(daemon=True)
+    for name in CAMPAIGNS:
+        scheduler.add_job(run_campaign, 'interval', args=(app, name), minutes=interval_minutes,
+                          id=f"notify-{name}", max_instances=1, coalesce=True)
+    return scheduler
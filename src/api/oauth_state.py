@@ -0,0 +1,167 @@
+# src/api/oauth_state.py
+"""
+Signed, expiring OAuth ``state`` parameters with replay protection
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+STATE_VERSION = 1
+STATE_MAX_AGE_SECONDS = int(os.getenv('OAUTH_STATE_MAX_AGE', 600))
+REPLAY_CACHE_SIZE = int(os.getenv('OAUTH_STATE_REPLAY_CACHE_SIZE', 10000))
+
+# version, issued_at (unix seconds), nonce
+_HEADER = struct.Struct('>BI8s')
+_MAC_SIZE = 16
+
+
+class ReplayCache:
+    """
+    Bounded record of state nonces that have already been consumed.
+
+    Entries are kept in arrival order, so expiring old nonces and enforcing the
+    size bound are both O(1) pops from the front. A nonce only has to be
+    remembered for ``window_seconds`` after it was first seen: any state older
+    than that is already rejected by the expiry check.
+    """
+
+    def __init__(self, window_seconds=STATE_MAX_AGE_SECONDS, max_entries=REPLAY_CACHE_SIZE):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check_and_add(self, nonce, now=None):
+        """
+        Record ``nonce`` as used.
+
+        Returns:
+            bool: True the first time a nonce is seen, False on a replay
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._evict(now)
+            if nonce in self._entries:
+                return False
+            self._entries[nonce] = now + self.window_seconds
+            return True
+
+    def _evict(self, now):
+        while self._entries:
+            evict_at = next(iter(self._entries.values()))
+            if evict_at > now and len(self._entries) < self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class OAuthStateCodec:
+    """
+    Encodes OAuth state as ``base64url(header | oauth_type | user_type | mac)``.
+
+    The HMAC key is derived once when the codec is built instead of being read
+    from the environment on every request, and the payload is packed as bytes
+    rather than JSON so the resulting URL parameter stays short.
+    """
+
+    def __init__(self, secret, max_age_seconds=STATE_MAX_AGE_SECONDS, replay_cache=None):
+        self._key = hashlib.sha256(b'oauth-state:' + secret.encode()).digest()
+        self.max_age_seconds = max_age_seconds
+        self.replay_cache = replay_cache if replay_cache is not None else ReplayCache(max_age_seconds)
+
+    def encode(self, oauth_type, user_type='user', now=None):
+        """Create a signed state string for an OAuth redirect"""
+        issued_at = int(time.time() if now is None else now)
+        body = _HEADER.pack(STATE_VERSION, issued_at, secrets.token_bytes(8))
+        body += _pack_str(oauth_type) + _pack_str(user_type)
+        mac = hmac.new(self._key, body, hashlib.sha256).digest()[:_MAC_SIZE]
+        return base64.urlsafe_b64encode(body + mac).rstrip(b'=').decode('ascii')
+
+    def decode(self, state_param, now=None, consume=True):
+        """
+        Verify a state string produced by ``encode``.
+
+        Args:
+            state_param (str): The ``state`` query parameter from the callback
+            now (float, optional): Current unix time, for testing
+            consume (bool, optional): Reject later reuse of the same state. Defaults to True.
+
+        Returns:
+            dict|None: The decoded state, or None if it is forged, expired or replayed
+        """
+        try:
+            padded = state_param + '=' * (-len(state_param) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode('ascii'))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+        if len(raw) < _HEADER.size + _MAC_SIZE:
+            return None
+
+        body, mac = raw[:-_MAC_SIZE], raw[-_MAC_SIZE:]
+        expected_mac = hmac.new(self._key, body, hashlib.sha256).digest()[:_MAC_SIZE]
+        if not hmac.compare_digest(mac, expected_mac):
+            return None
+
+        version, issued_at, nonce = _HEADER.unpack_from(body)
+        if version != STATE_VERSION:
+            return None
+
+        now = time.time() if now is None else now
+        age = now - issued_at
+        if age < -30 or age > self.max_age_seconds:
+            return None
+
+        try:
+            oauth_type, offset = _unpack_str(body, _HEADER.size)
+            user_type, offset = _unpack_str(body, offset)
+        except (IndexError, UnicodeDecodeError):
+            return None
+
+        if consume and not self.replay_cache.check_and_add(nonce, now):
+            return None
+
+        return {
+            'oauth_type': oauth_type,
+            'user_type': user_type,
+            'timestamp': datetime.utcfromtimestamp(issued_at).isoformat()
+        }
+
+
+def _pack_str(value):
+    data = (value or '').encode('utf-8')[:255]
+    return bytes((len(data),)) + data
+
+
+def _unpack_str(buffer, offset):
+    length = buffer[offset]
+    start = offset + 1
+    end = start + length
+    if end > len(buffer):
+        raise IndexError('truncated state field')
+    return buffer[start:end].decode('utf-8'), end
+
+
+_codec = None
+_codec_lock = threading.Lock()
+
+
+def get_state_codec():
+    """Return the process-wide codec, building it on first use"""
+    global _codec
+    if _codec is None:
+        with _codec_lock:
+            if _codec is None:
+                _codec = OAuthStateCodec(os.getenv('JWT_SECRET_KEY', 'fallback_secret'))
+    return _codec
@@ -0,0 +1,188 @@
+# src/api/price_catalog.py
+"""
+In-memory catalog of Stripe prices and their products.
+
+The catalog is replaced wholesale on each refresh, so request handlers read
+pricing and validate ``STRIPE_PRICE_ID`` without a Stripe round trip. All
+loads happen on the ``price-catalog`` refresher thread, never on a request or
+the Stripe event worker: it loads the catalog as soon as the app starts
+serving, and reloads it when
+
+- the Stripe event worker applied a ``price.*`` or ``product.*`` webhook in
+  this process (it only marks the catalog stale and wakes the refresher);
+- such an event was recorded by another process (a cheap check on
+  ``stripe_event``);
+- the copy is older than ``PRICE_CATALOG_TTL_SECONDS``.
+
+If Stripe can't be reached the last good copy keeps being served, and before
+the first successful load validation is skipped rather than blocking payments.
+"""
+
+import os
+import threading
+import time
+
+import stripe
+
+from api.models import db, StripeEvent
+from api import stripe_gateway
+from api.workers import BackgroundWorkerPool
+
+
+PRICE_CATALOG_TTL_SECONDS = int(os.getenv('PRICE_CATALOG_TTL_SECONDS', 900))
+PRICE_CATALOG_POLL_SECONDS = 60.0
+CATALOG_EVENTS = (
+    'price.created', 'price.updated', 'price.deleted',
+    'product.created', 'product.updated', 'product.deleted'
+)
+
+catalog_pool = None
+
+
+class PriceUnavailable(Exception):
+    """The configured subscription price can't be subscribed to"""
+
+
+def _price_entry(price):
+    product = price['product']
+    expanded = not isinstance(product, str)
+    recurring = price['recurring']
+    return {
+        "id": price['id'],
+        "product": product['id'] if expanded else product,
+        "product_name": product['name'] if expanded else None,
+        "product_active": product['active'] if expanded else True,
+        "active": price['active'],
+        "nickname": price['nickname'],
+        "unit_amount": price['unit_amount'],
+        "currency": price['currency'],
+        "recurring": {
+            "interval": recurring['interval'],
+            "interval_count": recurring['interval_count']
+        } if recurring else None
+    }
+
+
+class PriceCatalog:
+    """Snapshot of every Stripe price, swapped atomically on refresh"""
+
+    def __init__(self, ttl=PRICE_CATALOG_TTL_SECONDS):
+        self.ttl = ttl
+        self._prices = {}
+        self._lock = threading.Lock()
+        self.loaded_at = None  # time.monotonic() of the last successful load
+        self._stale = False  # a catalog event arrived since the last load started
+        self.event_mark = 0  # newest catalog event (Stripe ``created``) the snapshot reflects
+        self.loads = 0
+        self.load_errors = 0
+        self.last_error = None
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def load(self):
+        """Fetch all prices (with their products) from Stripe; returns the number loaded"""
+        # Events recorded from here on may not be reflected in what we fetch
+        mark = _newest_catalog_event()
+        with self._lock:
+            self._stale = False
+        try:
+            first_page = stripe_gateway.call('price.list', stripe.Price.list, limit=100, expand=['data.product'])
+            prices = {price['id']: _price_entry(price) for price in first_page.auto_paging_iter()}
+        except stripe.error.StripeError as e:
+            with self._lock:
+                self._stale = True
+                self.load_errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            print(f"❌ Could not load the Stripe price catalog: {str(e)}")
+            return 0
+        with self._lock:
+            self._prices = prices
+            self.loaded_at = time.monotonic()
+            self.event_mark = max(self.event_mark, mark)
+            self.loads += 1
+            self.last_error = None
+        return len(prices)
+
+    def mark_stale(self):
+        """Have the refresher reload the catalog on its next run"""
+        with self._lock:
+            self._stale = True
+
+    def is_stale(self):
+        return self._stale or not self.loaded or time.monotonic() - self.loaded_at > self.ttl
+
+    def price(self, price_id):
+        return self._prices.get(price_id)
+
+    def prices(self):
+        return list(self._prices.values())
+
+    def subscription_price(self, price_id=None):
+        """
+        Catalog entry of the subscription price (``STRIPE_PRICE_ID``)
+
+        Returns:
+            dict: The price, or None if the catalog hasn't loaded yet (not validated)
+
+        Raises:
+            PriceUnavailable: The price isn't configured, doesn't exist, is archived or isn't recurring
+        """
+        price_id = price_id or os.getenv('STRIPE_PRICE_ID')
+        if not price_id:
+            raise PriceUnavailable("STRIPE_PRICE_ID environment variable not set")
+        if not self.loaded:
+            return None
+        price = self.price(price_id)
+        if price is None:
+            raise PriceUnavailable(f"Price {price_id} does not exist in Stripe")
+        if not price["active"] or not price["product_active"]:
+            raise PriceUnavailable(f"Price {price_id} is archived")
+        if not price["recurring"]:
+            raise PriceUnavailable(f"Price {price_id} is not a recurring price")
+        return price
+
+    def stats(self):
+        with self._lock:
+            return {
+                "prices": len(self._prices),
+                "loaded": self.loaded,
+                "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded else None,
+                "ttl_seconds": self.ttl,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "last_error": self.last_error
+            }
+
+
+price_catalog = PriceCatalog()
+
+
+def _newest_catalog_event():
+    # Catalog events have no customer, so this is served by ix_stripe_event_customer_id_created
+    return db.session.query(db.func.max(StripeEvent.created)).filter(
+        StripeEvent.customer_id.is_(None),
+        StripeEvent.type.in_(CATALOG_EVENTS)
+    ).scalar() or 0
+
+
+def handle_catalog_event(obj, event_id):
+    """Stripe event handler for ``price.*`` and ``product.*``: the refresher reloads the catalog"""
+    price_catalog.mark_stale()
+    if catalog_pool is not None:
+        catalog_pool.wake()
+
+
+def refresh_price_catalog(worker_id=None):
+    """Reload the catalog if it expired, was marked stale, or another process saw a catalog event"""
+    if price_catalog.is_stale() or _newest_catalog_event() > price_catalog.event_mark:
+        return 1 if price_catalog.load() else 0
+    return 0
+
+
+def create_catalog_pool(app):
+    global catalog_pool
+    catalog_pool = BackgroundWorkerPool(app, 'price-catalog', refresh_price_catalog,
+                                        num_workers=1, poll_interval=PRICE_CATALOG_POLL_SECONDS)
+    return catalog_pool
@@ -0,0 +1,449 @@
+# src/api/recording_commands.py
+"""
+Recording start/stop as queued commands instead of blocking VideoSDK calls.
+
+The start/stop routes move the recording to ``starting``/``stopping``
+through the state machine, store a ``RecordingCommand`` and answer 202 with
+its ``command_id`` at once, so a slow or unreachable VideoSDK never holds a
+web worker. The ``recording-commands`` workers then:
+
+1. send the command (``POST /hls/start`` or ``/sessions/<id>/end``) with
+   short connect/read timeouts; connection errors, timeouts, 429s and 5xx
+   replies are retried with exponential backoff, any other rejection fails
+   the command;
+2. reconcile: once sent, the command is settled by the VideoSDK webhooks
+   moving the recording on (``api.videosdk_events``). Until they do, the
+   worker polls VideoSDK's HLS list with a growing interval and applies what
+   it sees through the same state machine, and gives up after
+   ``RECORDING_COMMAND_MAX_POLLS`` checks.
+
+A failed start fails its recording. A stop that fails settles the recording
+too, as ``completed`` if VideoSDK's HLS list shows it ended and ``failed``
+otherwise, so the session can always start another recording.
+
+Clients follow a command with ``GET /api/recording-commands/<command_id>``.
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy.exc import IntegrityError
+
+from api.models import db, VideoSession, RecordingCommand
+from api.recording_state import transition
+from api.recordings import set_external_id
+from api.videosdk_events import notify_finished
+from api.services.videosdk_service import VideoSDKService
+from api.workers import BackgroundWorkerPool
+
+
+RECORDING_COMMAND_WORKERS = int(os.getenv('RECORDING_COMMAND_WORKERS', 2))
+# One at a time: each command can spend two VideoSDK calls at the full
+# timeouts, and a batch locked together could outlive its stale-lock window
+RECORDING_COMMAND_BATCH_SIZE = 1
+VIDEOSDK_CONNECT_TIMEOUT_SECONDS = float(os.getenv('VIDEOSDK_CONNECT_TIMEOUT_SECONDS', 3))
+VIDEOSDK_READ_TIMEOUT_SECONDS = float(os.getenv('VIDEOSDK_READ_TIMEOUT_SECONDS', 10))
+RECORDING_COMMAND_MAX_ATTEMPTS = 5
+RECORDING_COMMAND_BASE_BACKOFF_SECONDS = 5
+RECORDING_COMMAND_POLL_SECONDS = 10
+RECORDING_COMMAND_MAX_POLL_SECONDS = 300
+RECORDING_COMMAND_MAX_POLLS = 12
+# A command locked this long belongs to a worker that died
+RECORDING_COMMAND_STALE_LOCK_SECONDS = 120
+
+OPEN_STATUSES = ('pending', 'sent')
+# Recording status the command moves the session to, and the ones that settle it
+TARGET_STATUS = {'start': 'starting', 'stop': 'stopping'}
+SETTLED_STATUSES = {
+    'start': ('active', 'stopping', 'completed', 'failed'),
+    'stop': ('completed', 'failed')
+}
+
+recording_command_pool = None
+
+_metrics_lock = threading.Lock()
+metrics = {
+    "enqueued": 0,
+    "deduplicated": 0,
+    "sent": 0,
+    "retried": 0,
+    "polls": 0,
+    "completed": 0,
+    "failed": 0,
+    "api_calls": 0,
+    "api_errors": 0,
+    "api_seconds": 0.0
+}
+
+
+def _count(**increments):
+    with _metrics_lock:
+        for key, value in increments.items():
+            metrics[key] += value
+
+
+class _RetryLater(Exception):
+    """VideoSDK couldn't take the command now; try again after a backoff"""
+
+
+# ===========================================
+# ENQUEUE
+# ===========================================
+
+def _open_command(session_id, action):
+    return RecordingCommand.query.filter(
+        RecordingCommand.session_id == session_id,
+        RecordingCommand.action == action,
+        RecordingCommand.status.in_(OPEN_STATUSES)
+    ).first()
+
+
+def enqueue_command(session, user_id, action):
+    """
+    Move the session's recording to starting/stopping and queue the VideoSDK call
+
+    Args:
+        session (VideoSession): The session to record
+        user_id (int): The requesting user (the session's creator)
+        action (str): ``start`` or ``stop``
+
+    Returns:
+        RecordingCommand: The new command, or the one already open for this
+        session and action; None when the state machine rejected the change
+    """
+    existing = _open_command(session.id, action)
+    if existing is not None:
+        _count(deduplicated=1)
+        return existing
+
+    now = datetime.utcnow()
+    # Webhooks for this recording are received after now, older ones can't touch it
+    if transition(session.id, TARGET_STATUS[action], now) is None:
+        db.session.rollback()
+        return None
+    command = RecordingCommand(
+        command_id=uuid.uuid4().hex,
+        session_id=session.id,
+        user_id=user_id,
+        action=action,
+        status='pending',
+        attempts=0,
+        polls=0,
+        next_attempt_at=now,
+        created_at=now
+    )
+    db.session.add(command)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request queued the same command first (one open command
+        # per session and action); undo this transition and return that one
+        db.session.rollback()
+        existing = _open_command(session.id, action)
+        if existing is not None:
+            _count(deduplicated=1)
+        return existing
+    _count(enqueued=1)
+    if recording_command_pool is not None:
+        recording_command_pool.wake()
+    return command
+
+
+# ===========================================
+# WORKER
+# ===========================================
+
+def _due(now):
+    stale_before = now - timedelta(seconds=RECORDING_COMMAND_STALE_LOCK_SECONDS)
+    return db.and_(
+        RecordingCommand.status.in_(OPEN_STATUSES),
+        RecordingCommand.next_attempt_at <= now,
+        db.or_(RecordingCommand.locked_at.is_(None), RecordingCommand.locked_at < stale_before)
+    )
+
+
+def claim_commands(worker_id, batch_size=RECORDING_COMMAND_BATCH_SIZE, now=None):
+    """Lock up to ``batch_size`` due commands for ``worker_id``, oldest first"""
+    now = now or datetime.utcnow()
+    candidate_ids = [
+        row_id for (row_id,) in db.session.query(RecordingCommand.id)
+        .filter(_due(now))
+        .order_by(RecordingCommand.next_attempt_at, RecordingCommand.id)
+        .limit(batch_size)
+    ]
+    if not candidate_ids:
+        return []
+
+    RecordingCommand.query.filter(RecordingCommand.id.in_(candidate_ids), _due(now)).update(
+        {"locked_by": worker_id, "locked_at": now},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return [
+        row_id for (row_id,) in db.session.query(RecordingCommand.id).filter(
+            RecordingCommand.id.in_(candidate_ids),
+            RecordingCommand.locked_by == worker_id,
+            RecordingCommand.locked_at == now
+        ).order_by(RecordingCommand.id)
+    ]
+
+
+def _videosdk_call(fn, *args):
+    started = time.perf_counter()
+    try:
+        response = fn(*args, timeout=(VIDEOSDK_CONNECT_TIMEOUT_SECONDS, VIDEOSDK_READ_TIMEOUT_SECONDS))
+    except requests.exceptions.RequestException as e:
+        _count(api_calls=1, api_errors=1, api_seconds=time.perf_counter() - started)
+        raise _RetryLater(f"{type(e).__name__}: {e}")
+    _count(api_calls=1, api_seconds=time.perf_counter() - started,
+           api_errors=0 if response.status_code == 200 else 1)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise _RetryLater(f"VideoSDK returned {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def _finish(command, status, now, error=None):
+    command.status = status
+    command.finished_at = now
+    command.last_error = error
+    _count(**{status: 1})
+
+
+def _other_start_accepted(command):
+    # A start VideoSDK took after this one was queued drives the same recording
+    return db.session.query(RecordingCommand.id).filter(
+        RecordingCommand.session_id == command.session_id,
+        RecordingCommand.action == 'start',
+        RecordingCommand.id != command.id,
+        RecordingCommand.status.in_(('sent', 'completed')),
+        RecordingCommand.sent_at >= command.created_at
+    ).first() is not None
+
+
+def _fail(command, session, now, error, entries=None):
+    _finish(command, 'failed', now, error)
+    print(f"❌ Recording {command.action} command {command.command_id} failed: {error}")
+    if command.action == 'start':
+        if _other_start_accepted(command):
+            return
+        status, fields = 'failed', {}
+    else:
+        # A stop given up on still settles the recording, from what VideoSDK
+        # last reported (``entries``), so the session isn't left stopping with
+        # no way to start another one
+        hls_id = command.external_id or session.recording_id
+        # Without the ID the room's newest stream may be an earlier recording
+        status, fields = _hls_state(entries or [], hls_id) if hls_id else (None, {})
+        if status != 'completed':
+            status, fields = 'failed', {}
+    recording = transition(session.id, status, now, **fields)
+    if recording is not None:
+        notify_finished(session, recording, status)
+
+
+def _start_pending(command):
+    return db.session.query(RecordingCommand.id).filter(
+        RecordingCommand.session_id == command.session_id,
+        RecordingCommand.action == 'start',
+        RecordingCommand.status == 'pending',
+        RecordingCommand.id < command.id
+    ).first() is not None
+
+
+def _store_hls_id(command):
+    # Not a status change: the recording may already be stopping. Skipped if
+    # a newer start has replaced this recording.
+    newer_start = db.session.query(RecordingCommand.id).filter(
+        RecordingCommand.session_id == command.session_id,
+        RecordingCommand.action == 'start',
+        RecordingCommand.id > command.id
+    ).first()
+    if newer_start is None and command.external_id:
+        VideoSession.query.filter_by(id=command.session_id).update(
+            {"recording_id": command.external_id}, synchronize_session=False
+        )
+        set_external_id(command.session_id, command.external_id)
+
+
+def _send(action, meeting_id, hls_id):
+    """Make the command's VideoSDK call and return its response"""
+    videosdk = VideoSDKService()
+    if action == 'start':
+        webhook_url = f"{os.getenv('BACKEND_URL')}/api/videosdk/webhook"
+        return _videosdk_call(videosdk.start_hls, meeting_id, webhook_url)
+    if not hls_id:
+        raise _RetryLater("Recording has no VideoSDK session ID")
+    return _videosdk_call(videosdk.end_session, hls_id)
+
+
+def _accept(command, response, hls_id, now):
+    """Record that VideoSDK took the command; it is reconciled from here on"""
+    if command.action == 'start':
+        data = response.json()
+        command.external_id = data.get('sessionId', data.get('id'))
+        _store_hls_id(command)
+    else:
+        command.external_id = hls_id
+    command.status = 'sent'
+    command.sent_at = now
+    command.next_attempt_at = now + timedelta(seconds=RECORDING_COMMAND_POLL_SECONDS)
+    _count(sent=1)
+
+
+def _list_hls(meeting_id):
+    """The room's HLS streams as VideoSDK reports them, None when it couldn't tell"""
+    _count(polls=1)
+    try:
+        response = _videosdk_call(VideoSDKService().list_hls, meeting_id)
+    except _RetryLater:
+        return None
+    if response.status_code != 200:
+        return None
+    return response.json().get('data') or []
+
+
+def _hls_state(entries, hls_id):
+    # Newest HLS stream of the room (the one we started, when we know its ID)
+    entries = [entry for entry in entries if not hls_id or hls_id in (entry.get('id'), entry.get('sessionId'))]
+    if not entries:
+        return None, {}
+    entry = entries[0]
+    if entry.get('end'):
+        url = entry.get('playbackHlsUrl') or entry.get('downstreamUrl') or entry.get('livestreamUrl')
+        return 'completed', {"recording_url": url} if url else {}
+    if entry.get('start'):
+        return 'active', {}
+    return None, {}
+
+
+def _current_status(session_id):
+    return db.session.query(VideoSession.recording_status).filter_by(id=session_id).scalar()
+
+
+def _renew_lock(command_row_id, worker_id, now):
+    # Conditional on still holding the lock: a worker whose lock went stale
+    # and was re-claimed must not send the command a second time
+    return RecordingCommand.query.filter(
+        RecordingCommand.id == command_row_id,
+        RecordingCommand.locked_by == worker_id,
+        RecordingCommand.status.in_(OPEN_STATUSES)
+    ).update({"locked_at": now}, synchronize_session=False) > 0
+
+
+def execute_command(command_row_id, worker_id=None, now=None):
+    """
+    Send or reconcile one claimed command and record the outcome
+
+    Returns:
+        bool: False when ``worker_id`` no longer holds the command's lock
+    """
+    now = now or datetime.utcnow()
+    if worker_id is not None and not _renew_lock(command_row_id, worker_id, now):
+        db.session.commit()
+        print(f"⚠️ Recording command {command_row_id} is no longer locked by {worker_id}; skipped")
+        return False
+    command = RecordingCommand.query.get(command_row_id)
+    session = VideoSession.query.get(command.session_id)
+    # Read everything the VideoSDK calls need into locals and end the read
+    # transaction. No ORM object is touched again until the calls return, as
+    # even reading an expired attribute would open a new transaction.
+    action, status, external_id = command.action, command.status, command.external_id
+    attempts, polls = command.attempts, command.polls
+    meeting_id, hls_id = session.meeting_id, session.recording_id
+    settled = session.recording_status in SETTLED_STATUSES[action]
+    # A stop waits for its start to be answered, which brings the HLS ID
+    waiting = action == 'stop' and status == 'pending' and _start_pending(command)
+    db.session.commit()
+
+    response = error = entries = None
+    if status == 'pending' and not waiting:
+        try:
+            response = _send(action, meeting_id, hls_id)
+        except _RetryLater as e:
+            error = str(e)
+    elif status == 'sent' and not settled:
+        # Webhooks normally settle the command first
+        entries = _list_hls(meeting_id)
+    rejected = response is not None and response.status_code != 200
+    if action == 'stop' and (rejected or (error and attempts + 1 >= RECORDING_COMMAND_MAX_ATTEMPTS)):
+        # Last look before giving up on the stop: VideoSDK may have ended it anyway
+        entries = _list_hls(meeting_id)
+
+    if status == 'pending':
+        if waiting:
+            command.next_attempt_at = now + timedelta(seconds=RECORDING_COMMAND_POLL_SECONDS)
+        else:
+            command.attempts += 1
+            if rejected:
+                _fail(command, session, now, f"VideoSDK returned {response.status_code}: {response.text[:200]}",
+                      entries)
+            elif response is not None:
+                _accept(command, response, hls_id, now)
+            elif command.attempts >= RECORDING_COMMAND_MAX_ATTEMPTS:
+                _fail(command, session, now, error, entries)
+            else:
+                _count(retried=1)
+                command.last_error = error
+                command.next_attempt_at = now + timedelta(
+                    seconds=RECORDING_COMMAND_BASE_BACKOFF_SECONDS * 2 ** (command.attempts - 1)
+                )
+    elif not settled:
+        command.polls += 1
+        seen, fields = _hls_state(entries or [], external_id)
+        recording = transition(session.id, seen, now, **fields) if seen else None
+        if recording is not None:
+            notify_finished(session, recording, seen)
+
+    if command.status == 'sent':
+        if _current_status(session.id) in SETTLED_STATUSES[command.action]:
+            _finish(command, 'completed', now)
+        elif command.polls >= RECORDING_COMMAND_MAX_POLLS:
+            _fail(command, session, now, f"VideoSDK did not confirm the {command.action} after {command.polls} checks",
+                  entries)
+        elif command.polls:
+            delay = RECORDING_COMMAND_POLL_SECONDS * 2 ** (command.polls - 1)
+            command.next_attempt_at = now + timedelta(seconds=min(RECORDING_COMMAND_MAX_POLL_SECONDS, delay))
+    command.locked_by = None
+    command.locked_at = None
+    db.session.commit()
+    return True
+
+
+def process_recording_commands(worker_id, batch_size=RECORDING_COMMAND_BATCH_SIZE):
+    """Claim and execute one batch of commands. Returns the number handled."""
+    command_ids = claim_commands(worker_id, batch_size)
+    for command_row_id in command_ids:
+        try:
+            execute_command(command_row_id, worker_id)
+        except Exception as e:
+            db.session.rollback()
+            # Leave it locked; it is picked up again once the lock goes stale
+            print(f"❌ Error executing recording command {command_row_id}: {str(e)}")
+    return len(command_ids)
+
+
+def recording_command_stats():
+    counts = dict(
+        db.session.query(RecordingCommand.status, db.func.count(RecordingCommand.id))
+        .group_by(RecordingCommand.status).all()
+    )
+    with _metrics_lock:
+        stats = dict(metrics)
+    stats["api_avg_ms"] = round(stats["api_seconds"] / stats["api_calls"] * 1000, 1) if stats["api_calls"] else None
+    stats["api_seconds"] = round(stats["api_seconds"], 3)
+    stats["queue"] = counts
+    stats["timeouts"] = {"connect": VIDEOSDK_CONNECT_TIMEOUT_SECONDS, "read": VIDEOSDK_READ_TIMEOUT_SECONDS}
+    if recording_command_pool is not None:
+        stats["workers"] = recording_command_pool.stats()
+    return stats
+
+
+def create_recording_command_pool(app, num_workers=RECORDING_COMMAND_WORKERS):
+    global recording_command_pool
+    recording_command_pool = BackgroundWorkerPool(app, 'recording-commands', process_recording_commands,
+                                                  num_workers=num_workers, poll_interval=2.0)
+    return recording_command_pool
@@ -0,0 +1,103 @@
+# src/api/recording_state.py
+"""
+State machine for ``VideoSession.recording_status``.
+
+A recording moves ``none -> starting -> active -> stopping -> completed``,
+with ``failed`` reachable from any live state; ``TRANSITIONS`` lists the
+states each status may be entered from. Webhooks arrive late, twice and out
+of order, so a transition also carries the time of the event behind it
+(``recording_event_at``), always on our own clock: when a webhook was
+received, or when the routes or command worker made the change. An event
+older than the last one applied is rejected. Together with ``TRANSITIONS``
+that keeps a late ``hls-started`` from reviving a recording that already
+completed, and an event queued before a new start from touching the new
+recording.
+
+``transition`` applies a change with a single conditional UPDATE that checks
+the current status and event time in its WHERE clause, so two webhooks (or a
+webhook and the start/stop routes) racing on the same session can't both
+win. Applied transitions are mirrored onto the session's ``Recording`` row
+(``api.recordings``); rejected ones are counted per target status in
+``recording_state_stats``.
+"""
+
+import threading
+from datetime import datetime
+
+from api.models import db, VideoSession
+from api.recordings import sync_recording
+
+
+STATES = ('none', 'starting', 'active', 'stopping', 'completed', 'failed')
+# Final states and the notification each one sends
+RECORDING_OUTCOMES = {
+    'completed': 'ready',
+    'failed': 'failed'
+}
+
+# Target status -> statuses it may be entered from. ``starting`` re-enters
+# itself (hls-starting after the route) and follows a final state (a new recording).
+TRANSITIONS = {
+    'starting': ('none', 'starting', 'completed', 'failed'),
+    'active': ('none', 'starting'),
+    'stopping': ('starting', 'active'),
+    'completed': ('starting', 'active', 'stopping'),
+    'failed': ('none', 'starting', 'active', 'stopping')
+}
+
+_metrics_lock = threading.Lock()
+metrics = {
+    "applied": 0,
+    "rejected": 0,
+    "rejected_by_status": {status: 0 for status in TRANSITIONS}
+}
+
+
+def _count(status, applied):
+    with _metrics_lock:
+        if applied:
+            metrics["applied"] += 1
+        else:
+            metrics["rejected"] += 1
+            metrics["rejected_by_status"][status] += 1
+
+
+def transition(session_id, status, event_at=None, recording=None, **fields):
+    """
+    Move a session's recording to ``status`` if the state machine allows it
+
+    Args:
+        session_id (int): The VideoSession
+        status (str): Target recording status (a key of ``TRANSITIONS``)
+        event_at (datetime, optional): When we received the event or made the change; defaults to now
+        recording (dict, optional): Duration/size metadata for the Recording row
+        **fields: Other columns to set with it (values or SQL expressions)
+
+    Returns:
+        Recording: The session's Recording row the transition was mirrored
+        onto; None when it was rejected (not allowed from the current status,
+        or older than the last applied event)
+    """
+    event_at = event_at or datetime.utcnow()
+    sources = TRANSITIONS[status]
+    current = VideoSession.recording_status.in_(sources)
+    if 'none' in sources:
+        # Sessions created before the column had a default
+        current = db.or_(current, VideoSession.recording_status.is_(None))
+    updated = VideoSession.query.filter(
+        VideoSession.id == session_id,
+        current,
+        db.or_(VideoSession.recording_event_at.is_(None), VideoSession.recording_event_at <= event_at)
+    ).update(
+        dict(fields, recording_status=status, recording_event_at=event_at),
+        synchronize_session=False
+    )
+    _count(status, updated > 0)
+    if not updated:
+        return None
+    return sync_recording(session_id, status, event_at, recording)
+
+
+def recording_state_stats():
+    with _metrics_lock:
+        return dict(metrics, rejected_by_status=dict(metrics["rejected_by_status"]))
@@ -0,0 +1,125 @@
+# src/api/recordings.py
+"""
+Recordings as rows of their own, many per video session.
+
+``VideoSession.recording_status``/``recording_id``/``recording_url`` still
+describe the session's current recording and drive the state machine in
+``api.recording_state``. Every transition it applies is mirrored here by
+``sync_recording`` onto the session's live ``Recording`` (the newest one not
+yet completed or failed), so starting a second recording opens a new row
+instead of overwriting the first.
+
+``list_recordings`` serves a user's catalog newest first with keyset
+pagination over ``ix_recording_owner_id_created_at``, a single index range
+scan however many sessions or recordings the user has.
+"""
+
+from datetime import datetime
+
+from api import timezone_format
+from api.models import db, VideoSession, Recording
+
+
+RECORDINGS_PAGE_SIZE = 50
+RECORDINGS_MAX_PAGE_SIZE = 200
+FINAL_STATUSES = ('completed', 'failed')
+
+
+def sync_recording(session_id, status, event_at, metadata=None):
+    """
+    Mirror a session's recording transition onto its live Recording; the caller commits
+
+    Runs right after the conditional UPDATE on the session, whose row lock
+    keeps concurrent transitions of the same session from interleaving here.
+
+    Args:
+        session_id (int): The VideoSession that just transitioned
+        status (str): Its new recording status
+        event_at (datetime): When the event happened (naive UTC)
+        metadata (dict, optional): ``duration_seconds``/``size_bytes`` reported with the event
+
+    Returns:
+        Recording: The created or updated row
+    """
+    session = db.session.query(
+        VideoSession.creator_id, VideoSession.meeting_id, VideoSession.recording_id, VideoSession.recording_url
+    ).filter_by(id=session_id).one()
+    recording = Recording.query.filter(
+        Recording.session_id == session_id,
+        Recording.status.notin_(FINAL_STATUSES)
+    ).order_by(Recording.created_at.desc(), Recording.id.desc()).first()
+    if recording is None:
+        # A new start, or a recording whose start we never saw
+        recording = Recording(session_id=session_id, owner_id=session.creator_id, meeting_id=session.meeting_id,
+                              created_at=event_at)
+        db.session.add(recording)
+        if status == 'starting':
+            # The session still holds the previous recording's ID until VideoSDK answers
+            recording.status = status
+            db.session.flush()
+            return recording
+
+    recording.status = status
+    recording.external_id = session.recording_id or recording.external_id
+    if status in FINAL_STATUSES:
+        recording.finished_at = event_at
+        if status == 'completed':
+            recording.url = session.recording_url
+        metadata = metadata or {}
+        recording.size_bytes = metadata.get('size_bytes')
+        recording.duration_seconds = metadata.get('duration_seconds')
+        if recording.duration_seconds is None and recording.created_at:
+            # Postgres hands back created_at as aware, event times are naive UTC
+            elapsed = timezone_format.to_utc(event_at) - timezone_format.to_utc(recording.created_at)
+            recording.duration_seconds = max(0, int(elapsed.total_seconds()))
+    db.session.flush()
+    return recording
+
+
+def set_external_id(session_id, external_id):
+    """Record the VideoSDK ID of a session's live recording once it is known; the caller commits"""
+    Recording.query.filter(
+        Recording.session_id == session_id,
+        Recording.status.notin_(FINAL_STATUSES)
+    ).update({"external_id": external_id}, synchronize_session=False)
+
+
+def _cursor(recording):
+    return f"{recording.created_at.isoformat()}~{recording.id}"
+
+
+def _parse_cursor(cursor):
+    created_at, _, recording_id = cursor.rpartition('~')
+    return datetime.fromisoformat(created_at), int(recording_id)
+
+
+def list_recordings(owner_id, limit=RECORDINGS_PAGE_SIZE, before=None):
+    """
+    A page of a user's recordings, newest first
+
+    Args:
+        owner_id (int): The user
+        limit (int): Page size (capped at ``RECORDINGS_MAX_PAGE_SIZE``)
+        before (str, optional): ``next_cursor`` of the previous page
+
+    Returns:
+        tuple: (list of Recording, next_cursor or None)
+
+    Raises:
+        ValueError: ``before`` isn't a cursor returned by this function
+    """
+    limit = max(1, min(int(limit), RECORDINGS_MAX_PAGE_SIZE))
+    query = Recording.query.filter(Recording.owner_id == owner_id)
+    if before:
+        created_at, recording_id = _parse_cursor(before)
+        query = query.filter(db.tuple_(Recording.created_at, Recording.id) < (created_at, recording_id))
+    recordings = query.order_by(Recording.created_at.desc(), Recording.id.desc()).limit(limit + 1).all()
+    next_cursor = _cursor(recordings[limit - 1]) if len(recordings) > limit else None
+    return recordings[:limit], next_cursor
+
+
+def session_recordings(session_id):
+    """Every recording of one session, newest first"""
+    return Recording.query.filter_by(session_id=session_id).order_by(
+        Recording.created_at.desc(), Recording.id.desc()
+    ).all()
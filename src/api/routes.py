@@ -5,7 +5,7 @@ import os
 from datetime import datetime, timedelta
 import stripe
 
-from flask import Flask, request, jsonify, url_for, Blueprint, current_app, redirect, session, Response
+from flask import Flask, request, jsonify, url_for, Blueprint, current_app, redirect, session, Response, stream_with_context
 from flask_cors import CORS, cross_origin
 import jwt
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
@@ -14,16 +14,32 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from api.services.videosdk_service import VideoSDKService
 
 # Updated imports for new models
-from api.models import db, User, UserImage, VideoSession
+from api.models import db, User, UserImage, VideoSession, RecordingCommand
 from api.utils import generate_sitemap, APIException
 from api.send_email import send_email, send_verification_email_code
 from api.decorators import premium_required, recording_required
+from api.oauth_state import get_state_codec
+from api.token_revocation import revocation_list, revoke_token
+from api.login_throttle import login_throttle, verify_code_throttle, throttle_key
+from api.user_provisioning import bulk_upsert_users
+from api.email_outbox import outbox_stats
+from api.notification_digest import digest_stats
+from api.stripe_events import record_event, stripe_event_stats
+from api.videosdk_events import record_webhook, InvalidWebhook, videosdk_event_stats
+from api.recording_commands import enqueue_command, recording_command_stats
+from api.recordings import list_recordings, session_recordings, RECORDINGS_PAGE_SIZE
+from api import stripe_gateway
+from api.price_catalog import price_catalog, PriceUnavailable
+from api.entitlements import entitlement_for, invalidate as invalidate_entitlement, entitlement_cache
+from api.calendar_feed import get_feed_token, find_feed_user, feed_validators, is_not_modified, stream_feed, feed_stats
 
 from urllib.parse import urlencode
 import json
 from google.oauth2.credentials import Credentials
 import requests # For making HTTP requests to OAuth
 import secrets # For generating secure state tokens for OAuth
+import re
+import uuid
 
 
 
@@ -39,6 +55,8 @@ STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_CLIENT_ID = os.getenv("STRIPE_CLIENT_ID")
 STRIPE_CALLBACK_URL = f"{os.getenv('BACKEND_URL')}/api/stripe/callback"
 stripe.api_key = STRIPE_SECRET_KEY
+# Subscriptions a replayed or reused payment must not grant premium for
+ENDED_SUBSCRIPTION_STATUSES = ('canceled', 'incomplete_expired')
 
 
 api = Blueprint('api', __name__)
@@ -115,7 +133,7 @@ def user_register():
     if email is None or password is None or first_name is None or last_name is None:
         return jsonify({"msg": "Some fields are missing in your request"}), 400
         
-    existing_user_email = User.query.filter_by(email=email).one_or_none()
+    existing_user_email = User.find_by_email(email)
     if existing_user_email:
         return jsonify({"msg": "An account associated with the email already exists"}), 409
 
@@ -144,6 +162,17 @@ def user_register():
     return jsonify(response_body), 201
 
 
+def throttled_response(retry_after):
+    """429 response for callers locked out by a login throttle"""
+    retry_after = int(retry_after) + 1
+    response = jsonify({
+        "msg": "Too many failed attempts. Please try again later.",
+        "retry_after_seconds": retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
 @api.route('/login', methods=['POST'])
 def user_login():
     """Unified user login for video chat app"""
@@ -152,14 +181,24 @@ def user_login():
 
     if email is None or password is None:
         return jsonify({"msg": "Email and password are required."}), 400
+
+    # Reject locked-out emails/IPs before any DB lookup or password hashing
+    throttle_keys = {"email": throttle_key(email), "ip": request.remote_addr}
+    retry_after = login_throttle.check(**throttle_keys)
+    if retry_after:
+        return throttled_response(retry_after)
     
-    user = User.query.filter_by(email=email).one_or_none()
+    user = User.find_by_email(email)
     if user is None:
+        login_throttle.record_failure(**throttle_keys)
         return jsonify({"msg": "No user with this email exists."}), 404
     
     if not check_password_hash(user.password, password):
+        login_throttle.record_failure(**throttle_keys)
         return jsonify({"msg": "Incorrect password, please try again."}), 401
 
+    login_throttle.reset(email=throttle_keys["email"])
+
     if not user.is_verified:
         return jsonify({"msg": "Please verify your email address before logging in."}), 403
 
@@ -174,6 +213,100 @@ def user_login():
     }), 200
 
 
+@api.route('/logout', methods=['POST'])
+@jwt_required()
+def user_logout():
+    """Revoke the access token used for this request"""
+    revoke_token(get_jwt())
+    return jsonify({"msg": "Successfully logged out"}), 200
+
+
+@api.route('/debug/login-throttle', methods=['GET'])
+@jwt_required()
+def debug_login_throttle():
+    """Report rejected and failed login/verification attempts for this worker"""
+    return jsonify({
+        "login": login_throttle.stats(),
+        "verify_code": verify_code_throttle.stats()
+    }), 200
+
+
+@api.route('/debug/email-outbox', methods=['GET'])
+@jwt_required()
+def debug_email_outbox():
+    """Report email outbox queue depth by status and worker counters"""
+    return jsonify(outbox_stats()), 200
+
+
+@api.route('/debug/notification-digest', methods=['GET'])
+@jwt_required()
+def debug_notification_digest():
+    """Report pending digest notifications and how many sends coalescing saved"""
+    return jsonify(digest_stats()), 200
+
+
+@api.route('/debug/entitlements', methods=['GET'])
+@jwt_required()
+def debug_entitlements():
+    """Report how often subscription gates were answered from the entitlement memo"""
+    return jsonify(entitlement_cache.stats()), 200
+
+
+@api.route('/debug/stripe-gateway', methods=['GET'])
+@jwt_required()
+def debug_stripe_gateway():
+    """Report per-operation Stripe API latency, retries and errors"""
+    return jsonify(stripe_gateway.gateway_stats()), 200
+
+
+@api.route('/debug/stripe-events', methods=['GET'])
+@jwt_required()
+def debug_stripe_events():
+    """Report Stripe webhook event queue depth and how many deliveries were duplicates"""
+    return jsonify(stripe_event_stats()), 200
+
+
+@api.route('/debug/videosdk-events', methods=['GET'])
+@jwt_required()
+def debug_videosdk_events():
+    """Report VideoSDK webhook queue depth, duplicates, and recording transitions applied or rejected"""
+    return jsonify(videosdk_event_stats()), 200
+
+
+@api.route('/debug/recording-commands', methods=['GET'])
+@jwt_required()
+def debug_recording_commands():
+    """Report the recording command queue and VideoSDK call latency seen by the workers"""
+    return jsonify(recording_command_stats()), 200
+
+
+@api.route('/debug/token-denylist', methods=['GET'])
+@jwt_required()
+def debug_token_denylist():
+    """Report size and false-positive rate of this worker's revocation filter"""
+    return jsonify(revocation_list.stats()), 200
+
+
+@api.route('/admin/users/bulk-upsert', methods=['POST'])
+def admin_bulk_upsert_users():
+    """Provision many users in one request (requires the ADMIN_API_KEY header)"""
+    admin_key = os.getenv('ADMIN_API_KEY')
+    if not admin_key or not secrets.compare_digest(request.headers.get('X-Admin-Key', ''), admin_key):
+        return jsonify({"msg": "Admin access required"}), 403
+
+    data = request.get_json() or {}
+    users = data.get('users')
+    if not isinstance(users, list) or not users:
+        return jsonify({"msg": "A non-empty 'users' list is required"}), 400
+
+    try:
+        stats = bulk_upsert_users(users, update_existing=not data.get('skip_existing', False))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return jsonify({"success": True, "stats": stats}), 200
+
+
 # NEW: Video Session Management Routes
 @api.route('/create-session', methods=['POST'])
 @jwt_required()
@@ -185,8 +318,8 @@ def create_video_session():
     if not user:
         return jsonify({"msg": "User not found"}), 404
     
-    # Check subscription limits
-    if user.subscription_status == 'premium':
+    # Check subscription limits (paid period or grace window, no Stripe call)
+    if entitlement_for(user_id, user).allows('premium'):
         # Premium users can only have 1 active session
         active_sessions = VideoSession.query.filter_by(
             creator_id=user_id, 
@@ -346,48 +479,82 @@ def get_session_status(meeting_id):
     }), 200
 
 
+# ===========================================
+# CALENDAR FEED ROUTES
+# ===========================================
+
+@api.route('/calendar/feed', methods=['GET', 'POST'])
+@jwt_required()
+def calendar_feed_url():
+    """Subscription URL for the user's session calendar (POST issues a new one)"""
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return jsonify({"msg": "User not found"}), 404
+    token = get_feed_token(user, rotate=request.method == 'POST')
+    return jsonify({"feed_url": f"{BACKEND_URL}/api/calendar/{token}.ics"}), 200
+
+
+@api.route('/calendar/<token>.ics', methods=['GET'])
+def calendar_feed(token):
+    """ICS feed of the user's sessions; answers 304 while nothing has changed"""
+    user = find_feed_user(token)
+    if not user:
+        return jsonify({"msg": "Calendar feed not found"}), 404
+
+    now = datetime.utcnow()
+    etag, last_modified = feed_validators(user.id, now)
+    if is_not_modified(request, etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = Response(stream_with_context(stream_feed(user.id, now)), mimetype='text/calendar')
+        response.headers['Content-Disposition'] = 'inline; filename="devmentor-sessions.ics"'
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api.route('/debug/calendar-feed', methods=['GET'])
+@jwt_required()
+def debug_calendar_feed():
+    """Report how many feed polls were answered with 304"""
+    return jsonify(feed_stats()), 200
+
+
 # NEW: Subscription Management Routes
 @api.route('/debug-stripe', methods=['GET'])
 @jwt_required()
 def debug_stripe():
-    """Debug Stripe API connection and list available prices"""
-    try:
-        # Test API connection and list prices
-        prices = stripe.Price.list(limit=10)
-        
-        # Check if our specific price exists
-        target_price_id = os.getenv('STRIPE_PRICE_ID')
-        price_found = False
-        
-        for price in prices.data:
-            if price.id == target_price_id:
-                price_found = True
-                break
-        
-        return jsonify({
-            "api_connection": "success",
-            "stripe_key_type": "test" if os.getenv('STRIPE_SECRET_KEY', '').startswith('sk_test_') else "live",
-            "target_price_id": target_price_id,
-            "price_found": price_found,
-            "available_prices": [
-                {
-                    "id": price.id,
-                    "product": price.product,
-                    "unit_amount": price.unit_amount,
-                    "currency": price.currency,
-                    "recurring": price.recurring
-                } for price in prices.data
-            ]
-        }), 200
-        
-    except Exception as e:
+    """Report the cached Stripe price catalog and whether STRIPE_PRICE_ID is usable"""
+    target_price_id = os.getenv('STRIPE_PRICE_ID')
+    stripe_key_type = "test" if os.getenv('STRIPE_SECRET_KEY', '').startswith('sk_test_') else "live"
+    catalog = price_catalog.stats()
+    if not catalog["loaded"]:
         return jsonify({
             "api_connection": "failed",
-            "error": str(e),
-            "stripe_key_type": "test" if os.getenv('STRIPE_SECRET_KEY', '').startswith('sk_test_') else "live",
-            "target_price_id": os.getenv('STRIPE_PRICE_ID')
+            "error": catalog["last_error"] or "Price catalog not loaded yet",
+            "stripe_key_type": stripe_key_type,
+            "target_price_id": target_price_id,
+            "catalog": catalog
         }), 500
 
+    try:
+        price_catalog.subscription_price()
+        price_problem = None
+    except PriceUnavailable as e:
+        price_problem = str(e)
+
+    return jsonify({
+        "api_connection": "success",
+        "stripe_key_type": stripe_key_type,
+        "target_price_id": target_price_id,
+        "price_found": price_catalog.price(target_price_id) is not None,
+        "price_problem": price_problem,
+        "available_prices": price_catalog.prices(),
+        "catalog": catalog
+    }), 200
+
 
 @api.route('/create-subscription', methods=['POST'])
 @jwt_required()
@@ -401,34 +568,45 @@ def create_subscription():
     
     if user.subscription_status == 'premium':
         return jsonify({"msg": "User already has premium subscription"}), 400
+
+    # Don't take a payment for a price we can't subscribe the user to
+    try:
+        price = price_catalog.subscription_price()
+    except PriceUnavailable as e:
+        print(f"❌ Subscription price unavailable: {str(e)}")
+        return jsonify({"msg": "Subscriptions are temporarily unavailable"}), 503
     
     try:
         # Create or get Stripe customer
         if not user.stripe_customer_id:
-            stripe_customer = stripe.Customer.create(
-                email=user.email,
-                name=f"{user.first_name} {user.last_name}"
-            )
+            stripe_customer = stripe_gateway.create_customer(user)
             user.stripe_customer_id = stripe_customer.id
             db.session.commit()
         else:
             # Verify the customer exists, if not create a new one
             try:
-                stripe.Customer.retrieve(user.stripe_customer_id)
+                stripe_gateway.retrieve_customer(user.stripe_customer_id)
             except stripe.error.InvalidRequestError:
                 print(f"🔍 DEBUG - Customer {user.stripe_customer_id} not found, creating new one")
-                stripe_customer = stripe.Customer.create(
-                    email=user.email,
-                    name=f"{user.first_name} {user.last_name}"
-                )
+                stripe_customer = stripe_gateway.create_customer(user, replacing=user.stripe_customer_id)
                 user.stripe_customer_id = stripe_customer.id
                 db.session.commit()
         
+        # One PaymentIntent per checkout form: resubmitting it reuses the
+        # intent, a new checkout gets a new one
+        data = request.get_json(silent=True) or {}
+        attempt_id = str(data.get('attempt_id') or '')
+        if not re.fullmatch(r'[A-Za-z0-9_-]{8,64}', attempt_id):
+            attempt_id = uuid.uuid4().hex
+
         # Create a payment intent for $3 and save payment method for future use
-        payment_intent = stripe.PaymentIntent.create(
-            amount=300,  # $3.00 in cents
-            currency='usd',
-            customer=user.stripe_customer_id,
+        payment_intent = stripe_gateway.create_payment_intent(
+            user.id,
+            user.stripe_customer_id,
+            attempt_id,
+            # The subscription price's first period, or $3.00 before the catalog has loaded
+            amount=price["unit_amount"] if price else 300,
+            currency=price["currency"] if price else 'usd',
             setup_future_usage='off_session',  # Save payment method for future use
             metadata={
                 'user_id': str(user_id),
@@ -441,7 +619,9 @@ def create_subscription():
         
         return jsonify({
             "client_secret": payment_intent.client_secret,
-            "status": "requires_payment_method"
+            "payment_intent_id": payment_intent.id,
+            # "succeeded" when this checkout was already paid and only needs confirming
+            "status": payment_intent.status
         }), 200
         
     except Exception as e:
@@ -480,7 +660,7 @@ def confirm_subscription():
         
         # Verify the payment intent was successful
         print(f"🔍 DEBUG - Retrieving payment intent from Stripe")
-        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        payment_intent = stripe_gateway.retrieve_payment_intent(payment_intent_id)
         print(f"🔍 DEBUG - Payment intent status: {payment_intent.status}")
         
         if payment_intent.status != 'succeeded':
@@ -491,6 +671,12 @@ def confirm_subscription():
         print(f"🔍 DEBUG - User customer: {user.stripe_customer_id}")
         if payment_intent.customer != user.stripe_customer_id:
             return jsonify({"msg": "Payment verification failed"}), 400
+
+        # A payment pays for one subscription: once that one is gone the
+        # payment can't be confirmed again
+        used_for = (payment_intent.metadata or {}).get('subscription_id')
+        if used_for and stripe_gateway.retrieve_subscription(used_for).status in ENDED_SUBSCRIPTION_STATUSES:
+            return jsonify({"msg": "This payment was already used for a subscription that has ended"}), 400
         
         # Get the payment method from the successful payment intent
         payment_method = payment_intent.payment_method
@@ -499,27 +685,28 @@ def confirm_subscription():
         # Set the payment method as default for the customer (should already be attached)
         print(f"🔍 DEBUG - Setting default payment method for customer")
         try:
-            stripe.Customer.modify(
-                user.stripe_customer_id,
-                invoice_settings={
-                    'default_payment_method': payment_method
-                }
-            )
+            stripe_gateway.set_default_payment_method(user.id, user.stripe_customer_id, payment_method)
             print(f"🔍 DEBUG - Set default payment method for customer: {user.stripe_customer_id}")
         except Exception as pm_error:
             print(f"🔍 DEBUG - Error setting default payment method: {str(pm_error)}")
             # Continue anyway - the subscription creation might still work
         
-        # Check STRIPE_PRICE_ID environment variable
+        # Check STRIPE_PRICE_ID against the cached price catalog
         price_id = os.getenv('STRIPE_PRICE_ID')
         print(f"🔍 DEBUG - STRIPE_PRICE_ID: {price_id}")
-        
-        if not price_id:
-            raise Exception("STRIPE_PRICE_ID environment variable not set")
+        try:
+            price = price_catalog.subscription_price(price_id)
+        except PriceUnavailable as e:
+            print(f"❌ Subscription price unavailable: {str(e)}")
+            return jsonify({"msg": "Subscriptions are temporarily unavailable"}), 503
+        if price:
+            price_id = price["id"]
         
         # Create the subscription with automatic payment behavior
         print(f"🔍 DEBUG - Creating subscription with price ID: {price_id}")
-        subscription = stripe.Subscription.create(
+        subscription = stripe_gateway.create_subscription(
+            user.id,
+            payment_intent_id,
             customer=user.stripe_customer_id,
             items=[{
                 'price': price_id  # $3/month price ID
@@ -530,6 +717,13 @@ def confirm_subscription():
         )
         
         print(f"🔍 DEBUG - Created subscription: {subscription.id}, status: {subscription.status}")
+
+        # Stripe replays the original subscription for a repeated confirm,
+        # which may have been canceled since
+        if subscription.status in ENDED_SUBSCRIPTION_STATUSES:
+            return jsonify({"msg": "This payment was already used for a subscription that has ended"}), 400
+        if not used_for:
+            stripe_gateway.mark_payment_intent_used(user.id, payment_intent_id, subscription.id)
         
         # Update user status immediately
         print(f"🔍 DEBUG - Updating user status to premium")
@@ -569,6 +763,7 @@ def confirm_subscription():
             print(f"🔍 DEBUG - Using error fallback current_period_end: {user.current_period_end}")
         
         db.session.commit()
+        invalidate_entitlement(user.id)
         
         print(f"🔍 DEBUG - Successfully updated user {user_id} to premium status")
         
@@ -601,12 +796,13 @@ def cancel_subscription():
         return jsonify({"msg": "No active subscription found"}), 404
     
     try:
-        stripe.Subscription.delete(user.subscription_id)
+        stripe_gateway.cancel_subscription(user.subscription_id)
         
         user.subscription_status = 'free'
         user.subscription_id = None
         user.current_period_end = None
         db.session.commit()
+        invalidate_entitlement(user.id)
         
         return jsonify({"msg": "Subscription cancelled successfully"}), 200
         
@@ -627,7 +823,8 @@ def get_subscription_status():
     
     return jsonify({
         "subscription_status": user.subscription_status,
-        "current_period_end": user.current_period_end.isoformat() if user.current_period_end else None
+        "current_period_end": user.current_period_end.isoformat() if user.current_period_end else None,
+        "entitlement": entitlement_for(user.id, user).serialize()
     }), 200
 
 
@@ -702,10 +899,16 @@ def verify_code():
     if not email or not code:
         return jsonify({"msg": "Email and code are required"}), 400
 
+    throttle_keys = {"email": throttle_key(email), "ip": request.remote_addr}
+    retry_after = verify_code_throttle.check(**throttle_keys)
+    if retry_after:
+        return throttled_response(retry_after)
+
     # Check user in new unified system
-    user = User.query.filter_by(email=email).first()
+    user = User.find_by_email(email)
 
     if not user:
+        verify_code_throttle.record_failure(**throttle_keys)
         return jsonify({"msg": "User not found"}), 404
     
     # Developer bypass code
@@ -719,8 +922,10 @@ def verify_code():
         user.is_verified = True
         user.verification_code = None
         db.session.commit()
+        verify_code_throttle.reset(email=throttle_keys["email"])
         return jsonify({"msg": "Email verified successfully"}), 200
     else:
+        verify_code_throttle.record_failure(**throttle_keys)
         return jsonify({"msg": "Invalid verification code"}), 400
 
 
@@ -740,55 +945,9 @@ def stripe_webhook():
     except stripe.error.SignatureVerificationError:
         return jsonify({"error": "Invalid signature"}), 400
 
-    # Handle subscription events
-    if event['type'] == 'customer.subscription.created':
-        subscription = event['data']['object']
-        # Update user to premium
-        user = User.query.filter_by(stripe_customer_id=subscription['customer']).first()
-        if user:
-            user.subscription_status = 'premium'
-            user.subscription_id = subscription['id']
-            user.current_period_end = datetime.fromtimestamp(subscription['current_period_end'])
-            db.session.commit()
-    
-    elif event['type'] == 'customer.subscription.updated':
-        subscription = event['data']['object']
-        user = User.query.filter_by(stripe_customer_id=subscription['customer']).first()
-        if user:
-            if subscription['status'] == 'active':
-                user.subscription_status = 'premium'
-            else:
-                user.subscription_status = 'free'
-            user.current_period_end = datetime.fromtimestamp(subscription['current_period_end'])
-            db.session.commit()
-    
-    elif event['type'] == 'customer.subscription.deleted':
-        subscription = event['data']['object']
-        user = User.query.filter_by(stripe_customer_id=subscription['customer']).first()
-        if user:
-            user.subscription_status = 'free'
-            user.subscription_id = None
-            user.current_period_end = None
-            db.session.commit()
-    
-    elif event['type'] == 'invoice.payment_succeeded':
-        invoice = event['data']['object']
-        # Subscription payment succeeded - keep user as premium
-        if invoice.get('subscription'):
-            user = User.query.filter_by(stripe_customer_id=invoice['customer']).first()
-            if user:
-                user.subscription_status = 'premium'
-                db.session.commit()
-    
-    elif event['type'] == 'invoice.payment_failed':
-        invoice = event['data']['object']
-        # Handle failed payment - could downgrade or send notification
-        if invoice.get('subscription'):
-            user = User.query.filter_by(stripe_customer_id=invoice['customer']).first()
-            if user:
-                # Note: Stripe will retry payment automatically
-                # You might want to send an email notification here
-                pass
+    # Persist and acknowledge; a background worker applies it (duplicates are no-ops)
+    if not record_event(event, payload.decode('utf-8')):
+        return jsonify({"status": "duplicate"}), 200
 
     return jsonify({"status": "success"}), 200
 
@@ -799,215 +958,18 @@ def stripe_webhook():
 
 @api.route('/videosdk/webhook', methods=['POST', 'GET'])
 def videosdk_webhook():
-    """Handle VideoSDK webhook events for recording lifecycle"""
-    try:
-        print(f"🎬 VideoSDK Webhook endpoint called - Method: {request.method}")
-        print(f"📊 Request headers: {dict(request.headers)}")
-        
-        # Handle GET requests for webhook testing
-        if request.method == 'GET':
-            print("🔍 GET request to webhook endpoint - endpoint is accessible")
-            return jsonify({"status": "webhook endpoint accessible", "method": "GET"}), 200
-        
-        data = request.get_json()
-        
-        # VideoSDK uses 'webhookType' field instead of 'event'
-        webhook_type = data.get('webhookType') if data else None
-        event_type = data.get('event') if data else None
-        
-        print(f"🎬 VideoSDK Webhook received - webhookType: {webhook_type}, event: {event_type}")
-        print(f"📊 Webhook data: {data}")
-        
-        # Handle new VideoSDK webhook format (webhookType)
-        if webhook_type == 'hls-starting':
-            print("🔄 HLS Recording starting...")
-            # Handle starting event - could update status if needed
-            handle_hls_starting(data.get('data', {}))
-        elif webhook_type == 'hls-started':
-            print("✅ HLS Recording started!")
-            handle_hls_started(data.get('data', {}))
-        elif webhook_type == 'hls-playable':
-            print("🎬 HLS Stream is playable!")
-            # Stream is ready for playback - could be useful for live streaming
-        elif webhook_type == 'hls-stopping':
-            print("🔄 HLS Recording stopping...")
-            handle_hls_stopping(data.get('data', {}))
-        elif webhook_type == 'hls-stopped':
-            print("🛑 HLS Recording stopped!")
-            handle_hls_stopped(data.get('data', {}))
-        elif webhook_type == 'hls-failed':
-            print("❌ HLS Recording failed!")
-            handle_hls_failed(data.get('data', {}))
-        # Handle legacy event format as fallback
-        elif event_type == 'hls.started':
-            handle_hls_started(data)
-        elif event_type == 'hls.stopped':
-            handle_hls_stopped(data)
-        elif event_type == 'hls.failed':
-            handle_hls_failed(data)
-        elif event_type == 'recording.started':
-            handle_recording_started(data)
-        elif event_type == 'recording.stopped':
-            handle_recording_stopped(data)
-        elif event_type == 'recording.failed':
-            handle_recording_failed(data)
-        else:
-            print(f"⚠️ Unknown VideoSDK webhook type: {webhook_type} or event: {event_type}")
-        
-        return jsonify({"status": "success"}), 200
-        
-    except Exception as e:
-        print(f"❌ Error processing VideoSDK webhook: {str(e)}")
-        return jsonify({"error": "Webhook processing failed"}), 400
+    """Validate and queue a VideoSDK recording/HLS event; a background worker applies it"""
+    # Handle GET requests for webhook testing
+    if request.method == 'GET':
+        return jsonify({"status": "webhook endpoint accessible", "method": "GET"}), 200
 
-def handle_recording_started(data):
-    """Handle recording started event"""
     try:
-        meeting_id = data.get('meetingId')
-        recording_id = data.get('recordingId')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            session.recording_id = recording_id
-            session.recording_status = 'active'
-            db.session.commit()
-            print(f"✅ Recording started for session {session.id}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling recording started: {str(e)}")
+        status = record_webhook(request.get_data())
+    except InvalidWebhook as e:
+        print(f"⚠️ Rejected VideoSDK webhook: {str(e)}")
+        return jsonify({"error": str(e)}), 400
 
-def handle_recording_stopped(data):
-    """Handle recording stopped event"""
-    try:
-        meeting_id = data.get('meetingId')
-        recording_id = data.get('recordingId')
-        download_url = data.get('downloadUrl')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            session.recording_url = download_url
-            session.recording_status = 'completed'
-            db.session.commit()
-            print(f"✅ Recording completed for session {session.id}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling recording stopped: {str(e)}")
-
-def handle_recording_failed(data):
-    """Handle recording failed event"""
-    try:
-        meeting_id = data.get('meetingId')
-        recording_id = data.get('recordingId')
-        error_message = data.get('error', 'Unknown error')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            session.recording_status = 'failed'
-            db.session.commit()
-            print(f"❌ Recording failed for session {session.id}: {error_message}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling recording failed: {str(e)}")
-
-def handle_hls_starting(data):
-    """Handle HLS starting event (for recording)"""
-    try:
-        meeting_id = data.get('meetingId')
-        session_id = data.get('sessionId')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            # Recording is starting - keep status as 'starting'
-            if not session.recording_id:
-                session.recording_id = session_id
-            db.session.commit()
-            print(f"🔄 HLS Recording starting for session {session.id}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling HLS starting: {str(e)}")
-
-def handle_hls_started(data):
-    """Handle HLS started event (for recording)"""
-    try:
-        meeting_id = data.get('meetingId')
-        session_id = data.get('sessionId')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            session.recording_id = session_id
-            session.recording_status = 'active'
-            db.session.commit()
-            print(f"✅ HLS Recording started for session {session.id}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling HLS started: {str(e)}")
-
-def handle_hls_stopping(data):
-    """Handle HLS stopping event (for recording)"""
-    try:
-        meeting_id = data.get('meetingId')
-        session_id = data.get('sessionId')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            session.recording_status = 'stopping'
-            db.session.commit()
-            print(f"⏹️ HLS Recording stopping for session {session.id}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling HLS stopping: {str(e)}")
-
-def handle_hls_stopped(data):
-    """Handle HLS stopped event (for recording)"""
-    try:
-        meeting_id = data.get('meetingId')
-        session_id = data.get('sessionId')
-        download_url = data.get('downloadUrl')
-        playback_url = data.get('playbackHlsUrl')
-        downstream_url = data.get('downstreamUrl')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            # Use playback URL if available, otherwise downstream URL, otherwise download URL
-            session.recording_url = playback_url or downstream_url or download_url
-            session.recording_status = 'completed'
-            db.session.commit()
-            print(f"✅ HLS Recording completed for session {session.id}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling HLS stopped: {str(e)}")
-
-def handle_hls_failed(data):
-    """Handle HLS failed event (for recording)"""
-    try:
-        meeting_id = data.get('meetingId')
-        session_id = data.get('sessionId')
-        error_message = data.get('error', 'Unknown error')
-        
-        session = VideoSession.query.filter_by(meeting_id=meeting_id).first()
-        if session:
-            session.recording_status = 'failed'
-            db.session.commit()
-            print(f"❌ HLS Recording failed for session {session.id}: {error_message}")
-        else:
-            print(f"⚠️ Session not found for meeting_id: {meeting_id}")
-            
-    except Exception as e:
-        print(f"❌ Error handling HLS failed: {str(e)}")
+    return jsonify({"status": status}), 200
 
 
 # ===========================================
@@ -1018,7 +980,7 @@ def handle_hls_failed(data):
 @jwt_required()
 @recording_required
 def start_recording(meeting_id):
-    """Start recording for a video session - Premium only"""
+    """Queue a recording start for a video session - Premium only"""
     try:
         user_id = get_jwt_identity()
         
@@ -1035,96 +997,19 @@ def start_recording(meeting_id):
         if session.recording_status in ['active', 'starting']:
             return jsonify({"msg": "Recording already in progress"}), 400
         
-        # Call VideoSDK HLS API to start recording
-        from .services.videosdk_service import VideoSDKService
-        videosdk = VideoSDKService()
-        
-        # Generate token for recording operation
-        token = videosdk.generate_token(permissions=['allow_record'])
-        
-        # Start HLS streaming with recording enabled via VideoSDK API
-        headers = {
-            "Authorization": token,
-            "Content-Type": "application/json"
-        }
-        
-        recording_data = {
-            "roomId": meeting_id,
-            "config": {
-                "layout": {
-                    "type": "GRID",
-                    "priority": "SPEAKER",
-                    "gridSize": 25
-                },
-                "orientation": "landscape",
-                "theme": "DARK",
-                "mode": "video-and-audio",
-                "quality": "high",
-                "recording": {
-                    "enabled": True
-                }
-            },
-            "webhookUrl": f"{os.getenv('BACKEND_URL')}/api/videosdk/webhook"
-        }
-        
-        print(f"🔄 Starting HLS recording for meeting {meeting_id}")
-        print(f"📊 VideoSDK API URL: {videosdk.api_endpoint}/hls/start")
-        print(f"📊 Webhook URL: {recording_data['webhookUrl']}")
-        print(f"📊 Recording data: {recording_data}")
-        
-        try:
-            print("🔄 Making POST request to VideoSDK API...")
-            response = requests.post(
-                f"{videosdk.api_endpoint}/hls/start",
-                headers=headers,
-                json=recording_data,
-                timeout=10  # Reduced timeout to 10 seconds
-            )
-            
-            print(f"📊 VideoSDK Response Status: {response.status_code}")
-            print(f"📊 VideoSDK Response Text: {response.text}")
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                # Update session status and store HLS session ID
-                session.recording_status = 'starting'
-                session.recording_id = response_data.get('sessionId', response_data.get('id'))
-                
-                print(f"🔄 Before DB commit - Session {session.id}: status='{session.recording_status}', recording_id='{session.recording_id}'")
-                
-                db.session.commit()
-                
-                # Verify the update was saved
-                db.session.refresh(session)
-                print(f"✅ After DB commit - Session {session.id}: status='{session.recording_status}', recording_id='{session.recording_id}'")
-                
-                print(f"✅ HLS Recording start initiated for session {session.id}")
-                return jsonify({
-                    "success": True,
-                    "message": "Recording started successfully",
-                    "recording_status": session.recording_status,
-                    "hls_session_id": session.recording_id
-                }), 200
-            else:
-                error_msg = f"VideoSDK API Error: Status {response.status_code}, Response: {response.text}"
-                print(f"❌ {error_msg}")
-                return jsonify({"msg": f"Failed to start recording: {error_msg}"}), 400
-                
-        except requests.exceptions.Timeout:
-            print("⏰ VideoSDK API request timed out")
-            # Still update session status as starting since the webhook might come later
-            session.recording_status = 'starting'
-            db.session.commit()
-            print(f"✅ Recording start initiated (timeout occurred) for session {session.id}")
-            return jsonify({
-                "success": True,
-                "message": "Recording start initiated (processing)",
-                "recording_status": session.recording_status
-            }), 200
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error: {str(e)}")
-            return jsonify({"msg": f"Network error starting recording: {str(e)}"}), 500
+        # A worker calls VideoSDK; webhooks (or polling) confirm the outcome
+        command = enqueue_command(session, user_id, 'start')
+        if command is None:
+            return jsonify({"msg": "Recording already in progress"}), 400
+
+        print(f"🔄 Queued HLS recording start {command.command_id} for session {session.id}")
+        return jsonify({
+            "success": True,
+            "message": "Recording start queued",
+            "command_id": command.command_id,
+            "command_status": command.status,
+            "recording_status": 'starting'
+        }), 202
             
     except Exception as e:
         print(f"❌ Error starting recording: {str(e)}")
@@ -1134,7 +1019,7 @@ def start_recording(meeting_id):
 @jwt_required()
 @recording_required
 def stop_recording(meeting_id):
-    """Stop recording for a video session - Premium only"""
+    """Queue a recording stop for a video session - Premium only"""
     try:
         user_id = get_jwt_identity()
         
@@ -1151,81 +1036,33 @@ def stop_recording(meeting_id):
         if session.recording_status not in ['active', 'starting']:
             return jsonify({"msg": "No active recording to stop"}), 400
         
-        # Call VideoSDK HLS API to stop recording
-        from .services.videosdk_service import VideoSDKService
-        videosdk = VideoSDKService()
-        
-        # Generate token for recording operation
-        token = videosdk.generate_token(permissions=['allow_record'])
-        
-        # Stop HLS streaming/recording via VideoSDK API
-        headers = {
-            "Authorization": token,
-            "Content-Type": "application/json"
-        }
-        
-        # Use session ID to end the session, which should stop HLS recording
-        recording_id = session.recording_id
-        
-        print(f"🔄 Ending VideoSDK session {recording_id} to stop HLS recording for meeting {meeting_id}")
-        print(f"📊 VideoSDK API URL: {videosdk.api_endpoint}/sessions/{recording_id}/end")
-        
-        try:
-            print("🔄 Making POST request to VideoSDK API to end session...")
-            response = requests.post(
-                f"{videosdk.api_endpoint}/sessions/{recording_id}/end",
-                headers=headers,
-                timeout=10  # Add timeout
-            )
-            
-            print(f"📊 VideoSDK Response Status: {response.status_code}")
-            print(f"📊 VideoSDK Response Text: {response.text}")
-            
-            if response.status_code == 200:
-                # Update session status
-                session.recording_status = 'stopping'
-                db.session.commit()
-                
-                print(f"✅ Session {recording_id} ended successfully")
-                return jsonify({
-                    "success": True,
-                    "message": "Recording stopped successfully",
-                    "recording_status": session.recording_status
-                }), 200
-            else:
-                error_msg = f"VideoSDK API Error: Status {response.status_code}, Response: {response.text}"
-                print(f"❌ {error_msg}")
-                
-                # Fallback: Still set to stopping as webhook might handle it
-                session.recording_status = 'stopping'
-                db.session.commit()
-                
-                return jsonify({
-                    "success": True,
-                    "message": "Recording stop initiated (webhook processing)",
-                    "recording_status": session.recording_status
-                }), 200
-                
-        except requests.exceptions.Timeout:
-            print("⏰ VideoSDK API request timed out")
-            # Still update session status as stopping since the webhook might come later
-            session.recording_status = 'stopping'
-            db.session.commit()
-            print(f"✅ Recording stop initiated (timeout occurred) for session {session.id}")
-            return jsonify({
-                "success": True,
-                "message": "Recording stop initiated (processing)",
-                "recording_status": session.recording_status
-            }), 200
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error: {str(e)}")
-            return jsonify({"msg": f"Network error stopping recording: {str(e)}"}), 500
+        command = enqueue_command(session, user_id, 'stop')
+        if command is None:
+            return jsonify({"msg": "No active recording to stop"}), 400
+
+        print(f"🔄 Queued HLS recording stop {command.command_id} for session {session.id}")
+        return jsonify({
+            "success": True,
+            "message": "Recording stop queued",
+            "command_id": command.command_id,
+            "command_status": command.status,
+            "recording_status": 'stopping'
+        }), 202
             
     except Exception as e:
         print(f"❌ Error stopping recording: {str(e)}")
         return jsonify({"msg": "Error stopping recording"}), 500
 
+@api.route('/recording-commands/<command_id>', methods=['GET'])
+@jwt_required()
+def get_recording_command(command_id):
+    """Status of a queued recording start/stop"""
+    command = RecordingCommand.query.filter_by(command_id=command_id).first()
+    if not command or command.user_id != get_jwt_identity():
+        return jsonify({"msg": "Command not found"}), 404
+    session = VideoSession.query.get(command.session_id)
+    return jsonify(dict(command.serialize(), recording_status=session.recording_status)), 200
+
 @api.route('/sessions/<meeting_id>/recordings', methods=['GET'])
 @jwt_required()
 @recording_required
@@ -1252,7 +1089,8 @@ def get_session_recordings(meeting_id):
             "recording_status": session.recording_status,
             "recording_url": session.recording_url,
             "recording_id": session.recording_id,
-            "has_recording": bool(session.recording_url)
+            "has_recording": bool(session.recording_url),
+            "recordings": [recording.serialize() for recording in session_recordings(session.id)]
         }), 200
         
     except Exception as e:
@@ -1263,30 +1101,22 @@ def get_session_recordings(meeting_id):
 @jwt_required()
 @recording_required
 def get_my_recordings():
-    """Get all recordings for the current user - Premium only"""
+    """Get all recordings for the current user, newest first - Premium only"""
     try:
         user_id = get_jwt_identity()
-        
-        # Get all sessions with recordings for this user
-        sessions = VideoSession.query.filter_by(creator_id=user_id).filter(
-            VideoSession.recording_url.isnot(None)
-        ).order_by(VideoSession.created_at.desc()).all()
-        
-        recordings = []
-        for session in sessions:
-            recordings.append({
-                "session_id": session.id,
-                "meeting_id": session.meeting_id,
-                "created_at": session.created_at.isoformat(),
-                "recording_url": session.recording_url,
-                "recording_status": session.recording_status,
-                "max_duration_minutes": session.max_duration_minutes
-            })
-        
+
+        try:
+            recordings, next_cursor = list_recordings(
+                user_id, request.args.get('limit', RECORDINGS_PAGE_SIZE), request.args.get('before')
+            )
+        except ValueError:
+            return jsonify({"msg": "Invalid limit or cursor"}), 400
+
         return jsonify({
             "success": True,
-            "recordings": recordings,
-            "total_count": len(recordings)
+            "recordings": [recording.serialize() for recording in recordings],
+            "total_count": len(recordings),
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
@@ -1345,9 +1175,8 @@ def google_oauth_initiate():
         
         # Create signed state for security
         state_data = {
-        'user_type': user_type,
-            'oauth_type': 'google',
-            'timestamp': datetime.utcnow().isoformat()
+            'user_type': user_type,
+            'oauth_type': 'google'
         }
         state = create_signed_state(state_data)
         
@@ -1423,7 +1252,7 @@ def google_oauth_callback():
             return redirect(f"{os.getenv('FRONTEND_URL')}/?google_auth=error&error=no_email")
         
         # Check if user exists
-        existing_user = User.query.filter_by(email=user_data['email']).first()
+        existing_user = User.find_by_email(user_data['email'])
         
         if existing_user:
             # Login existing user
@@ -1524,8 +1353,7 @@ def github_oauth_initiate():
         # Create signed state for security
         state_data = {
             'user_type': user_type,
-            'oauth_type': 'github',
-            'timestamp': datetime.utcnow().isoformat()
+            'oauth_type': 'github'
         }
         state = create_signed_state(state_data)
         
@@ -1608,7 +1436,7 @@ def github_oauth_callback():
             return redirect(f"{os.getenv('FRONTEND_URL')}/?github_auth=error&error=no_email")
         
         # Check if user exists
-        existing_user = User.query.filter_by(email=user_data['email']).first()
+        existing_user = User.find_by_email(user_data['email'])
         
         if existing_user:
             # Login existing user
@@ -1673,8 +1501,7 @@ def mvp_google_oauth_initiate():
         # Create signed state for security
         state_data = {
             'user_type': 'user',
-            'oauth_type': 'mvp_google',
-            'timestamp': datetime.utcnow().isoformat()
+            'oauth_type': 'mvp_google'
         }
         state = create_mvp_signed_state(state_data)
     
@@ -1745,7 +1572,7 @@ def mvp_google_oauth_callback():
             return redirect(f"{os.getenv('FRONTEND_URL')}/?mvp_google_auth=error&error=no_email")
         
         # Check if user exists
-        existing_user = User.query.filter_by(email=user_data['email']).first()
+        existing_user = User.find_by_email(user_data['email'])
         
         if existing_user:
             # Login existing user
@@ -1795,8 +1622,7 @@ def mvp_github_oauth_initiate():
         # Create signed state for security
         state_data = {
             'user_type': 'user',
-            'oauth_type': 'mvp_github',
-            'timestamp': datetime.utcnow().isoformat()
+            'oauth_type': 'mvp_github'
         }
         state = create_mvp_signed_state(state_data)
     
@@ -1884,7 +1710,7 @@ def mvp_github_oauth_callback():
             return redirect(f"{os.getenv('FRONTEND_URL')}/?mvp_github_auth=error&error=no_email")
         
         # Check if user exists
-        existing_user = User.query.filter_by(email=user_data['email']).first()
+        existing_user = User.find_by_email(user_data['email'])
         
         if existing_user:
             # Login existing user
@@ -1933,51 +1759,19 @@ def mvp_github_oauth_callback():
 
 # Helper functions for state management
 def create_signed_state(state_data):
-    """Create a signed state parameter for OAuth security"""
-    import json
-    import base64
-    import hmac
-    import hashlib
-    
-    state_json = json.dumps(state_data)
-    state_b64 = base64.urlsafe_b64encode(state_json.encode()).decode()
-    
-    secret = os.getenv('JWT_SECRET_KEY', 'fallback_secret')
-    signature = hmac.new(
-        secret.encode(),
-        state_b64.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    
-    return f"{state_b64}.{signature}"
+    """Create a signed, expiring state parameter for OAuth security"""
+    return get_state_codec().encode(
+        oauth_type=state_data.get('oauth_type'),
+        user_type=state_data.get('user_type', 'user')
+    )
 
 
 def verify_signed_state(state_param):
-    """Verify a signed state parameter"""
-    import json
-    import base64
-    import hmac
-    import hashlib
-    
-    try:
-        state_b64, signature = state_param.split('.', 1)
-        
-        secret = os.getenv('JWT_SECRET_KEY', 'fallback_secret')
-        expected_signature = hmac.new(
-            secret.encode(),
-            state_b64.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        if not hmac.compare_digest(signature, expected_signature):
-            return None
-        
-        state_json = base64.urlsafe_b64decode(state_b64.encode()).decode()
-        return json.loads(state_json)
-        
-    except Exception as e:
-        print(f"State verification error: {str(e)}")
-        return None
+    """Verify a signed state parameter, rejecting expired or replayed states"""
+    state_data = get_state_codec().decode(state_param)
+    if state_data is None:
+        print("State verification failed: invalid, expired or replayed state")
+    return state_data
 
 
 def create_mvp_signed_state(state_data):
@@ -1989,4 +1783,4 @@ def create_mvp_signed_state(state_data):
 def verify_mvp_signed_state(state_param):
     """Verify a signed state parameter for MVP OAuth"""
     # Same implementation as regular signed state
-    return verify_signed_state(state_param)
\ No newline at end of file
+    return verify_signed_state(state_param)
@@ -275,6 +275,60 @@ class VideoSDKService:
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
             return False
 
+    # Recording control, used by the recording command worker (api.recording_commands).
+    # These return the raw response and let requests exceptions through, so the
+    # caller can tell a rejected request from one that may need retrying.
+
+    def start_hls(self, meeting_id, webhook_url, timeout):
+        """Start HLS streaming with recording enabled for a room"""
+        token = self.generate_token(permissions=['allow_record'])
+        recording_data = {
+            "roomId": meeting_id,
+            "config": {
+                "layout": {
+                    "type": "GRID",
+                    "priority": "SPEAKER",
+                    "gridSize": 25
+                },
+                "orientation": "landscape",
+                "theme": "DARK",
+                "mode": "video-and-audio",
+                "quality": "high",
+                "recording": {
+                    "enabled": True
+                }
+            },
+            "webhookUrl": webhook_url
+        }
+        logger.info(f"🔄 Making POST request to: {self.api_endpoint}/hls/start")
+        return requests.post(
+            f"{self.api_endpoint}/hls/start",
+            headers={"Authorization": token, "Content-Type": "application/json"},
+            json=recording_data,
+            timeout=timeout
+        )
+
+    def end_session(self, session_id, timeout):
+        """End a VideoSDK session, which stops its HLS recording"""
+        token = self.generate_token(permissions=['allow_record'])
+        logger.info(f"🔄 Making POST request to: {self.api_endpoint}/sessions/{session_id}/end")
+        return requests.post(
+            f"{self.api_endpoint}/sessions/{session_id}/end",
+            headers={"Authorization": token},
+            timeout=timeout
+        )
+
+    def list_hls(self, meeting_id, timeout):
+        """HLS streams of a room, newest first"""
+        token = self.generate_token(permissions=['allow_record'])
+        logger.info(f"🔄 Making GET request to: {self.api_endpoint}/hls/?roomId={meeting_id}")
+        return requests.get(
+            f"{self.api_endpoint}/hls/",
+            headers={"Authorization": token},
+            params={"roomId": meeting_id},
+            timeout=timeout
+        )
+
     def refresh_meeting_token(self, meeting_id, permissions=None):
         """Generate a fresh token for an existing meeting"""
         try:
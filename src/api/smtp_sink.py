@@ -0,0 +1,177 @@
+# src/api/smtp_sink.py
+"""
+Local SMTP stand-in for development and benchmarks.
+
+``SMTPSink`` speaks enough SMTP for ``smtplib`` (EHLO/HELO, AUTH PLAIN, MAIL,
+RCPT, DATA, RSET, NOOP, QUIT) and records what it receives instead of
+relaying it. Faults can be injected to see how the outbox and connection pool
+behave against a slow or flaky server:
+
+- ``latency``: seconds to wait before acknowledging each message
+- ``connect_latency``: seconds to wait before the greeting (TLS + AUTH stand-in)
+- ``disconnect_rate``: chance of dropping the connection at MAIL FROM
+- ``temp_fail_rate`` / ``perm_fail_rate``: chance of a 451 / 550 reply to DATA
+
+Point the app at it with MAIL_SERVER=127.0.0.1 MAIL_PORT=<port> MAIL_USE_SSL=false.
+"""
+
+import random
+import socketserver
+import threading
+import time
+from collections import deque
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    timeout = 60
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        sink._count(connections=1)
+        if sink.connect_latency:
+            time.sleep(sink.connect_latency)
+        self.reply("220 localhost devMentor SMTP sink ready")
+        mail_from, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode('utf-8', 'replace').rstrip("\r\n").partition(' ')
+            command = command.upper()
+
+            if command == 'EHLO':
+                self.wfile.write(b"250-localhost\r\n250-8BITMIME\r\n250-SIZE 35882577\r\n250 AUTH PLAIN\r\n")
+            elif command == 'HELO':
+                self.reply("250 localhost")
+            elif command == 'AUTH':
+                self.reply("235 2.7.0 Authentication successful")
+            elif command == 'MAIL':
+                if sink._roll(sink.disconnect_rate):
+                    sink._count(disconnects=1)
+                    return
+                mail_from, recipients = argument, []
+                self.reply("250 2.1.0 OK")
+            elif command == 'RCPT':
+                recipients.append(argument)
+                self.reply("250 2.1.5 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                if data is None:
+                    return
+                if sink.latency:
+                    time.sleep(sink.latency)
+                if sink._roll(sink.temp_fail_rate):
+                    sink._count(temp_failures=1)
+                    self.reply("451 4.3.0 Temporary failure, try again later")
+                elif sink._roll(sink.perm_fail_rate):
+                    sink._count(perm_failures=1)
+                    self.reply("550 5.1.1 Mailbox unavailable")
+                else:
+                    sink._record(mail_from, recipients, data)
+                    self.reply("250 2.0.0 OK: queued")
+                mail_from, recipients = None, []
+            elif command == 'RSET':
+                mail_from, recipients = None, []
+                self.reply("250 2.0.0 OK")
+            elif command == 'NOOP':
+                self.reply("250 2.0.0 OK")
+            elif command == 'QUIT':
+                self.reply("221 2.0.0 Bye")
+                return
+            else:
+                self.reply("502 5.5.2 Command not recognized")
+
+    def _read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Recording SMTP server running on a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, connect_latency=0.0, disconnect_rate=0.0,
+                 temp_fail_rate=0.0, perm_fail_rate=0.0, keep_messages=1000, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.disconnect_rate = disconnect_rate
+        self.temp_fail_rate = temp_fail_rate
+        self.perm_fail_rate = perm_fail_rate
+        self.messages = deque(maxlen=keep_messages)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.metrics = {
+            "connections": 0,
+            "messages": 0,
+            "bytes": 0,
+            "disconnects": 0,
+            "temp_failures": 0,
+            "perm_failures": 0
+        }
+
+    def _roll(self, rate):
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.metrics[key] += value
+
+    def _record(self, mail_from, recipients, data):
+        with self._lock:
+            self.metrics["messages"] += 1
+            self.metrics["bytes"] += len(data)
+            self.messages.append({
+                "received_at": time.time(),
+                "mail_from": mail_from,
+                "recipients": recipients,
+                "data": data
+            })
+
+    def start(self):
+        if self._server is None:
+            self._server = _ThreadingServer((self.host, self.port), _SinkHandler)
+            self._server.sink = self
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.metrics)
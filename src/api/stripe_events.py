@@ -0,0 +1,422 @@
+# src/api/stripe_events.py
+"""
+Asynchronous, idempotent processing of Stripe webhook events.
+
+The webhook route only verifies the signature and records the event;
+``stripe_event.event_id`` is unique, so Stripe's retries and replayed
+deliveries are dropped by a single ``INSERT ... ON CONFLICT DO NOTHING``.
+Background workers then apply events oldest first. A worker skips customers
+whose events another worker is already handling, so each customer's events
+run in order. Subscription-state events older than one already applied for
+the same customer are marked ``superseded`` instead of rolling state back.
+
+Handlers resolve the customer's user through ``customer_cache`` (customer ID
+-> user ID) and change it with a single UPDATE by primary key, so a burst of
+events for known customers never has to search ``user`` for the customer.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, User, StripeEvent
+from api.notification_digest import notify_subscription
+from api.price_catalog import CATALOG_EVENTS, handle_catalog_event
+from api.entitlements import invalidate as invalidate_entitlement
+from api.workers import BackgroundWorkerPool
+
+
+STRIPE_EVENT_WORKERS = int(os.getenv('STRIPE_EVENT_WORKERS', 1))
+STRIPE_EVENT_BATCH_SIZE = 100
+STRIPE_EVENT_MAX_ATTEMPTS = 5
+STRIPE_EVENT_BASE_BACKOFF_SECONDS = 15
+# A row stuck in 'processing' this long belongs to a worker that died
+STRIPE_EVENT_STALE_LOCK_SECONDS = 300
+STRIPE_EVENT_RETENTION_DAYS = 30
+STRIPE_EVENT_PURGE_INTERVAL_SECONDS = 3600
+STRIPE_CUSTOMER_CACHE_SIZE = int(os.getenv('STRIPE_CUSTOMER_CACHE_SIZE', 100000))
+
+# Each of these carries the full subscription state, so only the newest per customer matters
+SUBSCRIPTION_STATE_EVENTS = (
+    'customer.subscription.created',
+    'customer.subscription.updated',
+    'customer.subscription.deleted'
+)
+
+stripe_event_pool = None
+_last_purge = 0.0
+
+_metrics_lock = threading.Lock()
+metrics = {
+    "received": 0,
+    "duplicates": 0,
+    "applied": 0,
+    "superseded": 0,
+    "retried": 0,
+    "failed": 0
+}
+
+
+def _count(**increments):
+    with _metrics_lock:
+        for key, value in increments.items():
+            metrics[key] += value
+
+
+def _event_customer(payload):
+    obj = json.loads(payload)['data']['object']
+    if obj.get('object') == 'customer':
+        return obj.get('id')
+    customer = obj.get('customer')
+    return customer if isinstance(customer, str) else None
+
+
+def _insert_statement(row):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(StripeEvent.__table__).values(row)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(StripeEvent.__table__).values(row)
+    else:
+        raise NotImplementedError(f"Stripe event ingestion is not supported on {dialect}")
+    return stmt.on_conflict_do_nothing(index_elements=['event_id'])
+
+
+def record_event(event, payload):
+    """
+    Persist a verified Stripe event for background processing
+
+    Args:
+        event: The event returned by ``stripe.Webhook.construct_event``
+        payload (str): The verified request body
+
+    Returns:
+        bool: False when the event had already been received
+    """
+    now = datetime.utcnow()
+    result = db.session.execute(_insert_statement({
+        "event_id": event['id'],
+        "type": event['type'],
+        "customer_id": _event_customer(payload),
+        "created": int(event['created'] or 0),
+        "payload": payload,
+        "status": 'pending',
+        "attempts": 0,
+        "next_attempt_at": now,
+        "received_at": now
+    }))
+    db.session.commit()
+    inserted = result.rowcount > 0
+    _count(received=1, duplicates=0 if inserted else 1)
+    if inserted and stripe_event_pool is not None:
+        stripe_event_pool.wake()
+    return inserted
+
+
+# ===========================================
+# EVENT HANDLERS
+# ===========================================
+
+class CustomerCache:
+    """Bounded LRU of Stripe customer ID -> user ID"""
+
+    def __init__(self, max_entries=STRIPE_CUSTOMER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, customer_id):
+        with self._lock:
+            user_id = self._entries.get(customer_id)
+            if user_id is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(customer_id)
+                self.hits += 1
+            return user_id
+
+    def set(self, customer_id, user_id):
+        with self._lock:
+            self._entries[customer_id] = user_id
+            self._entries.move_to_end(customer_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, customer_id):
+        with self._lock:
+            if self._entries.pop(customer_id, None) is not None:
+                self.stale += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+customer_cache = CustomerCache()
+
+
+# Session info key for the users whose subscription state is waiting to be committed
+CHANGED_USERS_KEY = 'stripe_events_changed_users'
+
+
+def find_customer_user_id(customer_id):
+    """ID of the user owning a Stripe customer, from the cache when possible"""
+    if not customer_id:
+        return None
+    user_id = customer_cache.get(customer_id)
+    if user_id is None:
+        user_id = db.session.query(User.id).filter_by(stripe_customer_id=customer_id).limit(1).scalar()
+        if user_id is not None:
+            customer_cache.set(customer_id, user_id)
+    return user_id
+
+
+def update_customer_user(customer_id, **values):
+    """
+    Apply ``values`` to the user owning ``customer_id`` with one UPDATE by primary key
+
+    The UPDATE also matches on ``stripe_customer_id``, so a cached mapping that
+    went stale (the customer was re-created for someone else) updates nothing;
+    it is then dropped and the user looked up again. The user's cached
+    entitlement is dropped by ``apply_event`` once the change is committed.
+
+    Returns:
+        int: The user's ID, or None when no user has this customer
+    """
+    for _ in range(2):
+        user_id = find_customer_user_id(customer_id)
+        if user_id is None:
+            return None
+        updated = User.query.filter_by(id=user_id, stripe_customer_id=customer_id).update(
+            values, synchronize_session=False
+        )
+        if updated:
+            db.session.info.setdefault(CHANGED_USERS_KEY, set()).add(user_id)
+            return user_id
+        customer_cache.discard(customer_id)
+    return None
+
+
+# Handlers don't commit: apply_event commits their changes together with the event's status
+
+def handle_subscription_created(subscription, event_id):
+    # Update user to premium
+    user_id = update_customer_user(
+        subscription['customer'],
+        subscription_status='premium',
+        subscription_id=subscription['id'],
+        current_period_end=datetime.fromtimestamp(subscription['current_period_end'])
+    )
+    if user_id:
+        notify_subscription(user_id, event_id, subscription_status='premium')
+
+
+def handle_subscription_updated(subscription, event_id):
+    status = 'premium' if subscription['status'] == 'active' else 'free'
+    user_id = update_customer_user(
+        subscription['customer'],
+        subscription_status=status,
+        current_period_end=datetime.fromtimestamp(subscription['current_period_end'])
+    )
+    if user_id:
+        notify_subscription(user_id, event_id, subscription_status=status)
+
+
+def handle_subscription_deleted(subscription, event_id):
+    user_id = update_customer_user(
+        subscription['customer'],
+        subscription_status='free',
+        subscription_id=None,
+        current_period_end=None
+    )
+    if user_id:
+        notify_subscription(user_id, event_id, subscription_status='free')
+
+
+def handle_invoice_payment_succeeded(invoice, event_id):
+    # Subscription payment succeeded - keep user as premium
+    if invoice.get('subscription'):
+        update_customer_user(invoice['customer'], subscription_status='premium')
+
+
+def handle_invoice_payment_failed(invoice, event_id):
+    if invoice.get('subscription'):
+        user_id = find_customer_user_id(invoice['customer'])
+        if user_id:
+            # Note: Stripe will retry payment automatically
+            notify_subscription(user_id, event_id, kind='payment_failed')
+
+
+EVENT_HANDLERS = {
+    'customer.subscription.created': handle_subscription_created,
+    'customer.subscription.updated': handle_subscription_updated,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'invoice.payment_succeeded': handle_invoice_payment_succeeded,
+    'invoice.payment_failed': handle_invoice_payment_failed,
+    **{event_type: handle_catalog_event for event_type in CATALOG_EVENTS}
+}
+
+
+# ===========================================
+# WORKER
+# ===========================================
+
+def _due(now):
+    stale_before = now - timedelta(seconds=STRIPE_EVENT_STALE_LOCK_SECONDS)
+    return db.or_(
+        db.and_(StripeEvent.status == 'pending', StripeEvent.next_attempt_at <= now),
+        db.and_(StripeEvent.status == 'processing', StripeEvent.locked_at < stale_before)
+    )
+
+
+def claim_events(worker_id, batch_size=STRIPE_EVENT_BATCH_SIZE, now=None):
+    """
+    Mark up to ``batch_size`` due events as processing for ``worker_id``
+
+    Customers with an event currently held by another worker are skipped, so
+    one customer's events are never applied by two workers at once.
+    """
+    now = now or datetime.utcnow()
+    stale_before = now - timedelta(seconds=STRIPE_EVENT_STALE_LOCK_SECONDS)
+    busy_customers = db.session.query(StripeEvent.customer_id).filter(
+        StripeEvent.status == 'processing',
+        StripeEvent.locked_at >= stale_before,
+        StripeEvent.locked_by != worker_id,
+        StripeEvent.customer_id.isnot(None)
+    )
+    candidate_ids = [
+        row_id for (row_id,) in db.session.query(StripeEvent.id)
+        .filter(_due(now), db.or_(StripeEvent.customer_id.is_(None), ~StripeEvent.customer_id.in_(busy_customers)))
+        .order_by(StripeEvent.created, StripeEvent.id)
+        .limit(batch_size)
+    ]
+    if not candidate_ids:
+        return []
+
+    StripeEvent.query.filter(StripeEvent.id.in_(candidate_ids), _due(now)).update(
+        {"status": 'processing', "locked_by": worker_id, "locked_at": now},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return StripeEvent.query.filter(
+        StripeEvent.id.in_(candidate_ids),
+        StripeEvent.status == 'processing',
+        StripeEvent.locked_by == worker_id
+    ).order_by(StripeEvent.created, StripeEvent.id).all()
+
+
+def _is_superseded(event):
+    if event.type not in SUBSCRIPTION_STATE_EVENTS or not event.customer_id:
+        return False
+    newest_applied = db.session.query(db.func.max(StripeEvent.created)).filter(
+        StripeEvent.customer_id == event.customer_id,
+        StripeEvent.status == 'applied',
+        StripeEvent.type.in_(SUBSCRIPTION_STATE_EVENTS)
+    ).scalar()
+    return newest_applied is not None and event.created < newest_applied
+
+
+def apply_event(event):
+    """Run the handler for one claimed event and record the outcome"""
+    if _is_superseded(event):
+        event.status = 'superseded'
+        _count(superseded=1)
+    else:
+        handler = EVENT_HANDLERS.get(event.type)
+        if handler:
+            handler(json.loads(event.payload)['data']['object'], event.event_id)
+        event.status = 'applied'
+        _count(applied=1)
+    event.attempts += 1
+    event.processed_at = datetime.utcnow()
+    event.locked_by = None
+    event.locked_at = None
+    event.last_error = None
+    db.session.commit()
+    # Only after the commit, so a read in between can't cache the old state again
+    invalidate_entitlement(*db.session.info.pop(CHANGED_USERS_KEY, ()))
+
+
+def process_stripe_events(worker_id, batch_size=STRIPE_EVENT_BATCH_SIZE):
+    """Claim and apply one batch of events. Returns the number handled."""
+    events = claim_events(worker_id, batch_size)
+    if not events:
+        _purge_processed()
+        return 0
+
+    for event_row_id in [event.id for event in events]:
+        event = StripeEvent.query.get(event_row_id)
+        try:
+            apply_event(event)
+        except Exception as e:
+            db.session.rollback()
+            db.session.info.pop(CHANGED_USERS_KEY, None)
+            event = StripeEvent.query.get(event_row_id)
+            event.attempts += 1
+            event.locked_by = None
+            event.locked_at = None
+            event.last_error = f"{type(e).__name__}: {e}"
+            if event.attempts >= STRIPE_EVENT_MAX_ATTEMPTS:
+                event.status = 'failed'
+                _count(failed=1)
+                print(f"❌ Giving up on Stripe event {event.event_id} ({event.type}): {str(e)}")
+            else:
+                event.status = 'pending'
+                event.next_attempt_at = datetime.utcnow() + timedelta(
+                    seconds=STRIPE_EVENT_BASE_BACKOFF_SECONDS * 2 ** (event.attempts - 1)
+                )
+                _count(retried=1)
+            db.session.commit()
+    return len(events)
+
+
+def _purge_processed(now=None):
+    # Rows are kept long enough to recognise Stripe's retries (up to 3 days)
+    global _last_purge
+    if time.monotonic() - _last_purge < STRIPE_EVENT_PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = time.monotonic()
+    now = now or datetime.utcnow()
+    StripeEvent.query.filter(
+        StripeEvent.status.in_(('applied', 'superseded')),
+        StripeEvent.received_at < now - timedelta(days=STRIPE_EVENT_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def stripe_event_stats():
+    counts = dict(
+        db.session.query(StripeEvent.status, db.func.count(StripeEvent.id)).group_by(StripeEvent.status).all()
+    )
+    with _metrics_lock:
+        stats = dict(metrics)
+    stats["queue"] = counts
+    stats["customer_cache"] = customer_cache.stats()
+    if stripe_event_pool is not None:
+        stats["workers"] = stripe_event_pool.stats()
+    return stats
+
+
+def create_stripe_event_pool(app, num_workers=STRIPE_EVENT_WORKERS):
+    global stripe_event_pool
+    stripe_event_pool = BackgroundWorkerPool(app, 'stripe-events', process_stripe_events,
+                                             num_workers=num_workers, poll_interval=5.0)
+    return stripe_event_pool
@@ -0,0 +1,239 @@
+# src/api/stripe_gateway.py
+"""
+Stripe calls made while serving billing requests.
+
+Every Stripe request in the process goes through one shared
+``stripe.RequestsClient`` whose ``requests.Session`` keeps a bounded pool of
+keep-alive connections to the API, with explicit connect and read timeouts
+instead of the SDK's 80 second default.
+
+``call`` retries connection errors, rate limits and 5xx replies a bounded
+number of times with full-jitter backoff. Writes carry an idempotency key
+derived from the user and the intent of the call (``idempotency_key``), so a
+retry -- ours, or the browser submitting twice -- gets Stripe's original
+response back instead of creating a second customer or subscription.
+Per-operation latency, retries and errors are exported by ``gateway_stats``.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+import stripe
+
+
+STRIPE_CONNECT_TIMEOUT_SECONDS = float(os.getenv('STRIPE_CONNECT_TIMEOUT_SECONDS', 5))
+STRIPE_READ_TIMEOUT_SECONDS = float(os.getenv('STRIPE_READ_TIMEOUT_SECONDS', 20))
+STRIPE_POOL_SIZE = int(os.getenv('STRIPE_POOL_SIZE', 10))
+STRIPE_MAX_RETRIES = int(os.getenv('STRIPE_MAX_RETRIES', 3))
+STRIPE_RETRY_BASE_DELAY_SECONDS = 0.25
+STRIPE_RETRY_MAX_DELAY_SECONDS = 4.0
+LATENCY_SAMPLES = 1000
+
+_metrics_lock = threading.Lock()
+metrics = {}
+
+
+def create_http_client(pool_size=STRIPE_POOL_SIZE, connect_timeout=STRIPE_CONNECT_TIMEOUT_SECONDS,
+                       read_timeout=STRIPE_READ_TIMEOUT_SECONDS):
+    """RequestsClient over one session shared by all threads"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return stripe.RequestsClient(timeout=(connect_timeout, read_timeout), session=session)
+
+
+def configure():
+    stripe.default_http_client = create_http_client()
+    # Calls made outside call() (pagination, ad hoc retrieves) use the SDK's own retries
+    stripe.max_network_retries = STRIPE_MAX_RETRIES
+    # Local stand-in (flask stripe-stub) instead of api.stripe.com
+    if os.getenv("STRIPE_API_BASE"):
+        stripe.api_base = os.getenv("STRIPE_API_BASE")
+
+
+def idempotency_key(intent, user_id, *parts):
+    """``devmentor:<intent>:<user_id>[:<part>...]``, the same for every retry of one action"""
+    return ":".join(["devmentor", intent, str(user_id)] + [str(part) for part in parts])
+
+
+def _record(operation, seconds, retries, error=False):
+    with _metrics_lock:
+        stats = metrics.get(operation)
+        if stats is None:
+            stats = metrics[operation] = {"calls": 0, "errors": 0, "retries": 0,
+                                          "samples": deque(maxlen=LATENCY_SAMPLES)}
+        stats["calls"] += 1
+        stats["errors"] += 1 if error else 0
+        stats["retries"] += retries
+        stats["samples"].append(seconds)
+
+
+def _retryable(error):
+    headers = error.headers or {}
+    if headers.get('stripe-should-retry') == 'false' or isinstance(error, stripe.error.IdempotencyError):
+        return False
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    # 409: a concurrent request with the same idempotency key is still in flight
+    return error.http_status is not None and (error.http_status >= 500 or error.http_status == 409)
+
+
+def call(operation, fn, *args, idempotency_key=None, max_retries=STRIPE_MAX_RETRIES, **kwargs):
+    """
+    Call a Stripe SDK method with bounded, jittered retries
+
+    Args:
+        operation (str): Name the call is reported under in ``gateway_stats``
+        fn: SDK method, e.g. ``stripe.Customer.create``
+        idempotency_key (str, optional): Sent with every attempt (POST requests only)
+        max_retries (int): Retries after the first attempt
+
+    Returns:
+        The SDK's result
+    """
+    if idempotency_key:
+        kwargs['idempotency_key'] = idempotency_key
+    # Retries happen here, so they are counted and reuse our idempotency key
+    kwargs['max_network_retries'] = 0
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            result = fn(*args, **kwargs)
+        except stripe.error.StripeError as e:
+            if attempt >= max_retries or not _retryable(e):
+                _record(operation, time.perf_counter() - started, attempt, error=True)
+                raise
+            backoff = min(STRIPE_RETRY_MAX_DELAY_SECONDS, STRIPE_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+            delay = random.uniform(0, backoff)
+            attempt += 1
+            print(f"⚠️ Stripe {operation} failed ({type(e).__name__}), retry {attempt}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+        else:
+            _record(operation, time.perf_counter() - started, attempt)
+            return result
+
+
+# ===========================================
+# BILLING OPERATIONS
+# ===========================================
+
+def create_customer(user, replacing=None):
+    """New Stripe customer for ``user`` (``replacing`` a customer Stripe no longer knows)"""
+    return call(
+        'customer.create', stripe.Customer.create,
+        email=user.email,
+        name=f"{user.first_name} {user.last_name}",
+        idempotency_key=idempotency_key('customer-create', user.id, replacing or 'first')
+    )
+
+
+def retrieve_customer(customer_id):
+    return call('customer.retrieve', stripe.Customer.retrieve, customer_id)
+
+
+def create_payment_intent(user_id, customer_id, attempt_id, amount, currency, **params):
+    """
+    PaymentIntent for one checkout attempt
+
+    ``attempt_id`` comes from the client and stays the same for every submit
+    of one checkout form, so a double submit reuses the PaymentIntent while a
+    new checkout (or a changed price) gets a fresh one.
+    """
+    return call(
+        'payment_intent.create', stripe.PaymentIntent.create,
+        customer=customer_id,
+        amount=amount,
+        currency=currency,
+        idempotency_key=idempotency_key('payment-intent', user_id, customer_id, attempt_id, amount, currency),
+        **params
+    )
+
+
+def retrieve_payment_intent(payment_intent_id):
+    return call('payment_intent.retrieve', stripe.PaymentIntent.retrieve, payment_intent_id)
+
+
+def set_default_payment_method(user_id, customer_id, payment_method):
+    return call(
+        'customer.modify', stripe.Customer.modify, customer_id,
+        invoice_settings={'default_payment_method': payment_method},
+        idempotency_key=idempotency_key('default-payment-method', user_id, customer_id, payment_method)
+    )
+
+
+def mark_payment_intent_used(user_id, payment_intent_id, subscription_id):
+    """Record on the PaymentIntent which subscription it paid for, so it can't pay for another"""
+    return call(
+        'payment_intent.modify', stripe.PaymentIntent.modify, payment_intent_id,
+        metadata={'subscription_id': subscription_id},
+        idempotency_key=idempotency_key('payment-intent-used', user_id, payment_intent_id, subscription_id)
+    )
+
+
+def create_subscription(user_id, payment_intent_id, **params):
+    """
+    One subscription per successful payment, however often it is confirmed
+
+    Within Stripe's 24h idempotency window a repeated confirm gets the
+    original subscription back, whatever its status now; callers check it.
+    """
+    return call(
+        'subscription.create', stripe.Subscription.create,
+        idempotency_key=idempotency_key('subscription-create', user_id, payment_intent_id),
+        **params
+    )
+
+
+def retrieve_subscription(subscription_id):
+    return call('subscription.retrieve', stripe.Subscription.retrieve, subscription_id)
+
+
+def cancel_subscription(subscription_id):
+    """
+    Cancel a subscription
+
+    DELETE takes no idempotency key, so when a retried cancel finds the
+    subscription gone, the subscription is checked and returned if it is
+    already canceled.
+    """
+    try:
+        return call('subscription.cancel', stripe.Subscription.delete, subscription_id)
+    except stripe.error.InvalidRequestError:
+        subscription = call('subscription.retrieve', stripe.Subscription.retrieve, subscription_id)
+        if subscription.status != 'canceled':
+            raise
+        return subscription
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def gateway_stats():
+    with _metrics_lock:
+        snapshot = {operation: dict(stats, samples=sorted(stats["samples"])) for operation, stats in metrics.items()}
+    operations = {}
+    for operation, stats in sorted(snapshot.items()):
+        samples = [seconds * 1000 for seconds in stats.pop("samples")]
+        stats["latency_ms"] = {
+            "p50": round(_percentile(samples, 50), 1),
+            "p95": round(_percentile(samples, 95), 1),
+            "p99": round(_percentile(samples, 99), 1),
+            "max": round(samples[-1], 1)
+        } if samples else {}
+        operations[operation] = stats
+    return {
+        "pool_size": STRIPE_POOL_SIZE,
+        "timeouts": {"connect": STRIPE_CONNECT_TIMEOUT_SECONDS, "read": STRIPE_READ_TIMEOUT_SECONDS},
+        "max_retries": STRIPE_MAX_RETRIES,
+        "operations": operations
+    }
+
+
+configure()
@@ -0,0 +1,226 @@
+# src/api/stripe_reconcile.py
+"""
+Bulk reconciliation of users' subscription state against Stripe.
+
+Webhooks are the only thing that moves ``User.subscription_status``,
+``subscription_id`` and ``current_period_end``, so a missed or failed event
+leaves a user wrong until someone notices. ``reconcile_subscriptions`` pages
+through every Stripe subscription with ``auto_paging_iter`` (newest first),
+looks the page's customers up in one indexed query, diffs them and writes the
+corrections with one batched UPDATE per page. The page's last subscription ID
+and the state chosen so far for each customer are committed with the
+corrections, so an interrupted run resumes where it stopped instead of
+starting over, and still knows which newer subscription each customer has.
+
+For a customer with several subscriptions, the newest active one wins, then
+the newest live one; a canceled subscription only downgrades a user still
+pointing at it.
+
+Run with ``flask stripe reconcile`` (against a ``flask stripe-stub`` locally).
+"""
+
+import json
+import os
+from collections import Counter
+from datetime import datetime
+
+import stripe
+
+from api.models import db, User, StripeReconcileRun
+from api.entitlements import invalidate as invalidate_entitlement
+
+
+RECONCILE_BATCH_SIZE = int(os.getenv('STRIPE_RECONCILE_BATCH_SIZE', 500))
+# Stripe's maximum page size
+STRIPE_PAGE_SIZE = 100
+
+ENDED_STATUSES = ('canceled', 'incomplete_expired')
+FREE_STATE = {"subscription_status": 'free', "subscription_id": None, "current_period_end": None}
+FIELDS = tuple(FREE_STATE)
+
+
+def _period_end(subscription):
+    # Newer API versions only report the period on the subscription items
+    if 'current_period_end' in subscription and subscription['current_period_end']:
+        timestamp = subscription['current_period_end']
+    else:
+        items = subscription['items']['data'] if 'items' in subscription else []
+        timestamp = items[0]['current_period_end'] if items else None
+    return datetime.fromtimestamp(timestamp) if timestamp else None
+
+
+def _epoch(value):
+    # Naive datetimes are local time, as written by datetime.fromtimestamp in the handlers
+    return int(value.timestamp()) if value else None
+
+
+def expected_state(subscription):
+    """The user fields a subscription implies (same rules as the webhook handlers)"""
+    if subscription['status'] in ENDED_STATUSES:
+        return dict(FREE_STATE)
+    return {
+        "subscription_status": 'premium' if subscription['status'] == 'active' else 'free',
+        "subscription_id": subscription['id'],
+        "current_period_end": _period_end(subscription)
+    }
+
+
+def _resolve(subscription, state, live):
+    """
+    New state for one user of the subscription's customer, or None to leave it
+
+    ``live`` maps customer -> the state chosen from a newer subscription in
+    this run, so an older one never overrides it.
+    """
+    customer = subscription['customer']
+    if subscription['status'] in ENDED_STATUSES:
+        if state['subscription_id'] != subscription['id']:
+            return None
+        return live.get(customer, FREE_STATE)
+    chosen = live.get(customer)
+    if chosen is not None and chosen['subscription_id'] != subscription['id'] and (
+            chosen['subscription_status'] == 'premium' or subscription['status'] != 'active'):
+        return None
+    live[customer] = expected_state(subscription)
+    return live[customer]
+
+
+def _reconcile_batch(subscriptions, live, drift, dry_run):
+    """Correct the users of one page of subscriptions; returns the IDs of those that drifted"""
+    customers = {subscription['customer'] for subscription in subscriptions if subscription['customer']}
+    rows = db.session.query(
+        User.id, User.stripe_customer_id, User.subscription_status, User.subscription_id, User.current_period_end
+    ).filter(User.stripe_customer_id.in_(customers)).all() if customers else []
+
+    states = {}
+    for row in rows:
+        states.setdefault(row.stripe_customer_id, []).append(
+            {"id": row.id, **{field: getattr(row, field) for field in FIELDS}}
+        )
+    originals = {state["id"]: dict(state) for user_states in states.values() for state in user_states}
+    drift["unknown_customers"] += len(customers - set(states))
+
+    for subscription in subscriptions:
+        for state in states.get(subscription['customer'], ()):
+            resolved = _resolve(subscription, state, live)
+            if resolved is not None:
+                state.update(resolved)
+
+    updates = []
+    for user_states in states.values():
+        for state in user_states:
+            original = originals[state["id"]]
+            changes = {}
+            for field in FIELDS:
+                before, after = original[field], state[field]
+                if field == 'current_period_end':
+                    differs = _epoch(before) != _epoch(after)
+                else:
+                    differs = before != after
+                if differs:
+                    changes[field] = after
+                    drift[field] += 1
+            if changes:
+                updates.append({"id": state["id"], **changes})
+
+    if updates and not dry_run:
+        db.session.bulk_update_mappings(User, updates)
+    return [update["id"] for update in updates]
+
+
+def _dump_live(live):
+    return json.dumps({
+        customer: dict(state, current_period_end=_epoch(state['current_period_end']))
+        for customer, state in live.items()
+    })
+
+
+def _load_live(text):
+    return {
+        customer: dict(state, current_period_end=datetime.fromtimestamp(state['current_period_end'])
+                       if state['current_period_end'] else None)
+        for customer, state in json.loads(text or '{}').items()
+    }
+
+
+def _latest_unfinished_run():
+    return StripeReconcileRun.query.filter(
+        StripeReconcileRun.status.in_(('running', 'failed'))
+    ).order_by(StripeReconcileRun.id.desc()).first()
+
+
+def reconcile_subscriptions(batch_size=RECONCILE_BATCH_SIZE, resume=True, dry_run=False):
+    """
+    Bring every Stripe customer's user in line with their Stripe subscriptions
+
+    Args:
+        batch_size (int): Subscriptions diffed and corrected per transaction
+        resume (bool): Continue the last unfinished run from its cursor
+        dry_run (bool): Count drift without changing users or recording progress
+
+    Returns:
+        dict: Run ID, status, subscriptions scanned, users corrected and drift per field
+    """
+    run = _latest_unfinished_run() if resume and not dry_run else None
+    resumed = run is not None
+    if run is None:
+        run = StripeReconcileRun(status='running', scanned=0, corrected=0, drift=json.dumps({}))
+        if not dry_run:
+            db.session.add(run)
+            db.session.commit()
+    run.status = 'running'
+
+    drift = Counter({field: 0 for field in FIELDS + ('unknown_customers',)})
+    drift.update(json.loads(run.drift or '{}'))
+    # Newer subscriptions chosen before an interruption still win over older ones
+    live = _load_live(run.live)
+    params = {"status": 'all', "limit": STRIPE_PAGE_SIZE}
+    if run.cursor:
+        params["starting_after"] = run.cursor
+
+    def flush(batch):
+        corrected = _reconcile_batch(batch, live, drift, dry_run)
+        run.cursor = batch[-1]['id']
+        run.scanned += len(batch)
+        run.corrected += len(corrected)
+        run.drift = json.dumps(dict(drift))
+        run.live = _dump_live(live)
+        run.updated_at = datetime.utcnow()
+        if not dry_run:
+            # Corrections and the cursor land together, so a resume never skips or repeats a page
+            db.session.commit()
+            invalidate_entitlement(*corrected)
+
+    error = None
+    try:
+        batch = []
+        for subscription in stripe.Subscription.list(**params).auto_paging_iter():
+            batch.append(subscription)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        run.status = 'completed'
+        run.finished_at = datetime.utcnow()
+        run.last_error = None
+    except Exception as e:
+        db.session.rollback()
+        error = f"{type(e).__name__}: {e}"
+        print(f"❌ Subscription reconciliation stopped after {run.scanned} subscriptions: {error}")
+        run.status = 'failed'
+        run.last_error = error
+    if not dry_run:
+        db.session.commit()
+
+    return {
+        "run_id": run.id,
+        "status": run.status,
+        "resumed": resumed,
+        "dry_run": dry_run,
+        "scanned": run.scanned,
+        "corrected": run.corrected,
+        "drift": json.loads(run.drift or '{}'),
+        "cursor": run.cursor,
+        "error": error
+    }
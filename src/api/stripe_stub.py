@@ -0,0 +1,240 @@
+# src/api/stripe_stub.py
+"""
+Local Stripe API stand-in for development, benchmarks and reconciliation runs.
+
+``StripeStub`` serves the subset of the REST API the backend reads in bulk
+(``GET /v1/subscriptions`` with ``limit``/``starting_after``/``customer``/
+``status`` pagination, ``GET /v1/subscriptions/<id>``, and ``GET /v1/prices``
+with ``expand[]=data.product``) from in-memory lists, newest first like
+Stripe. Faults can be injected to exercise retries and resumable jobs:
+
+- ``latency``: seconds to wait before answering each request
+- ``error_rate``: chance of a 500 ``api_error`` reply
+- ``fail_after``: answer every request after this many with a 500 (a "crash")
+
+Point the ``stripe`` library at it with STRIPE_API_BASE=http://127.0.0.1:<port>.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+# Subscriptions in these states no longer show up in a list without ?status=
+ENDED_STATUSES = ('canceled', 'incomplete_expired')
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Request-Id', f"req_stub_{id(self)}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def error(self, status, error_type, message):
+        self.reply(status, {"error": {"type": error_type, "message": message}})
+
+    def do_GET(self):
+        stub = self.server.stub
+        fault = stub._fault()
+        if fault:
+            return self.error(500, 'api_error', fault)
+
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip('/').split('/')
+        if parts == ['v1', 'prices']:
+            try:
+                return self.reply(200, stub.list_prices(**query))
+            except LookupError as e:
+                return self.error(400, 'invalid_request_error', str(e))
+        if parts[:2] != ['v1', 'subscriptions'] or len(parts) > 3:
+            return self.error(404, 'invalid_request_error', f"Unrecognized request URL (GET: {url.path})")
+        if len(parts) == 3:
+            subscription = stub.get_subscription(parts[2])
+            if subscription is None:
+                return self.error(404, 'invalid_request_error', f"No such subscription: '{parts[2]}'")
+            return self.reply(200, subscription)
+        try:
+            return self.reply(200, stub.list_subscriptions(**query))
+        except LookupError as e:
+            return self.error(400, 'invalid_request_error', str(e))
+
+
+class StripeStub:
+    """In-memory Stripe subscriptions and prices API served on a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, fail_after=None, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_after = fail_after
+        self._random = random.Random(seed)
+        self._subscriptions = []  # newest first
+        self._by_id = {}
+        self._prices = []  # newest first
+        self._products = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.metrics = {
+            "requests": 0,
+            "errors": 0
+        }
+
+    @property
+    def api_base(self):
+        return f"http://{self.host}:{self.port}"
+
+    def add_subscription(self, customer, status='active', current_period_end=None, subscription_id=None,
+                         created=None):
+        """Add a subscription (as the newest) and return it"""
+        with self._lock:
+            created = created or int(time.time())
+            subscription_id = subscription_id or f"sub_stub_{len(self._by_id) + 1:08d}"
+            period_end = current_period_end or created + 30 * 24 * 3600
+            subscription = {
+                "id": subscription_id,
+                "object": 'subscription',
+                "customer": customer,
+                "status": status,
+                "created": created,
+                "current_period_end": period_end,
+                "items": {
+                    "object": 'list',
+                    "data": [{"object": 'subscription_item', "current_period_end": period_end}]
+                }
+            }
+            self._subscriptions.insert(0, subscription)
+            self._by_id[subscription_id] = subscription
+            return subscription
+
+    def update_subscription(self, subscription_id, **fields):
+        with self._lock:
+            subscription = self._by_id[subscription_id]
+            subscription.update(fields)
+            if 'current_period_end' in fields:
+                subscription["items"]["data"][0]["current_period_end"] = fields['current_period_end']
+            return subscription
+
+    def add_price(self, unit_amount=300, currency='usd', interval='month', product_name="devMentor Premium",
+                  active=True, product_active=True, price_id=None):
+        """Add a price (and its product) and return the price"""
+        with self._lock:
+            product_id = f"prod_stub_{len(self._products) + 1:08d}"
+            self._products[product_id] = {
+                "id": product_id,
+                "object": 'product',
+                "name": product_name,
+                "active": product_active
+            }
+            price = {
+                "id": price_id or f"price_stub_{len(self._prices) + 1:08d}",
+                "object": 'price',
+                "product": product_id,
+                "active": active,
+                "nickname": None,
+                "unit_amount": unit_amount,
+                "currency": currency,
+                "recurring": {"interval": interval, "interval_count": 1} if interval else None
+            }
+            self._prices.insert(0, price)
+            return price
+
+    def update_price(self, price_id, **fields):
+        with self._lock:
+            price = next(price for price in self._prices if price['id'] == price_id)
+            price.update(fields)
+            return price
+
+    def list_prices(self, limit='10', starting_after=None, **query):
+        limit = max(1, min(100, int(limit)))
+        with self._lock:
+            expand_product = 'data.product' in (query.get('expand[]'), query.get('expand[0]'))
+            prices = [
+                dict(price, product=dict(self._products[price['product']])) if expand_product else dict(price)
+                for price in self._prices
+            ]
+        return self._page('/v1/prices', prices, limit, starting_after)
+
+    @staticmethod
+    def _page(url, matches, limit, starting_after):
+        start = 0
+        if starting_after:
+            ids = [item['id'] for item in matches]
+            if starting_after not in ids:
+                raise LookupError(f"No such object: '{starting_after}'")
+            start = ids.index(starting_after) + 1
+        return {
+            "object": 'list',
+            "url": url,
+            "has_more": start + limit < len(matches),
+            "data": matches[start:start + limit]
+        }
+
+    def get_subscription(self, subscription_id):
+        with self._lock:
+            return self._by_id.get(subscription_id)
+
+    def list_subscriptions(self, limit='10', starting_after=None, customer=None, status=None, **_):
+        limit = max(1, min(100, int(limit)))
+        with self._lock:
+            matches = [
+                subscription for subscription in self._subscriptions
+                if (customer is None or subscription['customer'] == customer)
+                and (status == 'all' or (status is None and subscription['status'] not in ENDED_STATUSES)
+                     or subscription['status'] == status)
+            ]
+        return self._page('/v1/subscriptions', matches, limit, starting_after)
+
+    def _fault(self):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.metrics["requests"] += 1
+            failed = None
+            if self.fail_after is not None and self.metrics["requests"] > self.fail_after:
+                failed = "Injected failure (fail_after)"
+            elif self.error_rate and self._random.random() < self.error_rate:
+                failed = "Injected failure (error_rate)"
+            if failed:
+                self.metrics["errors"] += 1
+            return failed
+
+    def start(self):
+        if self._server is None:
+            self._server = ThreadingHTTPServer((self.host, self.port), _StubHandler)
+            self._server.daemon_threads = True
+            self._server.stub = self
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever, name='stripe-stub', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.metrics, subscriptions=len(self._subscriptions), prices=len(self._prices))
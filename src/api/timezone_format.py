@@ -0,0 +1,168 @@
+# src/api/timezone_format.py
+"""
+Timezone conversion and formatting for session times in emails.
+
+Zone objects, parsed timestamps and per-(instant, zone) formatted strings are
+memoized, and the US label table is built once at import. A booking email
+converts the same start/end pair into Eastern time and the customer's zone,
+and a reminder run formats the same handful of session slots for many
+customers, so almost every lookup after the first is a cache hit.
+``format_many`` formats a list of ``(start, end, zone)`` tuples in one pass.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+
+
+EASTERN_TIMEZONE = 'America/New_York'
+EASTERN_ALIASES = frozenset(('America/New_York', 'US/Eastern'))
+
+# Common US timezones that get "nice" labels
+US_TIMEZONE_LABELS = {
+    'America/Los_Angeles': 'Pacific Time',
+    'America/Denver': 'Mountain Time',
+    'America/Chicago': 'Central Time',
+    'America/New_York': 'Eastern Time',
+    'America/Phoenix': 'Mountain Time (Arizona)',  # Arizona doesn't observe DST
+    'US/Pacific': 'Pacific Time',
+    'US/Mountain': 'Mountain Time',
+    'US/Central': 'Central Time',
+    'US/Eastern': 'Eastern Time'
+}
+
+DATE_FORMAT = '%A, %B %d, %Y'
+TIME_FORMAT = '%I:%M %p'
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """pytz zone for ``name``; raises ``pytz.UnknownTimeZoneError`` for bad names"""
+    return pytz.timezone(name)
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def to_utc(value):
+    """
+    Normalize an ISO string or datetime to an aware UTC datetime
+
+    Naive datetimes are treated as UTC.
+    """
+    utc_dt = _parse_iso(value) if isinstance(value, str) else value
+    if utc_dt.tzinfo is None:
+        return pytz.utc.localize(utc_dt)
+    if utc_dt.tzinfo != pytz.utc:
+        return utc_dt.astimezone(pytz.utc)
+    return utc_dt
+
+
+def convert(value, zone_name):
+    """Convert a UTC ISO string or datetime into ``zone_name``"""
+    return to_utc(value).astimezone(get_zone(zone_name))
+
+
+@lru_cache(maxsize=8192)
+def _local_parts(utc_dt, zone_name):
+    # (date, time, zone abbreviation) for one instant in one zone
+    local_dt = utc_dt.astimezone(get_zone(zone_name))
+    return local_dt.strftime(DATE_FORMAT), local_dt.strftime(TIME_FORMAT), local_dt.strftime('%Z')
+
+
+def _time_range(utc_start, utc_end, zone_name):
+    date, start_time, abbr = _local_parts(utc_start, zone_name)
+    end_time = _local_parts(utc_end, zone_name)[1]
+    return date, f"{start_time} - {end_time} {abbr}"
+
+
+@lru_cache(maxsize=None)
+def zone_label(zone_name):
+    """Heading used for a zone, e.g. "Pacific Time" or "Madrid Time" """
+    if zone_name in US_TIMEZONE_LABELS:
+        return US_TIMEZONE_LABELS[zone_name]
+    # Extract city/country from timezone (e.g., "Europe/Madrid" -> "Madrid")
+    city = zone_name.split('/')[-1].replace('_', ' ') if '/' in zone_name else zone_name
+    return f"{city} Time"
+
+
+@lru_cache(maxsize=4096)
+def _dynamic_display(utc_start, utc_end, customer_timezone):
+    formatted_date, est_time_range = _time_range(utc_start, utc_end, EASTERN_TIMEZONE)
+    eastern_display = f"**Eastern Time:** {est_time_range}"
+
+    customer_time_range = None
+    if not customer_timezone or customer_timezone in EASTERN_ALIASES:
+        # Customer is in Eastern time (or unknown): don't show Eastern twice
+        primary_display = eastern_display
+    else:
+        customer_time_range = _time_range(utc_start, utc_end, customer_timezone)[1]
+        primary_display = f"**{zone_label(customer_timezone)}:** {customer_time_range}"
+
+    return {
+        'formatted_date': formatted_date,
+        'customer_time_range': customer_time_range,  # Customer's local time
+        'est_time_range': est_time_range,           # Eastern time
+        'primary_display': primary_display,         # Customer's time (primary)
+        'secondary_display': eastern_display if customer_time_range else None,  # Eastern (secondary)
+        'dual_timezone_display': f"{customer_time_range} ({est_time_range})" if customer_time_range else est_time_range
+    }
+
+
+def format_session_times(utc_start_time, utc_end_time, customer_timezone=None):
+    """
+    Customer's timezone first, then Eastern time as a secondary reference
+
+    Args:
+        utc_start_time (str|datetime): Session start in UTC
+        utc_end_time (str|datetime): Session end in UTC
+        customer_timezone (str, optional): IANA zone name; Eastern only when omitted
+
+    Returns:
+        dict: formatted_date, customer_time_range, est_time_range, primary_display,
+        secondary_display and dual_timezone_display
+    """
+    # Copy so callers can't mutate the cached entry
+    return dict(_dynamic_display(to_utc(utc_start_time), to_utc(utc_end_time), customer_timezone or None))
+
+
+def format_many(sessions):
+    """
+    Format many ``(start, end, customer_timezone)`` tuples in one pass
+
+    Repeated slots and zones are parsed, converted and formatted only once.
+
+    Returns:
+        list[dict]: One ``format_session_times`` result per tuple, in order
+    """
+    return [format_session_times(start, end, zone) for start, end, zone in sessions]
+
+
+def format_dual_pacific_eastern(utc_start_time, utc_end_time):
+    """Pacific and Eastern ranges side by side"""
+    utc_start, utc_end = to_utc(utc_start_time), to_utc(utc_end_time)
+    formatted_date, pst_time_range = _time_range(utc_start, utc_end, 'America/Los_Angeles')
+    est_time_range = _time_range(utc_start, utc_end, EASTERN_TIMEZONE)[1]
+    return {
+        'formatted_date': formatted_date,
+        'pst_time_range': pst_time_range,
+        'est_time_range': est_time_range,
+        'dual_timezone_display': f"{pst_time_range} ({est_time_range})"
+    }
+
+
+def cache_stats():
+    caches = {
+        "zones": get_zone,
+        "parsed_timestamps": _parse_iso,
+        "local_parts": _local_parts,
+        "session_displays": _dynamic_display
+    }
+    stats = {}
+    for name, fn in caches.items():
+        info = fn.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
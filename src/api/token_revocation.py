@@ -0,0 +1,185 @@
+# src/api/token_revocation.py
+"""
+Access token revocation keyed on the JWT ``jti`` claim.
+
+Every ``jwt_required`` request asks whether its token has been revoked. The
+``revoked_token`` table is the authoritative answer, but querying it on every
+request would add a round trip to each API call. Instead each worker keeps a
+Bloom filter of revoked jtis: a negative answer (the common case) is final and
+costs a few hashes, and only filter hits are confirmed against the database.
+Workers pick up revocations made elsewhere by pulling new rows incrementally.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from api.models import db, RevokedToken
+
+
+DENYLIST_CAPACITY = int(os.getenv('TOKEN_DENYLIST_CAPACITY', 100000))
+DENYLIST_ERROR_RATE = float(os.getenv('TOKEN_DENYLIST_ERROR_RATE', 0.001))
+DENYLIST_REFRESH_SECONDS = float(os.getenv('TOKEN_DENYLIST_REFRESH_SECONDS', 5))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        for pos in self._positions(item):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    @property
+    def memory_bytes(self):
+        return len(self._bits)
+
+    def estimated_error_rate(self):
+        """False-positive probability for the number of items inserted so far"""
+        if self.count == 0:
+            return 0.0
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class RevocationList:
+    """Per-process view of the revoked token table"""
+
+    def __init__(self, capacity=DENYLIST_CAPACITY, error_rate=DENYLIST_ERROR_RATE,
+                 refresh_seconds=DENYLIST_REFRESH_SECONDS):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_row_id = 0
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.filter_hits = 0
+        self.false_positives = 0
+
+    def refresh(self, force=False):
+        """Load revocations recorded since the last refresh (by any worker)"""
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return
+        with self._lock:
+            if not force and now < self._next_refresh:
+                return
+            rows = db.session.query(RevokedToken.id, RevokedToken.jti).filter(
+                RevokedToken.id > self._last_row_id
+            ).order_by(RevokedToken.id).all()
+            for row_id, jti in rows:
+                self._filter.add(jti)
+                self._last_row_id = row_id
+            if self._filter.count > self.capacity:
+                self._rebuild_locked()
+            self._next_refresh = now + self.refresh_seconds
+
+    def rebuild(self):
+        """Rebuild the filter from unexpired revocations only"""
+        with self._lock:
+            self._rebuild_locked()
+
+    def _rebuild_locked(self):
+        active = db.session.query(RevokedToken.id, RevokedToken.jti).filter(
+            db.or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > datetime.utcnow())
+        ).all()
+        self.capacity = max(self.capacity, len(active) * 2)
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_row_id = self._last_row_id
+        for row_id, jti in active:
+            bloom.add(jti)
+            last_row_id = max(last_row_id, row_id)
+        self._filter = bloom
+        self._last_row_id = last_row_id
+
+    def is_revoked(self, jti):
+        """Return True if the token with this jti has been revoked"""
+        self.checks += 1
+        if not jti:
+            return False
+        self.refresh()
+        if jti not in self._filter:
+            return False
+        self.filter_hits += 1
+        revoked = db.session.query(RevokedToken.id).filter_by(jti=jti).first() is not None
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    def revoke(self, jti, user_id=None, expires_at=None):
+        """Persist a revocation and add it to this worker's filter immediately"""
+        if RevokedToken.query.filter_by(jti=jti).first() is None:
+            db.session.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+            db.session.commit()
+        with self._lock:
+            self._filter.add(jti)
+
+    def purge_expired(self):
+        """Delete revocations for tokens that have expired anyway and rebuild the filter"""
+        deleted = RevokedToken.query.filter(
+            RevokedToken.expires_at.isnot(None),
+            RevokedToken.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        self.rebuild()
+        return deleted
+
+    def stats(self):
+        bloom = self._filter
+        return {
+            "entries": bloom.count,
+            "capacity": self.capacity,
+            "memory_bytes": bloom.memory_bytes,
+            "num_bits": bloom.num_bits,
+            "num_hashes": bloom.num_hashes,
+            "target_error_rate": self.error_rate,
+            "estimated_error_rate": bloom.estimated_error_rate(),
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "false_positives": self.false_positives,
+            "observed_error_rate": self.false_positives / self.checks if self.checks else 0.0
+        }
+
+
+revocation_list = RevocationList()
+
+
+def is_token_revoked(jwt_payload):
+    """``token_in_blocklist_loader`` callback for flask_jwt_extended"""
+    return revocation_list.is_revoked(jwt_payload.get('jti'))
+
+
+def revoke_token(jwt_payload):
+    """Revoke the token described by ``jwt_payload`` until it would have expired"""
+    exp = jwt_payload.get('exp')
+    sub = jwt_payload.get('sub')
+    revocation_list.revoke(
+        jwt_payload['jti'],
+        user_id=sub if isinstance(sub, int) else None,
+        expires_at=datetime.utcfromtimestamp(exp) if exp else None
+    )
@@ -0,0 +1,189 @@
+# src/api/user_provisioning.py
+"""
+Bulk user provisioning for organization onboarding and admin imports.
+
+Users are written with one multi-row ``INSERT ... ON CONFLICT`` per
+batch instead of a lookup plus ``session.add``/``commit`` per user, and the
+password hashes for a batch are computed in parallel before it is written.
+"""
+
+import csv
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.security import generate_password_hash
+
+from api.models import db, User, normalize_email
+
+
+DEFAULT_BATCH_SIZE = 1000
+# hashlib's pbkdf2 releases the GIL, so threads hash in parallel
+DEFAULT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+# Never a valid hash, so it can't log anyone in even if it were stored
+EXISTING_PASSWORD_PLACEHOLDER = '!'
+
+TRUE_VALUES = ('true', '1', 'yes')
+
+
+def _hash_password(password):
+    """
+    Hash an imported password; records without one get an unusable random
+    password, so the account is reached through a password reset or OAuth only
+    """
+    return generate_password_hash(password or secrets.token_urlsafe(32))
+
+
+def _parse_bool(value, default=False):
+    """CSV and JSON flags: only true/1/yes (any case) count as True"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _normalize_record(record, now):
+    email = (record.get('email') or '').strip()
+    if not email:
+        raise ValueError(f"Record is missing an email: {record}")
+    return {
+        'email': email,
+        'email_normalized': normalize_email(email),
+        'first_name': (record.get('first_name') or '')[:30],
+        'last_name': (record.get('last_name') or '')[:30],
+        'phone': (record.get('phone') or 'Not provided')[:30],
+        'password': record.get('password'),
+        'is_verified': _parse_bool(record.get('is_verified')),
+        'is_active': True,
+        'subscription_status': 'free',
+        'date_joined': now
+    }
+
+
+def _upsert_statement(rows, update_existing):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(User.__table__).values(rows)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(User.__table__).values(rows)
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+
+    if not update_existing:
+        return stmt.on_conflict_do_nothing(index_elements=['email_normalized'])
+
+    # Only profile fields are refreshed; passwords, verification and
+    # subscription state of existing accounts are never overwritten
+    return stmt.on_conflict_do_update(
+        index_elements=['email_normalized'],
+        set_={
+            'first_name': stmt.excluded.first_name,
+            'last_name': stmt.excluded.last_name,
+            'phone': stmt.excluded.phone
+        }
+    )
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_upsert_users(records, batch_size=DEFAULT_BATCH_SIZE, hash_workers=DEFAULT_HASH_WORKERS,
+                      update_existing=True):
+    """
+    Insert or update many users keyed on their normalized email
+
+    Args:
+        records (iterable[dict]): Dicts with ``email`` and optional ``first_name``,
+            ``last_name``, ``phone``, ``password`` (plain text) and ``is_verified``
+            (true/1/yes, unverified by default).
+            Consumed lazily, one batch at a time.
+        batch_size (int, optional): Rows per INSERT statement. Defaults to 1000.
+        hash_workers (int, optional): Threads used to hash passwords.
+        update_existing (bool, optional): Refresh names/phone of existing users
+            instead of leaving them untouched. Defaults to True.
+
+    Returns:
+        dict: Counts and timings for the import
+    """
+    stats = {
+        "received": 0,
+        "written": 0,
+        "batches": 0,
+        "hash_seconds": 0.0,
+        "db_seconds": 0.0
+    }
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, hash_workers)) as pool:
+        for chunk in _chunks(records, batch_size):
+            now = datetime.utcnow()
+            # Postgres refuses to touch the same row twice in one statement,
+            # so keep only the last record for each email in the batch
+            by_email = {}
+            for record in chunk:
+                row = _normalize_record(record, now)
+                by_email[row['email_normalized']] = row
+            rows = list(by_email.values())
+            stats["received"] += len(chunk)
+
+            # Existing accounts never have their password replaced, so only
+            # hash for emails that are not in the table yet
+            existing = {
+                email for (email,) in db.session.query(User.email_normalized).filter(
+                    User.email_normalized.in_(list(by_email))
+                )
+            }
+            if not update_existing:
+                rows = [row for row in rows if row['email_normalized'] not in existing]
+                if not rows:
+                    stats["batches"] += 1
+                    continue
+            new_rows = [row for row in rows if row['email_normalized'] not in existing]
+            for row in rows:
+                if row['email_normalized'] in existing:
+                    # Discarded by ON CONFLICT, it only fills the NOT NULL column
+                    row['password'] = EXISTING_PASSWORD_PLACEHOLDER
+
+            hash_started = time.perf_counter()
+            plain = [row['password'] for row in new_rows]
+            hashed = pool.map(_hash_password, plain)
+            for row, password_hash in zip(new_rows, hashed):
+                row['password'] = password_hash
+            stats["hash_seconds"] += time.perf_counter() - hash_started
+
+            db_started = time.perf_counter()
+            result = db.session.execute(_upsert_statement(rows, update_existing))
+            db.session.commit()
+            stats["db_seconds"] += time.perf_counter() - db_started
+
+            stats["written"] += result.rowcount if result.rowcount and result.rowcount > 0 else 0
+            stats["batches"] += 1
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["hash_seconds"] = round(stats["hash_seconds"], 3)
+    stats["db_seconds"] = round(stats["db_seconds"], 3)
+    stats["users_per_second"] = round(stats["received"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def read_user_file(path):
+    """Yield user records from a CSV (with header row) or JSON list file"""
+    if path.lower().endswith('.json'):
+        with open(path) as f:
+            yield from json.load(f)
+        return
+    with open(path, newline='') as f:
+        yield from csv.DictReader(f)
@@ -0,0 +1,429 @@
+# src/api/videosdk_events.py
+"""
+Asynchronous processing of VideoSDK recording and HLS webhooks.
+
+The webhook route only validates the body and records it: the event type is
+resolved through ``EVENT_HANDLERS`` (legacy ``event`` names through
+``LEGACY_EVENTS``), and ``video_sdk_event.event_key`` (a SHA-256 of the body)
+is unique, so VideoSDK's redeliveries are dropped by a single
+``INSERT ... ON CONFLICT DO NOTHING`` and it gets its 200 without waiting on
+``video_session``.
+
+A background worker claims due events oldest first, loads the sessions of
+every meeting in the batch with one query and applies each meeting's events
+in order. Handlers only say which recording status and fields an event sets;
+``_apply`` moves the recording through ``api.recording_state`` (an event the
+state machine turns down as late or duplicated is marked ``rejected``) and
+queues the ready/failed notification when a recording reaches a final state.
+The batch's changes are committed together with its events' status in one
+transaction; if that fails, each meeting is retried in a transaction of its
+own so one bad event only delays its own meeting. As with Stripe events, a
+worker skips meetings whose events another worker is holding.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, VideoSession, VideoSDKEvent
+from api.notification_digest import notify_recording
+from api.recording_state import RECORDING_OUTCOMES, transition, recording_state_stats
+from api.workers import BackgroundWorkerPool
+
+
+VIDEOSDK_EVENT_WORKERS = int(os.getenv('VIDEOSDK_EVENT_WORKERS', 1))
+VIDEOSDK_EVENT_BATCH_SIZE = 200
+VIDEOSDK_EVENT_MAX_ATTEMPTS = 5
+VIDEOSDK_EVENT_BASE_BACKOFF_SECONDS = 10
+# A row stuck in 'processing' this long belongs to a worker that died
+VIDEOSDK_EVENT_STALE_LOCK_SECONDS = 300
+VIDEOSDK_EVENT_RETENTION_DAYS = 7
+VIDEOSDK_EVENT_PURGE_INTERVAL_SECONDS = 3600
+
+videosdk_event_pool = None
+_last_purge = 0.0
+
+_metrics_lock = threading.Lock()
+metrics = {
+    "received": 0,
+    "duplicates": 0,
+    "ignored": 0,
+    "invalid": 0,
+    "applied": 0,
+    "rejected": 0,
+    "orphaned": 0,
+    "retried": 0,
+    "failed": 0,
+    "batches": 0,
+    "meetings": 0
+}
+
+
+def _count(**increments):
+    with _metrics_lock:
+        for key, value in increments.items():
+            metrics[key] += value
+
+
+# ===========================================
+# EVENT HANDLERS
+# ===========================================
+
+# Each handler maps an event's data onto the recording status it moves to and
+# the other VideoSession fields set with it; _apply makes the change through
+# the recording state machine, so handlers never query or commit.
+
+def handle_recording_started(data):
+    return 'active', {"recording_id": data.get('recordingId')}
+
+
+def handle_recording_stopped(data):
+    return 'completed', {"recording_url": data.get('downloadUrl')}
+
+
+def handle_recording_failed(data):
+    return 'failed', {}
+
+
+def handle_hls_starting(data):
+    # Keep the HLS session ID stored by the start-recording route
+    return 'starting', {"recording_id": db.func.coalesce(VideoSession.recording_id, data.get('sessionId'))}
+
+
+def handle_hls_started(data):
+    return 'active', {"recording_id": data.get('sessionId')}
+
+
+def handle_hls_stopping(data):
+    return 'stopping', {}
+
+
+def handle_hls_stopped(data):
+    # Use playback URL if available, otherwise downstream URL, otherwise download URL
+    url = data.get('playbackHlsUrl') or data.get('downstreamUrl') or data.get('downloadUrl')
+    return 'completed', {"recording_url": url}
+
+
+def handle_hls_failed(data):
+    return 'failed', {}
+
+
+EVENT_HANDLERS = {
+    'hls-starting': handle_hls_starting,
+    'hls-started': handle_hls_started,
+    # Stream is ready for playback; nothing to record
+    'hls-playable': None,
+    'hls-stopping': handle_hls_stopping,
+    'hls-stopped': handle_hls_stopped,
+    'hls-failed': handle_hls_failed,
+    'recording-started': handle_recording_started,
+    'recording-stopped': handle_recording_stopped,
+    'recording-failed': handle_recording_failed
+}
+
+# Older payloads name the event in ``event`` and carry the data at the top level
+LEGACY_EVENTS = {
+    'hls.started': 'hls-started',
+    'hls.stopped': 'hls-stopped',
+    'hls.failed': 'hls-failed',
+    'recording.started': 'recording-started',
+    'recording.stopped': 'recording-stopped',
+    'recording.failed': 'recording-failed'
+}
+
+
+def _recording_metadata(data):
+    # Reported on the stopped events when VideoSDK knows them
+    duration, size = data.get('duration'), data.get('fileSize', data.get('size'))
+    return {
+        "duration_seconds": int(duration) if isinstance(duration, (int, float)) else None,
+        "size_bytes": int(size) if isinstance(size, (int, float)) else None
+    }
+
+
+def notify_finished(session, recording, status):
+    """Queue the ready/failed notification after a transition into a final status; the caller commits"""
+    outcome = RECORDING_OUTCOMES.get(status)
+    if outcome:
+        # The UPDATE bypassed the identity map; reload the session for the notification
+        db.session.refresh(session)
+        notify_recording(session, recording, outcome, commit=False)
+
+
+def _apply(session, event):
+    """Run an event's transition and queue the notification if it finished the recording"""
+    data = json.loads(event.payload)
+    status, fields = EVENT_HANDLERS[event.type](data)
+    # Fenced on when we received it, not VideoSDK's payload timestamp: the
+    # routes and command worker stamp their transitions with our clock, and
+    # VideoSDK's running behind would make its events look older than ours
+    recording = transition(session.id, status, event.received_at, recording=_recording_metadata(data), **fields)
+    if recording is None:
+        return False
+    notify_finished(session, recording, status)
+    return True
+
+
+# ===========================================
+# INGESTION
+# ===========================================
+
+class InvalidWebhook(ValueError):
+    """The body isn't a VideoSDK event we can apply"""
+
+
+def parse_webhook(body):
+    """
+    Resolve a webhook body to its event type and data
+
+    Args:
+        body (bytes): The raw request body
+
+    Returns:
+        tuple: (type, data), or (None, None) for an event type nothing handles
+
+    Raises:
+        InvalidWebhook: Not JSON, or a known event without a meetingId
+    """
+    try:
+        message = json.loads(body)
+    except ValueError:
+        raise InvalidWebhook("Body is not JSON")
+    if not isinstance(message, dict):
+        raise InvalidWebhook("Body is not a JSON object")
+    if 'webhookType' in message:
+        event_type, data = message['webhookType'], message.get('data')
+    else:
+        event_type, data = LEGACY_EVENTS.get(message.get('event')), message
+    if event_type not in EVENT_HANDLERS or EVENT_HANDLERS[event_type] is None:
+        return None, None
+    if not isinstance(data, dict) or not data.get('meetingId'):
+        raise InvalidWebhook(f"{event_type} without a meetingId")
+    return event_type, data
+
+
+def _insert_statement(row):
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(VideoSDKEvent.__table__).values(row)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(VideoSDKEvent.__table__).values(row)
+    else:
+        raise NotImplementedError(f"VideoSDK event ingestion is not supported on {dialect}")
+    return stmt.on_conflict_do_nothing(index_elements=['event_key'])
+
+
+def record_webhook(body):
+    """
+    Validate a VideoSDK webhook and queue it for the worker
+
+    Args:
+        body (bytes): The raw request body
+
+    Returns:
+        str: ``queued``, ``duplicate`` or ``ignored`` (no handler for the type)
+
+    Raises:
+        InvalidWebhook: The body can't be applied
+    """
+    try:
+        event_type, data = parse_webhook(body)
+    except InvalidWebhook:
+        _count(invalid=1)
+        raise
+    if event_type is None:
+        _count(ignored=1)
+        return 'ignored'
+
+    now = datetime.utcnow()
+    result = db.session.execute(_insert_statement({
+        "event_key": hashlib.sha256(body).hexdigest(),
+        "type": event_type,
+        "meeting_id": str(data['meetingId']),
+        "payload": json.dumps(data),
+        "status": 'pending',
+        "attempts": 0,
+        "next_attempt_at": now,
+        "received_at": now
+    }))
+    db.session.commit()
+    inserted = result.rowcount > 0
+    _count(received=1, duplicates=0 if inserted else 1)
+    if inserted and videosdk_event_pool is not None:
+        videosdk_event_pool.wake()
+    return 'queued' if inserted else 'duplicate'
+
+
+# ===========================================
+# WORKER
+# ===========================================
+
+def _due(now):
+    stale_before = now - timedelta(seconds=VIDEOSDK_EVENT_STALE_LOCK_SECONDS)
+    return db.or_(
+        db.and_(VideoSDKEvent.status == 'pending', VideoSDKEvent.next_attempt_at <= now),
+        db.and_(VideoSDKEvent.status == 'processing', VideoSDKEvent.locked_at < stale_before)
+    )
+
+
+def claim_events(worker_id, batch_size=VIDEOSDK_EVENT_BATCH_SIZE, now=None):
+    """
+    Mark up to ``batch_size`` due events as processing for ``worker_id``
+
+    Meetings with an event currently held by another worker are skipped, so
+    one meeting's events are never applied by two workers at once.
+    """
+    now = now or datetime.utcnow()
+    stale_before = now - timedelta(seconds=VIDEOSDK_EVENT_STALE_LOCK_SECONDS)
+    busy_meetings = db.session.query(VideoSDKEvent.meeting_id).filter(
+        VideoSDKEvent.status == 'processing',
+        VideoSDKEvent.locked_at >= stale_before,
+        VideoSDKEvent.locked_by != worker_id
+    )
+    candidate_ids = [
+        row_id for (row_id,) in db.session.query(VideoSDKEvent.id)
+        .filter(_due(now), ~VideoSDKEvent.meeting_id.in_(busy_meetings))
+        .order_by(VideoSDKEvent.id)
+        .limit(batch_size)
+    ]
+    if not candidate_ids:
+        return []
+
+    VideoSDKEvent.query.filter(VideoSDKEvent.id.in_(candidate_ids), _due(now)).update(
+        {"status": 'processing', "locked_by": worker_id, "locked_at": now},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return VideoSDKEvent.query.filter(
+        VideoSDKEvent.id.in_(candidate_ids),
+        VideoSDKEvent.status == 'processing',
+        VideoSDKEvent.locked_by == worker_id
+    ).order_by(VideoSDKEvent.id).all()
+
+
+def _finish(event, status, now, error=None):
+    event.status = status
+    event.attempts += 1
+    event.processed_at = now
+    event.locked_by = None
+    event.locked_at = None
+    event.last_error = error
+
+
+def apply_meeting_events(session, events, now):
+    """Apply one meeting's events in order; the caller commits. Returns a count per outcome."""
+    if session is None:
+        for event in events:
+            _finish(event, 'orphaned', now)
+        print(f"⚠️ Session not found for meeting_id: {events[0].meeting_id}")
+        return Counter(orphaned=len(events))
+    outcomes = Counter()
+    for event in events:
+        outcome = 'applied' if _apply(session, event) else 'rejected'
+        _finish(event, outcome, now)
+        outcomes[outcome] += 1
+    return outcomes
+
+
+def _retry(event_ids, error):
+    db.session.rollback()
+    for event in VideoSDKEvent.query.filter(VideoSDKEvent.id.in_(event_ids)).all():
+        event.attempts += 1
+        event.locked_by = None
+        event.locked_at = None
+        event.last_error = f"{type(error).__name__}: {error}"
+        if event.attempts >= VIDEOSDK_EVENT_MAX_ATTEMPTS:
+            event.status = 'failed'
+            _count(failed=1)
+            print(f"❌ Giving up on VideoSDK event {event.type} for meeting {event.meeting_id}: {str(error)}")
+        else:
+            event.status = 'pending'
+            event.next_attempt_at = datetime.utcnow() + timedelta(
+                seconds=VIDEOSDK_EVENT_BASE_BACKOFF_SECONDS * 2 ** (event.attempts - 1)
+            )
+            _count(retried=1)
+    db.session.commit()
+
+
+def process_videosdk_events(worker_id, batch_size=VIDEOSDK_EVENT_BATCH_SIZE):
+    """Claim one batch of events and apply it meeting by meeting. Returns the number handled."""
+    events = claim_events(worker_id, batch_size)
+    if not events:
+        _purge_processed()
+        return 0
+
+    by_meeting = OrderedDict()
+    for event in events:
+        by_meeting.setdefault(event.meeting_id, []).append(event)
+    _count(batches=1, meetings=len(by_meeting))
+
+    def load_sessions(meeting_ids):
+        return {
+            session.meeting_id: session
+            for session in VideoSession.query.filter(VideoSession.meeting_id.in_(meeting_ids)).all()
+        }
+
+    # Whole batch in one transaction; only if it fails is each meeting retried on its own
+    sessions = load_sessions(list(by_meeting))
+    now = datetime.utcnow()
+    try:
+        outcomes = Counter()
+        for meeting_id, meeting_events in by_meeting.items():
+            outcomes.update(apply_meeting_events(sessions.get(meeting_id), meeting_events, now))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+    else:
+        _count(**outcomes)
+        return len(events)
+
+    for meeting_id, meeting_events in by_meeting.items():
+        event_ids = [event.id for event in meeting_events]
+        try:
+            meeting_events = VideoSDKEvent.query.filter(VideoSDKEvent.id.in_(event_ids)).order_by(VideoSDKEvent.id).all()
+            outcomes = apply_meeting_events(load_sessions([meeting_id]).get(meeting_id), meeting_events,
+                                            datetime.utcnow())
+            db.session.commit()
+            _count(**outcomes)
+        except Exception as e:
+            _retry(event_ids, e)
+    return len(events)
+
+
+def _purge_processed(now=None):
+    global _last_purge
+    if time.monotonic() - _last_purge < VIDEOSDK_EVENT_PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = time.monotonic()
+    now = now or datetime.utcnow()
+    VideoSDKEvent.query.filter(
+        VideoSDKEvent.status.in_(('applied', 'rejected', 'orphaned')),
+        VideoSDKEvent.received_at < now - timedelta(days=VIDEOSDK_EVENT_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def videosdk_event_stats():
+    counts = dict(
+        db.session.query(VideoSDKEvent.status, db.func.count(VideoSDKEvent.id)).group_by(VideoSDKEvent.status).all()
+    )
+    with _metrics_lock:
+        stats = dict(metrics)
+    stats["queue"] = counts
+    stats["transitions"] = recording_state_stats()
+    if videosdk_event_pool is not None:
+        stats["workers"] = videosdk_event_pool.stats()
+    return stats
+
+
+def create_videosdk_event_pool(app, num_workers=VIDEOSDK_EVENT_WORKERS):
+    global videosdk_event_pool
+    videosdk_event_pool = BackgroundWorkerPool(app, 'videosdk-events', process_videosdk_events,
+                                               num_workers=num_workers, poll_interval=2.0)
+    return videosdk_event_pool
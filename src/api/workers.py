@@ -0,0 +1,84 @@
+# src/api/workers.py
+"""
+Background worker pools for draining database-backed queues.
+
+A pool runs ``num_workers`` daemon threads. Each thread repeatedly calls
+``process_batch(worker_id)`` inside an app context; the callback claims and
+handles one batch of work and returns how many items it processed. Threads
+sleep for ``poll_interval`` when there is nothing to do, and ``wake()`` lets a
+request that just enqueued work skip that wait.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+
+
+def make_worker_id(name, index):
+    """Identifier that is unique across hosts, processes and threads"""
+    return f"{socket.gethostname()}:{os.getpid()}:{name}-{index}"
+
+
+class BackgroundWorkerPool:
+    def __init__(self, app, name, process_batch, num_workers=1, poll_interval=2.0):
+        self.app = app
+        self.name = name
+        self.process_batch = process_batch
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.processed = 0
+        self.errors = 0
+
+    def start(self):
+        if self._threads:
+            return self
+        for index in range(self.num_workers):
+            worker_id = make_worker_id(self.name, index)
+            thread = threading.Thread(target=self._run, args=(worker_id,), name=worker_id, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✅ Started {self.num_workers} {self.name} worker(s)")
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def run_forever(self):
+        """Run a single worker in the current thread (for a dedicated worker process)"""
+        self._run(make_worker_id(self.name, 0))
+
+    def _run(self, worker_id):
+        while not self._stop.is_set():
+            handled = 0
+            try:
+                with self.app.app_context():
+                    handled = self.process_batch(worker_id) or 0
+                self.processed += handled
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ {self.name} worker {worker_id} error: {str(e)}")
+                print(traceback.format_exc())
+                time.sleep(self.poll_interval)
+            if not handled:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "workers": len(self._threads),
+            "processed": self.processed,
+            "errors": self.errors
+        }
@@ -12,6 +12,15 @@ from api.utils import APIException, generate_sitemap
 from api.models import db
 from api.routes import api
 from api.admin import setup_admin
+from api.commands import setup_commands
+from api.email_outbox import create_outbox_pool
+from api.notifications import create_notification_scheduler
+from api.notification_digest import create_digest_pool
+from api.stripe_events import create_stripe_event_pool
+from api.videosdk_events import create_videosdk_event_pool
+from api.recording_commands import create_recording_command_pool
+from api.price_catalog import create_catalog_pool
+from api.token_revocation import is_token_revoked
 from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import timedelta
 
@@ -25,7 +34,8 @@ app = Flask(__name__)
 app.url_map.strict_slashes = False
 
 # Apply ProxyFix for deployments behind a reverse proxy
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+# (x_for gives login throttling the real client IP instead of the proxy's)
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
 # Secret key for session management (CRITICAL FOR OAUTH STATE)
 app.secret_key = os.getenv("FLASK_SESSION_SECRET_KEY")
@@ -64,6 +74,12 @@ if not app.config["JWT_SECRET_KEY"]:
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = datetime.timedelta(days=1)
 jwt = JWTManager(app)
 
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    return is_token_revoked(jwt_payload)
+
+
 # CORS Configuration
 cors_origins_list = []
 frontend_url_env = os.getenv('FRONTEND_URL')
@@ -102,9 +118,54 @@ db.init_app(app)
 # add the admin
 setup_admin(app)
 
+# add the admin commands
+setup_commands(app)
+
 # Add all endpoints form the API with a "api" prefix
 app.register_blueprint(api, url_prefix='/api')
 
+# Background delivery for the email outbox (EMAIL_OUTBOX_WORKERS=0 to run
+# delivery in a separate `flask outbox-worker` process instead)
+email_outbox_pool = create_outbox_pool(app)
+
+# Periodic bulk notifications (NOTIFICATION_FANOUT_INTERVAL_MINUTES=0, the
+# default, leaves them to `flask notify ...` from cron)
+notification_scheduler = create_notification_scheduler(app)
+
+# Per-recipient digests of webhook-driven notifications
+notification_digest_pool = create_digest_pool(app)
+
+# Stripe webhook events are recorded by the route and applied here
+stripe_event_pool = create_stripe_event_pool(app)
+
+# VideoSDK recording webhooks are queued by the route and applied here
+videosdk_event_pool = create_videosdk_event_pool(app)
+
+# Recording start/stop commands are queued by the routes and sent to VideoSDK here
+recording_command_pool = create_recording_command_pool(app)
+
+# Stripe prices served from memory: loaded by the refresher thread once it
+# starts, then kept fresh on a TTL and on price/product webhooks
+price_catalog_pool = create_catalog_pool(app)
+
+
+@app.before_first_request
+def start_background_workers():
+    if email_outbox_pool.num_workers > 0:
+        email_outbox_pool.start()
+    if notification_digest_pool.num_workers > 0:
+        notification_digest_pool.start()
+    if stripe_event_pool.num_workers > 0:
+        stripe_event_pool.start()
+    if videosdk_event_pool.num_workers > 0:
+        videosdk_event_pool.start()
+    if recording_command_pool.num_workers > 0:
+        recording_command_pool.start()
+    if os.getenv('STRIPE_SECRET_KEY'):
+        price_catalog_pool.start()
+    if notification_scheduler is not None and not notification_scheduler.running:
+        notification_scheduler.start()
+
 # Handle/serialize errors like a JSON object
 
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { loadStripe } from '@stripe/stripe-js';
 import {
     Elements,
@@ -16,6 +16,8 @@ const PaymentForm = ({ onSuccess, onCancel }) => {
     const elements = useElements();
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState(null);
+    // One checkout attempt per form: resubmitting reuses its PaymentIntent
+    const attemptId = useRef(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`);
 
     const handleSubmit = async (event) => {
         event.preventDefault();
@@ -36,7 +38,10 @@ const PaymentForm = ({ onSuccess, onCancel }) => {
                 headers: {
                     'Authorization': `Bearer ${token}`,
                     'Content-Type': 'application/json'
-                }
+                },
+                body: JSON.stringify({
+                    attempt_id: attemptId.current
+                })
             });
 
             if (!response.ok) {
@@ -49,14 +54,19 @@ const PaymentForm = ({ onSuccess, onCancel }) => {
             const paymentData = await response.json();
             const clientSecret = paymentData.client_secret;
 
-            // Step 2: Confirm payment with Stripe
-            const cardElement = elements.getElement(CardElement);
-
-            const { error, paymentIntent } = await stripe.confirmCardPayment(clientSecret, {
-                payment_method: {
-                    card: cardElement,
-                }
-            });
+            // Step 2: Confirm payment with Stripe, unless an earlier submit of
+            // this form already paid and only the subscription step failed
+            let error = null;
+            let paymentIntent = { id: paymentData.payment_intent_id, status: paymentData.status };
+            if (paymentData.status !== 'succeeded') {
+                const cardElement = elements.getElement(CardElement);
+
+                ({ error, paymentIntent } = await stripe.confirmCardPayment(clientSecret, {
+                    payment_method: {
+                        card: cardElement,
+                    }
+                }));
+            }
 
             if (error) {
                 setError(error.message);
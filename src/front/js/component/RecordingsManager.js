@@ -6,6 +6,8 @@ const RecordingsManager = ({ user }) => {
     const [recordings, setRecordings] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [selectedRecording, setSelectedRecording] = useState(null);
     const [showPlayer, setShowPlayer] = useState(false);
     const videoRef = useRef(null);
@@ -44,21 +46,29 @@ const RecordingsManager = ({ user }) => {
         );
     }
 
+    // Fetch one page of recordings, newest first
+    const fetchRecordingsPage = (cursor) => {
+        const token = sessionStorage.getItem('token');
+        const query = cursor ? `?before=${encodeURIComponent(cursor)}` : '';
+        return fetch(`${process.env.BACKEND_URL}/api/my-recordings${query}`, {
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json',
+            },
+        });
+    };
+
     // Fetch recordings
     const fetchRecordings = async () => {
         try {
             setLoading(true);
-            const token = sessionStorage.getItem('token');
-            const response = await fetch(`${process.env.BACKEND_URL}/api/my-recordings`, {
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                    'Content-Type': 'application/json',
-                },
-            });
+            setError(null);
+            const response = await fetchRecordingsPage(null);
 
             if (response.ok) {
                 const data = await response.json();
                 setRecordings(data.recordings || []);
+                setNextCursor(data.next_cursor || null);
             } else {
                 const errorData = await response.json();
                 setError(errorData.msg || 'Failed to fetch recordings');
@@ -71,6 +81,29 @@ const RecordingsManager = ({ user }) => {
         }
     };
 
+    // Append the next page of older recordings
+    const loadMoreRecordings = async () => {
+        if (!nextCursor) return;
+        try {
+            setLoadingMore(true);
+            const response = await fetchRecordingsPage(nextCursor);
+
+            if (response.ok) {
+                const data = await response.json();
+                setRecordings(prev => [...prev, ...(data.recordings || [])]);
+                setNextCursor(data.next_cursor || null);
+            } else {
+                const errorData = await response.json();
+                alert(errorData.msg || 'Failed to load more recordings');
+            }
+        } catch (error) {
+            console.error('Error loading more recordings:', error);
+            alert('Error loading more recordings');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         // Only fetch recordings if user has recording access
         if (user?.subscription_status === 'recordings') {
@@ -125,6 +158,13 @@ const RecordingsManager = ({ user }) => {
         });
     };
 
+    // Format recording length for display
+    const formatDuration = (seconds) => {
+        const hours = Math.floor(seconds / 3600);
+        const minutes = Math.floor((seconds % 3600) / 60);
+        return hours > 0 ? `${hours}h ${minutes}m` : `${minutes}m ${seconds % 60}s`;
+    };
+
     // Play recording in modal
     const playRecording = (recording) => {
         setSelectedRecording(recording);
@@ -224,7 +264,7 @@ const RecordingsManager = ({ user }) => {
                     ) : (
                         <div className="recordings-grid">
                             {recordings.map((recording, index) => (
-                                <div key={recording.session_id} className="recording-item mb-3">
+                                <div key={recording.id} className="recording-item mb-3">
                                     <div className="card">
                                         <div className="card-body">
                                             <div className="d-flex justify-content-between align-items-start">
@@ -238,7 +278,7 @@ const RecordingsManager = ({ user }) => {
                                                     </p>
                                                     <p className="text-muted small mb-2">
                                                         <i className="fas fa-clock me-1"></i>
-                                                        Duration: {recording.max_duration_minutes === 360 ? 'Premium (6h)' : 'Free (70min)'}
+                                                        Duration: {recording.duration_seconds != null ? formatDuration(recording.duration_seconds) : 'In progress'}
                                                     </p>
                                                     <div className="mb-2">
                                                         <span className={`badge ${recording.recording_status === 'completed' ? 'bg-success' :
@@ -275,6 +315,17 @@ const RecordingsManager = ({ user }) => {
                                     </div>
                                 </div>
                             ))}
+                            {nextCursor && (
+                                <div className="text-center">
+                                    <button
+                                        className="btn btn-outline-primary"
+                                        onClick={loadMoreRecordings}
+                                        disabled={loadingMore}
+                                    >
+                                        {loadingMore ? 'Loading...' : 'Load more recordings'}
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>
@@ -282,7 +333,7 @@ const RecordingsManager = ({ user }) => {
                 <div className="card-footer text-muted">
                     <small>
                         <i className="fas fa-info-circle me-1"></i>
-                        Total recordings: {recordings.length}
+                        {nextCursor ? 'Showing' : 'Total'} recordings: {recordings.length}
                         {recordings.length > 0 && (
                             <span className="ms-3">
                                 <i className="fas fa-cloud me-1"></i>
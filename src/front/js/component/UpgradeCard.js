@@ -14,7 +14,10 @@ export const UpgradeCard = () => {
                 headers: {
                     'Authorization': `Bearer ${token}`,
                     'Content-Type': 'application/json'
-                }
+                },
+                body: JSON.stringify({
+                    attempt_id: `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`
+                })
             });
 
             if (response.ok) {